@@ -19,10 +19,13 @@ from pghistory.core import (
     RowEvent,
     Tracker,
     UpdateEvent,
+    bulk_create_events,
     create_event,
     create_event_model,
     track,
 )
+from pghistory.partition import TimePartition
+from pghistory.retention import Retention
 from pghistory.runtime import context
 from pghistory.version import __version__
 
@@ -96,6 +99,16 @@ Update = pgtrigger.Update
 For specifying `UPDATE` as the trigger operation.
 """
 
+Row = pgtrigger.Row
+"""
+For specifying row-level event triggers (the default) in a [pghistory.RowEvent][]
+"""
+
+Statement = pgtrigger.Statement
+"""
+For specifying statement-level event triggers in a [pghistory.RowEvent][]
+"""
+
 New = "NEW"
 """
 For storing the trigger's "NEW" row in a [pghistory.RowEvent][]
@@ -111,6 +124,7 @@ __all__ = [
     "AllChange",
     "AnyDontChange",
     "AllDontChange",
+    "bulk_create_events",
     "Condition",
     "context",
     "ContextForeignKey",
@@ -133,7 +147,11 @@ __all__ = [
     "ProxyField",
     "Q",
     "RelatedField",
+    "Retention",
+    "Row",
     "RowEvent",
+    "Statement",
+    "TimePartition",
     "track",
     "Tracker",
     "Update",
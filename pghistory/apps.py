@@ -1,4 +1,5 @@
 import django.apps
+from django.db.backends.signals import connection_created
 from django.db.models.signals import class_prepared
 
 
@@ -23,3 +24,8 @@ class PGHistoryConfig(django.apps.AppConfig):
     def ready(self):
         # Register custom checks
         from pghistory import checks  # noqa
+        from pghistory import runtime
+
+        # Inject context on connections as they are created, including
+        # connections to other databases and in other threads
+        connection_created.connect(runtime.install_execute_wrapper)
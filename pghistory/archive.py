@@ -0,0 +1,250 @@
+import datetime as dt
+import gzip
+import itertools
+import json
+import tempfile
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, Iterable, List, Type, Union
+
+import pgtrigger
+from django.apps import apps
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models.expressions import RawSQL
+
+from pghistory import config, core, retention
+
+if TYPE_CHECKING:
+    from django.core.files.storage import Storage
+
+
+class _ArchiveJSONEncoder(DjangoJSONEncoder):
+    """Serializes datetimes and times without truncating microseconds"""
+
+    def default(self, o):
+        if isinstance(o, (dt.datetime, dt.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _get_storage(storage):
+    storage = storage or config.archive_storage()
+    if not storage:
+        raise ValueError("No archive storage. Set settings.PGHISTORY_ARCHIVE_STORAGE.")
+
+    return storage
+
+
+def _archive_rows(model, get_conditions, *, name, storage, batch_size, sleep, progress, using):
+    """
+    Exports the rows of a model matching SQL conditions to a gzipped JSON lines file
+    and then deletes the exported rows in batches.
+
+    `get_conditions` is called with a table alias and returns the conditions and params.
+    """
+    fields = model._meta.concrete_fields
+    conditions, params = get_conditions(f'"{model._meta.db_table}"')
+    queryset = (
+        model._base_manager.using(using)
+        .filter(RawSQL(" AND ".join(conditions), params, output_field=models.BooleanField()))
+        .order_by("pk")
+        .values(*[field.attname for field in fields])
+    )
+
+    with tempfile.TemporaryFile() as tmp:
+        exported = 0
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            last_pk = None
+            while True:
+                batch = list(
+                    (queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[
+                        :batch_size
+                    ]
+                )
+                for row in batch:
+                    f.write(json.dumps(row, cls=_ArchiveJSONEncoder) + "\n")
+
+                exported += len(batch)
+                if len(batch) < batch_size:
+                    break
+
+                last_pk = batch[-1][model._meta.pk.attname]
+
+        if not exported:
+            return None
+
+        tmp.seek(0)
+        name = storage.save(name, File(tmp))
+
+        # Only delete rows that were exported and still match the conditions
+        tmp.seek(0)
+        conditions, params = get_conditions("_archived")
+        deleted = 0
+        with gzip.open(tmp, "rt", encoding="utf-8") as f:
+            rows = (json.loads(line) for line in f)
+            while batch := list(itertools.islice(rows, batch_size)):
+                if deleted:
+                    time.sleep(sleep)
+
+                deleted += retention._delete_in_batches(
+                    model,
+                    [f'_archived."{model._meta.pk.column}" = ANY(%s)', *conditions],
+                    [
+                        [model._meta.pk.to_python(row[model._meta.pk.attname]) for row in batch],
+                        *params,
+                    ],
+                    alias="_archived",
+                    batch_size=batch_size,
+                    sleep=0,
+                    progress=None,
+                    using=using,
+                )
+                if progress:
+                    progress(deleted)
+
+    return name
+
+
+def archive(
+    before: dt.datetime,
+    *,
+    event_models: Union[Iterable[Type[models.Model]], None] = None,
+    contexts: bool = True,
+    storage: Union["Storage", None] = None,
+    batch_size: int = 1000,
+    sleep: float = 0,
+    progress: Union[Callable[[Type[models.Model], int], None], None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> List[str]:
+    """
+    Archives events created before a cutoff to compressed files and deletes them.
+
+    The events of each event model are written to a gzipped JSON lines file named
+    `<app_label>.<model_name>/<cutoff>.jsonl.gz` in the archive storage. Exported
+    events are then deleted in batches, each in its own transaction. Append-only
+    protection is ignored while deleting. Events of delta event models are
+    only archived when the remaining events can still be reconstructed.
+
+    Context that isn't referenced by any remaining event and that wasn't updated
+    since the cutoff is archived afterwards.
+
+    Use [pghistory.archive.restore][] to import archived files.
+
+    Args:
+        before: Archive events created before this time.
+        event_models: The event models. Defaults to every event model.
+        contexts: Also archive unreferenced context.
+        storage: The storage of the files. Defaults to `settings.PGHISTORY_ARCHIVE_STORAGE`.
+        batch_size: The maximum number of rows exported or deleted in a batch.
+        sleep: The number of seconds to sleep between deleted batches.
+        progress: Called with the model and total number of deleted rows after every batch.
+        using: The database.
+
+    Returns:
+        The names of the archived files.
+    """
+    from pghistory.models import Context  # noqa
+
+    storage = _get_storage(storage)
+    event_models = core.event_models() if event_models is None else event_models
+    stamp = f"{before:%Y%m%dT%H%M%S}"
+    archived = []
+    kwargs = {"storage": storage, "batch_size": batch_size, "sleep": sleep, "using": using}
+
+    policy = retention.Retention(max_age=dt.timedelta(0))
+    models_conditions = [
+        (
+            event_model,
+            lambda alias, event_model=event_model: retention._get_prune_conditions(
+                event_model, policy, alias=alias, now=before
+            ),
+        )
+        for event_model in event_models
+    ]
+    if contexts:
+        models_conditions.append(
+            (
+                Context,
+                lambda alias: (
+                    [
+                        retention._get_unreferenced_context_condition(alias=alias),
+                        f"{alias}.updated_at < %s",
+                    ],
+                    [before],
+                ),
+            )
+        )
+
+    for model, get_conditions in models_conditions:
+        name = _archive_rows(
+            model,
+            get_conditions,
+            name=f"{model._meta.label_lower}/{stamp}.jsonl.gz",
+            progress=(
+                (lambda deleted, model=model: progress(model, deleted)) if progress else None
+            ),
+            **kwargs,
+        )
+        if name:
+            archived.append(name)
+
+    return archived
+
+
+def restore(
+    names: Iterable[str],
+    *,
+    storage: Union["Storage", None] = None,
+    batch_size: int = 1000,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Imports files created by [pghistory.archive.archive][].
+
+    Rows are inserted as they were archived, ignoring triggers of the
+    model. Rows that already exist are skipped, so files can safely be imported
+    more than once.
+
+    Args:
+        names: The names of the files in the archive storage.
+        storage: The storage of the files. Defaults to `settings.PGHISTORY_ARCHIVE_STORAGE`.
+        batch_size: The maximum number of rows inserted in a batch.
+        using: The database.
+
+    Returns:
+        The number of restored rows.
+    """
+    storage = _get_storage(storage)
+    connection = connections[using]
+    restored = 0
+    for name in names:
+        model = apps.get_model(name.split("/")[0])
+        fields = model._meta.concrete_fields
+        ignore = [
+            f"{model._meta.label}:{trigger.name}"
+            for trigger in getattr(model._meta, "triggers", [])
+        ]
+        columns = ", ".join(f'"{field.column}"' for field in fields)
+        placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+        with storage.open(name, "rb") as file, gzip.open(file, "rt", encoding="utf-8") as f:
+            rows = (json.loads(line) for line in f)
+            while batch := list(itertools.islice(rows, batch_size)):
+                values = [
+                    field.get_db_prep_save(field.to_python(row[field.attname]), connection)
+                    for row in batch
+                    for field in fields
+                ]
+                with pgtrigger.ignore(*ignore, databases=[using]) if ignore else nullcontext():
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f'INSERT INTO "{model._meta.db_table}" ({columns})'
+                            f" VALUES {', '.join([placeholders] * len(batch))}"
+                            " ON CONFLICT DO NOTHING",
+                            values,
+                        )
+                        restored += cursor.rowcount
+
+    return restored
@@ -0,0 +1,469 @@
+import collections
+import datetime as dt
+import json
+import struct
+import time
+from typing import Callable, Union
+
+import pgtrigger
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from pghistory import core, trigger
+
+# Timestamps of the logical replication protocol are microseconds since this epoch
+_pg_epoch = dt.datetime(2000, 1, 1, tzinfo=dt.timezone.utc)
+
+# Unchanged values of TOASTed columns aren't sent for updates
+_unchanged = object()
+
+# The key of the advisory lock that serializes drainers
+_drain_lock_key = 0x70676864  # "pghd"
+
+
+def _drain_batch(*, batch_size, using):
+    """
+    Moves a batch of the oldest queued events into their event tables in a
+    transaction. Drainers are serialized with an advisory lock since diff and
+    delta triggers need the previous events of an object to be inserted first.
+    """
+    from pghistory.models import EventQueue  # noqa
+
+    queue_table = EventQueue._meta.db_table
+    with transaction.atomic(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_drain_lock_key])
+            cursor.execute(
+                f"""
+                SELECT id, event_model
+                FROM "{queue_table}"
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+                """,
+                [batch_size],
+            )
+            queued = collections.defaultdict(list)
+            for pk, label in cursor.fetchall():
+                queued[label].append(pk)
+
+            for label, pks in queued.items():
+                event_model = apps.get_model(label)
+                event_table = event_model._meta.db_table
+                cols = [
+                    f'"{field.column}"'
+                    for field in event_model._meta.concrete_fields
+                    if not isinstance(field, models.AutoField)
+                ]
+                cursor.execute(
+                    f"""
+                    INSERT INTO "{event_table}" ({", ".join(cols)})
+                    SELECT {", ".join(f"_event.{col}" for col in cols)}
+                    FROM "{queue_table}" _queued
+                    CROSS JOIN JSONB_POPULATE_RECORD(NULL::"{event_table}", _queued."row") _event
+                    WHERE _queued.id = ANY(%s)
+                    ORDER BY _queued.id
+                    """,
+                    [pks],
+                )
+
+            drained = [pk for pks in queued.values() for pk in pks]
+            cursor.execute(f'DELETE FROM "{queue_table}" WHERE id = ANY(%s)', [drained])
+
+    return len(drained)
+
+
+def drain(
+    *,
+    batch_size: int = 1000,
+    sleep: float = 0,
+    progress: Union[Callable[[int], None], None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Moves the events of event models with asynchronous capture from the event
+    queue into their event tables until the queue is empty.
+
+    Events are moved in batches ordered by the time they were queued, each
+    in its own transaction. Concurrent drainers wait for each other so that
+    events are inserted in the order they were queued.
+
+    Args:
+        batch_size: The maximum number of events moved in a batch.
+        sleep: The number of seconds to sleep between batches.
+        progress: Called with the total number of moved events after every batch.
+        using: The database.
+
+    Returns:
+        The number of moved events.
+    """
+    drained = 0
+    while True:
+        batch = _drain_batch(batch_size=batch_size, using=using)
+        drained += batch
+        if batch and progress:
+            progress(drained)
+
+        if batch < batch_size:
+            break
+
+        time.sleep(sleep)
+
+    return drained
+
+
+class _Message:
+    """Reads a message of the pgoutput logical replication protocol"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, length):
+        value = self.data[self.pos : self.pos + length]
+        self.pos += length
+        return value
+
+    def read_string(self):
+        end = self.data.index(b"\0", self.pos)
+        value = self.data[self.pos : end].decode()
+        self.pos = end + 1
+        return value
+
+    def read_tuple(self):
+        (num_cols,) = self.read("!h")
+        values = []
+        for _ in range(num_cols):
+            (kind,) = self.read("!c")
+            if kind == b"t":
+                (length,) = self.read("!i")
+                values.append(self.read_bytes(length).decode())
+            elif kind == b"n":
+                values.append(None)
+            else:
+                values.append(_unchanged)
+
+        return values
+
+
+def _get_logical_event_models():
+    """Returns event models captured with logical replication by tracked table"""
+    tables = collections.defaultdict(list)
+    for event_model in core.event_models():
+        if event_model.pgh_capture == "logical":
+            tables[event_model.pgh_tracked_model._meta.db_table].append(event_model)
+
+    return tables
+
+
+def _get_replication_error(cursor):
+    """
+    Returns why the database doesn't support logical capture, if it doesn't.
+    The `messages` option of `pgoutput` requires Postgres 14
+    """
+    cursor.execute(
+        "SELECT current_setting('server_version_num')::INT, current_setting('wal_level')"
+    )
+    version, wal_level = cursor.fetchone()
+    if version < 140000:
+        return "Logical capture requires Postgres 14 or later."
+    elif wal_level != "logical":
+        return "Logical capture requires wal_level = logical."
+
+    return None
+
+
+def setup_replication(
+    *,
+    slot: str = "pghistory",
+    publication: str = "pghistory",
+    using: str = DEFAULT_DB_ALIAS,
+):
+    """
+    Sets up logical replication of the tables tracked by event models with
+    logical capture.
+
+    The tables are published with a full replica identity so that the old rows
+    of updates and deletes are replicated. A logical replication slot that uses
+    the `pgoutput` plugin is created if it doesn't exist. Changes are retained
+    by the slot from the moment it is created.
+
+    Logical capture requires Postgres 14 or later running with `wal_level = logical`.
+    A `RuntimeError` is raised otherwise.
+
+    Args:
+        slot: The name of the logical replication slot.
+        publication: The name of the publication.
+        using: The database.
+    """
+    tables = sorted(_get_logical_event_models())
+    if not tables:
+        raise ValueError('No event models use capture="logical".')
+
+    quoted_tables = ", ".join(f'"{table}"' for table in tables)
+    with connections[using].cursor() as cursor:
+        error = _get_replication_error(cursor)
+        if error:
+            raise RuntimeError(error)
+
+        for table in tables:
+            cursor.execute(f'ALTER TABLE "{table}" REPLICA IDENTITY FULL')
+
+        cursor.execute(
+            "SELECT EXISTS (SELECT FROM pg_publication WHERE pubname = %s)", [publication]
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute(f'ALTER PUBLICATION "{publication}" SET TABLE {quoted_tables}')
+        else:
+            cursor.execute(f'CREATE PUBLICATION "{publication}" FOR TABLE {quoted_tables}')
+
+        cursor.execute(
+            "SELECT EXISTS ("
+            " SELECT FROM pg_replication_slots"
+            " WHERE slot_name = %s AND database = CURRENT_DATABASE()"
+            ")",
+            [slot],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute("SELECT pg_create_logical_replication_slot(%s, 'pgoutput')", [slot])
+
+
+def _decode_changes(rows, relations):
+    """
+    Decodes rows of pgoutput messages into the changes of tracked tables along
+    with the context and commit time of their transaction
+    """
+    changes = []
+    context = commit_time = None
+    for _, _, data in rows:
+        message = _Message(bytes(data))
+        (kind,) = message.read("!c")
+        if kind == b"B":
+            _, timestamp, _ = message.read("!qqi")
+            commit_time = _pg_epoch + dt.timedelta(microseconds=timestamp)
+            context = None
+        elif kind == b"M":
+            message.read("!bq")
+            prefix = message.read_string()
+            (length,) = message.read("!i")
+            if prefix == "pghistory.context":
+                context = json.loads(message.read_bytes(length))
+        elif kind == b"R":
+            (relid,) = message.read("!I")
+            message.read_string()
+            table = message.read_string()
+            _, num_cols = message.read("!bh")
+            columns = []
+            for _ in range(num_cols):
+                message.read("!b")
+                columns.append(message.read_string())
+                message.read("!ii")
+
+            relations[relid] = (table, columns)
+        elif kind in (b"I", b"U", b"D"):
+            (relid,) = message.read("!I")
+            (marker,) = message.read("!c")
+            old = new = None
+            if kind == b"I":
+                new = message.read_tuple()
+            elif kind == b"U":
+                if marker in (b"K", b"O"):
+                    old = message.read_tuple()
+                    message.read("!c")
+
+                new = message.read_tuple()
+                if old:
+                    new = [o if n is _unchanged else n for o, n in zip(old, new)]
+            else:
+                old = message.read_tuple()
+
+            operation = {b"I": "INSERT", b"U": "UPDATE", b"D": "DELETE"}[kind]
+            table, columns = relations[relid]
+            changes.append((table, operation, columns, old, new, context, commit_time))
+
+    return changes
+
+
+def _get_trigger_name(tracker):
+    return getattr(tracker, "trigger_name", None) or ""
+
+
+def _get_event_trigger(event_model, tracker):
+    """Returns the event trigger of a tracker, which renders the values and condition of events"""
+    return trigger.Event(
+        event_model=event_model,
+        label=tracker.label,
+        name=tracker.trigger_name,
+        row=tracker.row,
+        operation=tracker.operation,
+        condition=tracker.condition,
+        level=pgtrigger.Row,
+    )
+
+
+def _insert_events(cursor, event_model, tracker, changes):
+    """
+    Inserts the events of a tracker for a batch of changes. The old and new rows
+    of changes are cast to the tracked table so that the trigger condition and
+    values of the tracker can be used.
+    """
+    tracked_table = event_model.pgh_tracked_model._meta.db_table
+    event_trigger = _get_event_trigger(event_model, tracker)
+    values = event_trigger.get_values(event_trigger.row)
+    values["pgh_created_at"] = "_change.pgh_created_at"
+    if "pgh_context_id" in values:
+        values["pgh_context_id"] = "_change.pgh_context_id"
+    if "pgh_context" in values:
+        values["pgh_context"] = "_change.pgh_context_metadata"
+
+    condition = event_trigger.render_condition(event_trigger.event_model.pgh_tracked_model)
+    condition = condition.replace("WHEN", "WHERE", 1)
+
+    rows, params = [], []
+    for index, (_, _, columns, old, new, context, commit_time) in enumerate(changes):
+        row = f'ROW({", ".join(["%s"] * len(columns))})::"{tracked_table}"'
+        rows.append(f"(%s, {row}, {row}, %s::UUID, %s::JSONB, %s::TIMESTAMPTZ)")
+        params.extend(
+            [
+                index,
+                *(old or [None] * len(columns)),
+                *(new or [None] * len(columns)),
+                context["id"] if context else None,
+                json.dumps(context["metadata"]) if context else None,
+                commit_time,
+            ]
+        )
+
+    cursor.execute(
+        f"""
+        INSERT INTO "{event_model._meta.db_table}" ({", ".join(f'"{col}"' for col in values)})
+        SELECT {", ".join(values.values())}
+        FROM (VALUES {", ".join(rows)}) _change(
+            pgh_index, pgh_old, pgh_new, pgh_context_id, pgh_context_metadata, pgh_created_at
+        )
+        CROSS JOIN LATERAL (SELECT (_change.pgh_old).*) OLD
+        CROSS JOIN LATERAL (SELECT (_change.pgh_new).*) NEW
+        {condition}
+        ORDER BY _change.pgh_index
+        """,
+        params,
+    )
+    return cursor.rowcount
+
+
+def _create_events(cursor, changes):
+    """
+    Creates the events of decoded changes in order. Consecutive changes that
+    create events of the same tracker are inserted with a single statement.
+    """
+    from pghistory.models import Context  # noqa
+
+    contexts = {
+        context["id"]: (context["metadata"], commit_time)
+        for _, _, _, _, _, context, commit_time in changes
+        if context
+    }
+    if contexts:
+        cursor.execute(
+            f"""
+            INSERT INTO "{Context._meta.db_table}" (id, metadata, created_at, updated_at)
+            VALUES {", ".join(["(%s::UUID, %s::JSONB, %s, %s)"] * len(contexts))}
+            ON CONFLICT (id) DO UPDATE
+                SET metadata = EXCLUDED.metadata, updated_at = EXCLUDED.updated_at
+            """,
+            [
+                param
+                for id, (metadata, commit_time) in contexts.items()
+                for param in (id, json.dumps(metadata), commit_time, commit_time)
+            ],
+        )
+
+    event_models = _get_logical_event_models()
+    created = 0
+    batch_key, batch = None, []
+    for change in [*changes, None]:
+        keys = []
+        if change:
+            table, operation = change[:2]
+            keys = [
+                (event_model, tracker)
+                for event_model in event_models.get(table, [])
+                # Trackers are ordered like the triggers that would create their events
+                for tracker in sorted(event_model.pgh_trackers or [], key=_get_trigger_name)
+                if isinstance(tracker, core.RowEvent)
+                and operation in str(tracker.operation).split(" OR ")
+            ]
+
+        for key in keys or [None]:
+            if batch and key != batch_key:
+                created += _insert_events(cursor, *batch_key, batch)
+                batch = []
+
+            if key:
+                batch_key = key
+                batch.append(change)
+
+    return created
+
+
+def replicate(
+    *,
+    slot: str = "pghistory",
+    publication: str = "pghistory",
+    batch_size: int = 1000,
+    progress: Union[Callable[[int], None], None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Creates events of event models with logical capture from the changes in a
+    logical replication slot until all changes are consumed.
+
+    Changes are read in batches of whole transactions. Events of each batch
+    are inserted in a transaction and the slot is then advanced past the batch.
+    Context is read from messages emitted by [pghistory.context][]. The
+    creation time of events is the commit time of their transaction.
+
+    Use [pghistory.capture.setup_replication][] to create the slot.
+
+    Args:
+        slot: The name of the logical replication slot.
+        publication: The name of the publication.
+        batch_size: The number of changes after which a batch ends.
+        progress: Called with the total number of created events after every batch.
+        using: The database.
+
+    Returns:
+        The number of created events.
+    """
+    relations = {}
+    created = 0
+    while True:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT lsn, xid, data
+                FROM pg_logical_slot_peek_binary_changes(
+                    %s, NULL, %s,
+                    'proto_version', '1', 'publication_names', %s, 'messages', 'true'
+                )
+                """,
+                [slot, batch_size, publication],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            with transaction.atomic(using):
+                created += _create_events(cursor, _decode_changes(rows, relations))
+
+            cursor.execute("SELECT pg_replication_slot_advance(%s, %s)", [slot, rows[-1][0]])
+
+        if progress:
+            progress(created)
+
+    return created
@@ -1,5 +1,6 @@
 """Core way to access configuration"""
 
+import functools
 from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
 
 from django.apps import apps
@@ -10,6 +11,7 @@ from django.utils.module_loading import import_string
 from pghistory import constants
 
 if TYPE_CHECKING:
+    from django.core.files.storage import Storage
     from django.core.serializers.json import DjangoJSONEncoder
     from django.db.models import QuerySet
     from django.db.models.base import ModelBase
@@ -39,6 +41,88 @@ def append_only() -> bool:
     return getattr(settings, "PGHISTORY_APPEND_ONLY", False)
 
 
+def store_diff() -> bool:
+    """If event models store the diff with the previous event by default.
+
+    Returns:
+        `True` if event models should store diffs by default.
+    """
+    return getattr(settings, "PGHISTORY_STORE_DIFF", False)
+
+
+def created_at_index() -> bool:
+    """If event models have an index on `pgh_created_at` and `pgh_id` by default.
+
+    Returns:
+        `True` if event models should be indexed by creation time by default.
+    """
+    return getattr(settings, "PGHISTORY_CREATED_AT_INDEX", False)
+
+
+def storage() -> str:
+    """How event models store tracked fields by default.
+
+    Returns:
+        `"snapshot"` if every tracked field is stored for every event or `"delta"`
+        if only the changed fields are stored.
+    """
+    return getattr(settings, "PGHISTORY_STORAGE", "snapshot")
+
+
+def capture() -> str:
+    """How events of event models are captured by default.
+
+    Returns:
+        `"sync"` to store events in the event tables, `"async"` to store them in a queue,
+        or `"logical"` to create them from logical replication.
+    """
+    return getattr(settings, "PGHISTORY_CAPTURE", "sync")
+
+
+def delta_checkpoint_interval() -> int:
+    """The number of events between full snapshots of delta event models.
+
+    Returns:
+        The checkpoint interval.
+    """
+    return getattr(settings, "PGHISTORY_DELTA_CHECKPOINT_INTERVAL", 20)
+
+
+def cache_context() -> bool:
+    """If context is only upserted once per transaction by triggers.
+
+    When `True`, the `_pgh_attach_context()` function remembers the context ID
+    and metadata it last stored in the transaction and skips redundant upserts.
+
+    Returns:
+        `True` if context upserts are cached in the transaction.
+    """
+    return getattr(settings, "PGHISTORY_CACHE_CONTEXT", True)
+
+
+def context_injection_cache() -> bool:
+    """If context is only injected into SQL when it changes in a transaction.
+
+    When `True`, [pghistory.context][] only prepends the context variables to
+    a statement if the context changed or a new transaction started since
+    the variables were last set on the connection.
+
+    Returns:
+        `True` if injected context is cached in the transaction.
+    """
+    return getattr(settings, "PGHISTORY_CONTEXT_INJECTION_CACHE", True)
+
+
+def context_injection_writes_only() -> bool:
+    """If context is only injected into SQL statements that write data.
+
+    Returns:
+        `True` if context is only injected before `INSERT`, `UPDATE`, `DELETE`,
+        `COPY`, and other writing statements.
+    """
+    return getattr(settings, "PGHISTORY_CONTEXT_INJECTION_WRITES_ONLY", False)
+
+
 def middleware_methods() -> Tuple[str]:
     """
     Methods tracked by the pghistory middleware.
@@ -51,6 +135,11 @@ def middleware_methods() -> Tuple[str]:
     )
 
 
+@functools.lru_cache(maxsize=None)
+def _import_json_encoder(path: str) -> "DjangoJSONEncoder":
+    return import_string(path)
+
+
 def json_encoder() -> "DjangoJSONEncoder":
     """The JSON encoder when tracking context
 
@@ -62,11 +151,25 @@ def json_encoder() -> "DjangoJSONEncoder":
     )
 
     if isinstance(encoder, str):  # pragma: no branch
-        encoder = import_string(encoder)
+        encoder = _import_json_encoder(encoder)
 
     return encoder
 
 
+def archive_storage() -> Union["Storage", None]:
+    """The storage of archived events.
+
+    Returns:
+        The storage instance, or `None` if no storage is configured.
+    """
+    storage = getattr(settings, "PGHISTORY_ARCHIVE_STORAGE", None)
+
+    if isinstance(storage, str):
+        storage = import_string(storage)()
+
+    return storage
+
+
 def base_model() -> "ModelBase":
     """The base model for event models.
 
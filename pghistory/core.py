@@ -3,13 +3,14 @@
 import copy
 import re
 import sys
-from typing import TYPE_CHECKING, Any, Dict, List, Type, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Type, Union
 
 import pgtrigger
 import pgtrigger.core
 from django.apps import apps
 from django.db import connections, models
 from django.db.models import sql
+from django.db.models.expressions import RawSQL
 from django.db.models.fields.related import RelatedField
 from django.db.models.sql import compiler
 from django.utils.module_loading import import_string
@@ -18,27 +19,14 @@ from django.utils.text import slugify
 from pghistory import config, constants, trigger, utils
 
 if TYPE_CHECKING:
-    from pghistory import ContextForeignKey, ContextJSONField, ContextUUIDField, ObjForeignKey
-
-if utils.psycopg_maj_version == 2:
-    from psycopg2.extensions import AsIs as Literal
-elif utils.psycopg_maj_version == 3:
-    import psycopg.adapt
-
-    class Literal:
-        def __init__(self, val):
-            self.val = val
-
-    class LiteralDumper(psycopg.adapt.Dumper):
-        def dump(self, obj):
-            return obj.val.encode("utf-8")
-
-        def quote(self, obj):
-            return self.dump(obj)
-
-else:
-    raise AssertionError
-
+    from pghistory import (
+        ContextForeignKey,
+        ContextJSONField,
+        ContextUUIDField,
+        ObjForeignKey,
+        Retention,
+        TimePartition,
+    )
 
 _registered_trackers = {}
 
@@ -79,12 +67,19 @@ class ManualEvent(Tracker):
 
 
 class RowEvent(Tracker):
-    """For tracking an event automatically based on row-level changes."""
+    """For tracking an event automatically based on row-level changes.
+
+    By default, a row-level trigger inserts one event for every changed row.
+    Use `level=pghistory.Statement` to instead install a statement-level trigger
+    that inserts all events of a statement at once using transition tables.
+    """
 
     condition: Union[pgtrigger.Condition, None] = constants.UNSET
     operation: pgtrigger.Operation = None
     row: str = None
     trigger_name: str = None
+    level: pgtrigger.Level = pgtrigger.Row
+    coalesce: Union[str, None] = None
 
     def __init__(
         self,
@@ -94,6 +89,7 @@ class RowEvent(Tracker):
         operation: pgtrigger.Operation = None,
         row: str = None,
         trigger_name: str = None,
+        level: pgtrigger.Level = None,
     ):
         super().__init__(label=label)
 
@@ -101,6 +97,7 @@ class RowEvent(Tracker):
         self.operation = operation or self.operation
         self.row = row or self.row
         self.trigger_name = trigger_name or self.trigger_name or f"{self.label}_{self.operation}"
+        self.level = level or self.level
 
         if self.condition is constants.UNSET:
             self.condition = pgtrigger.AnyChange() if self.operation == pgtrigger.Update else None
@@ -115,7 +112,18 @@ class RowEvent(Tracker):
         if not self.operation:  # pragma: no cover
             raise ValueError("Must provide operation to RowEvent")
 
+        if self.level == pgtrigger.Statement and self.operation not in (
+            pgtrigger.Insert,
+            pgtrigger.Update,
+            pgtrigger.Delete,
+        ):  # pragma: no cover
+            raise ValueError("Statement-level events must have a single operation")
+
     def add_event_trigger(self, event_model):
+        if event_model.pgh_capture == "logical":
+            # Events are created from the logical replication stream
+            return
+
         pgtrigger.register(
             trigger.Event(
                 event_model=event_model,
@@ -124,6 +132,8 @@ class RowEvent(Tracker):
                 row=self.row,
                 operation=self.operation,
                 condition=self.condition,
+                level=self.level,
+                coalesce=self.coalesce,
             )
         )(event_model.pgh_tracked_model)
 
@@ -161,11 +171,67 @@ class UpdateEvent(RowEvent):
 
     All of this behavior can be overridden by supplying a label,
     a condition, or the row to snapshot.
+
+    Use `ignore_changes` to not fire when only the supplied fields change, such as
+    frequently-updated timestamps or counters. Ignored fields are still stored in events.
+
+    Use `coalesce="transaction"` to store at most one event per object and transaction.
+    The event is stored when the transaction commits. Events of the "new" row store
+    the committed state of the object and events of the "old" row store the state
+    before the first update.
     """
 
     label: str = "update"
     row: str = "NEW"
     operation: pgtrigger.Operation = pgtrigger.Update
+    ignore_changes: Union[List[str], None] = None
+
+    def __init__(
+        self,
+        label: str = None,
+        *,
+        condition: Union[pgtrigger.Condition, None] = constants.UNSET,
+        operation: pgtrigger.Operation = None,
+        row: str = None,
+        trigger_name: str = None,
+        level: pgtrigger.Level = None,
+        ignore_changes: Union[List[str], None] = None,
+        coalesce: Union[str, None] = None,
+    ):
+        super().__init__(
+            label=label,
+            condition=condition,
+            operation=operation,
+            row=row,
+            trigger_name=trigger_name,
+            level=level,
+        )
+        self.ignore_changes = ignore_changes or self.ignore_changes
+        self.coalesce = coalesce or self.coalesce
+
+        if self.ignore_changes and not isinstance(self.condition, pgtrigger.core._Change):
+            raise ValueError("ignore_changes requires a condition such as pghistory.AnyChange.")
+
+        if self.coalesce not in (None, "transaction"):
+            raise ValueError('coalesce must be "transaction".')
+        elif self.coalesce and self.level == pgtrigger.Statement:
+            raise ValueError("Statement-level events can't be coalesced.")
+
+    def setup(self, event_model):
+        # Exclude ignored fields from the change condition so that it fires when
+        # any of the other fields are distinct
+        if self.ignore_changes:
+            self.condition = copy.deepcopy(self.condition)
+            self.condition.exclude = sorted({*self.condition.exclude, *self.ignore_changes})
+
+        if self.coalesce and not hasattr(event_model, "pgh_obj"):
+            raise ValueError("Coalesced events require the pgh_obj field.")
+        elif self.coalesce and not hasattr(event_model, "pgh_xact_id"):
+            raise ValueError("Coalesced events require the pgh_xact_id field.")
+        elif self.coalesce and event_model.pgh_capture != "sync":
+            raise ValueError("Events captured asynchronously can't be coalesced.")
+
+        super().setup(event_model)
 
 
 class DeleteEvent(RowEvent):
@@ -337,6 +403,30 @@ def _get_append_only(append_only):
     return config.append_only() if append_only is constants.UNSET else append_only
 
 
+def _get_store_diff(store_diff):
+    return config.store_diff() if store_diff is constants.UNSET else store_diff
+
+
+def _get_created_at_index(created_at_index):
+    return config.created_at_index() if created_at_index is constants.UNSET else created_at_index
+
+
+def _get_storage(storage):
+    storage = config.storage() if storage is constants.UNSET else storage
+    if storage not in ("snapshot", "delta"):
+        raise ValueError('storage must be "snapshot" or "delta".')
+
+    return storage
+
+
+def _get_capture(capture):
+    capture = config.capture() if capture is constants.UNSET else capture
+    if capture not in ("sync", "async", "logical"):
+        raise ValueError('capture must be "sync", "async", or "logical".')
+
+    return capture
+
+
 def create_event_model(
     tracked_model: Type[models.Model],
     *trackers: Tracker,
@@ -346,6 +436,12 @@ def create_event_model(
     context_field: Union["ContextForeignKey", "ContextJSONField"] = constants.UNSET,
     context_id_field: "ContextUUIDField" = constants.UNSET,
     append_only: bool = constants.UNSET,
+    store_diff: bool = constants.UNSET,
+    created_at_index: bool = constants.UNSET,
+    storage: str = constants.UNSET,
+    capture: str = constants.UNSET,
+    partition_by: Union["TimePartition", None] = None,
+    retention: Union["Retention", None] = None,
     model_name: Union[str, None] = None,
     app_label: Union[str, None] = None,
     base_model: Type[models.Model] = None,
@@ -385,6 +481,23 @@ def create_event_model(
             field is used to track the UUID of the context. Use `None` to avoid using this
             field for denormalized context.
         append_only: True if the event model is protected against updates and deletes.
+        store_diff: True if the event model stores the diff with the previous event of
+            the tracked object in the `pgh_diff` field when events are created. The diff
+            is no longer computed when aggregating events. Requires the `obj_field`.
+        created_at_index: True if the event model has an index on `pgh_created_at` and
+            `pgh_id`, which is used when streaming events and filtering them by time.
+        storage: `"snapshot"` to store every tracked field for every event or `"delta"`
+            to only store the changed fields, with periodic full snapshots. Use
+            `snapshots()` on the event queryset to reconstruct full snapshots of delta
+            events. Requires the `obj_field`.
+        capture: `"sync"` to store events in the event table or `"async"` to store
+            them in a queue that's moved to the event table with the `pghistory_drain`
+            management command. Use `"logical"` to not install triggers and create
+            events from logical replication with the `pghistory_replicate` command.
+        partition_by: A [pghistory.TimePartition][] for partitioning the event table
+            by the `pgh_created_at` field.
+        retention: A [pghistory.Retention][] policy for pruning events with the
+            `pghistory_prune` management command.
         model_name: Use a custom model name when the event model is generated. Otherwise
             a default name based on the tracked model and fields will be created.
         app_label: The app_label for the generated event model. Defaults to the app_label
@@ -424,6 +537,10 @@ def create_event_model(
     context_field = _get_context_field(context_field)
     context_id_field = _get_context_id_field(context_id_field)
     append_only = _get_append_only(append_only)
+    store_diff = _get_store_diff(store_diff)
+    created_at_index = _get_created_at_index(created_at_index)
+    storage = _get_storage(storage)
+    capture = _get_capture(capture)
 
     model_name = model_name or _generate_event_model_name(base_model, tracked_model, fields)
     app_label = app_label or tracked_model._meta.app_label
@@ -447,14 +564,54 @@ def create_event_model(
             pgtrigger.Protect(name="append_only", operation=pgtrigger.Update | pgtrigger.Delete),
         ]
 
+    if store_diff:
+        if not obj_field:
+            raise ValueError("Event models must have an obj_field to store diffs.")
+
+        meta["triggers"] = [*meta.get("triggers", []), trigger.Diff(name="pgh_diff")]
+
+    if storage == "delta":
+        if not obj_field:
+            raise ValueError("Event models must have an obj_field to store deltas.")
+        elif store_diff:
+            raise ValueError("Event models cannot store both diffs and deltas.")
+
+        meta["triggers"] = [
+            *meta.get("triggers", []),
+            trigger.Delta(
+                name="pgh_delta", checkpoint_interval=config.delta_checkpoint_interval()
+            ),
+        ]
+
+    if created_at_index:
+        meta["indexes"] = [
+            *meta.get("indexes", []),
+            models.Index(fields=["pgh_created_at", "pgh_id"]),
+        ]
+
+    if partition_by:
+        partition_by = copy.copy(partition_by)
+        partition_by.name = partition_by.name or f"{app_label}_{model_name}_partition".lower()
+        meta["constraints"] = [*meta.get("constraints", []), partition_by]
+
+    history_fields = {field: _generate_history_field(tracked_model, field) for field in fields}
+    if storage == "delta":
+        # Unchanged fields are stored as NULL
+        for history_field in history_fields.values():
+            history_field.null = True
+
     class_attrs = {
         "__module__": models_module,
         "Meta": type("Meta", (), {"abstract": abstract, "app_label": app_label, **meta}),
         "pgh_tracked_model": tracked_model,
-        **{field: _generate_history_field(tracked_model, field) for field in fields},
+        "pgh_capture": capture,
+        **history_fields,
         **attrs,
     }
 
+    if retention:
+        class_attrs["pgh_retention"] = retention
+
     if isinstance(context_field, utils.JSONField) and context_id_field:
         class_attrs["pgh_context_id"] = context_id_field
 
@@ -464,6 +621,27 @@ def create_event_model(
     if obj_field:
         class_attrs["pgh_obj"] = obj_field
 
+    if store_diff:
+        class_attrs["pgh_diff"] = utils.JSONField(
+            null=True,
+            editable=False,
+            help_text="The diff with the previous event of the same object.",
+        )
+
+    if any(getattr(tracker, "coalesce", None) for tracker in trackers):
+        class_attrs["pgh_xact_id"] = models.BigIntegerField(
+            null=True,
+            editable=False,
+            help_text="The transaction ID of coalesced events.",
+        )
+
+    if storage == "delta":
+        class_attrs["pgh_changed"] = utils.JSONField(
+            null=True,
+            editable=False,
+            help_text="The changed fields. Null for full snapshots.",
+        )
+
     event_model = type(model_name, (base_model,), class_attrs)
     if not abstract:
         setattr(sys.modules[models_module], model_name, event_model)
@@ -471,18 +649,21 @@ def create_event_model(
     return event_model
 
 
-def ProxyField(proxy: str, field: Type[models.Field]):
+def ProxyField(proxy: str, field: Type[models.Field], *, indexed: bool = False):
     """
     Proxies a JSON field from a model and adds it as a field in the queryset.
 
     Args:
         proxy: The value to proxy, e.g. "user__email"
         field: The field that will be used to cast the resulting value
+        indexed: Create an expression index on the proxied value with the
+            `pghistory_indexes` management command.
     """
     if not isinstance(field, models.Field):  # pragma: no cover
         raise TypeError(f'"{field}" is not a Django model Field instace')
 
     field.pgh_proxy = proxy
+    field.pgh_proxy_indexed = indexed
     return field
 
 
@@ -494,6 +675,12 @@ def track(
     context_field: Union["ContextForeignKey", "ContextJSONField"] = constants.UNSET,
     context_id_field: "ContextUUIDField" = constants.UNSET,
     append_only: bool = constants.UNSET,
+    store_diff: bool = constants.UNSET,
+    created_at_index: bool = constants.UNSET,
+    storage: str = constants.UNSET,
+    capture: str = constants.UNSET,
+    partition_by: Union["TimePartition", None] = None,
+    retention: Union["Retention", None] = None,
     model_name: Union[str, None] = None,
     app_label: Union[str, None] = None,
     base_model: Type[models.Model] = None,
@@ -532,6 +719,22 @@ def track(
             track the UUID of the context. Use `None` to avoid using this field for denormalized
             context.
         append_only: True if the event model is protected against updates and deletes.
+        store_diff: True if the event model stores the diff with the previous event of the
+            tracked object in the `pgh_diff` field when events are created. The diff is no
+            longer computed when aggregating events. Requires the `obj_field`.
+        created_at_index: True if the event model has an index on `pgh_created_at` and
+            `pgh_id`, which is used when streaming events and filtering them by time.
+        storage: `"snapshot"` to store every tracked field for every event or `"delta"` to only
+            store the changed fields, with periodic full snapshots. Use `snapshots()` on the event
+            queryset to reconstruct full snapshots of delta events. Requires the `obj_field`.
+        capture: `"sync"` to store events in the event table or `"async"` to store them in a
+            queue that's moved to the event table with the `pghistory_drain` management command.
+            Use `"logical"` to not install triggers and create events from logical replication
+            with the `pghistory_replicate` command.
+        partition_by: A [pghistory.TimePartition][] for partitioning the event table by the
+            `pgh_created_at` field.
+        retention: A [pghistory.Retention][] policy for pruning events with the
+            `pghistory_prune` management command.
         model_name: Use a custom model name when the event model is generated. Otherwise a default
             name based on the tracked model and fields will be created.
         app_label: The app_label for the generated event model. Defaults to the app_label of the
@@ -553,6 +756,12 @@ def track(
             context_field=context_field,
             context_id_field=context_id_field,
             append_only=append_only,
+            store_diff=store_diff,
+            created_at_index=created_at_index,
+            storage=storage,
+            capture=capture,
+            partition_by=partition_by,
+            retention=retention,
             model_name=model_name,
             app_label=app_label,
             abstract=False,
@@ -566,16 +775,144 @@ def track(
     return _model_wrapper
 
 
+def _has_context_foreign_key(event_model: Type[models.Model]) -> bool:
+    return hasattr(event_model, "pgh_context") and isinstance(
+        event_model._meta.get_field("pgh_context"), models.ForeignKey
+    )
+
+
 class _InsertEventCompiler(compiler.SQLInsertCompiler):
     def as_sql(self, *args, **kwargs):
         ret = super().as_sql(*args, **kwargs)
-        assert len(ret) == 1
+        if not _has_context_foreign_key(self.query.model):
+            return ret
+
+        # Attach context once in a CTE that is shared by all rows of the statement
+        return [
+            (f"WITH _pgh_context (id) AS (SELECT _pgh_attach_context()) {sql}", params)
+            for sql, params in ret
+        ]
+
+
+def _get_context_values(event_model: Type[models.Model]) -> Dict[str, RawSQL]:
+    """Get the SQL expressions for the context fields of an event model"""
+    values = {}
+    if hasattr(event_model, "pgh_context"):
+        if _has_context_foreign_key(event_model):
+            # Django does not allow one to use F() objects to reference stored
+            # procedures, so the context is referenced from a CTE that is
+            # injected with a custom SQL compiler
+            values["pgh_context_id"] = RawSQL("(SELECT id FROM _pgh_context)", ())
+        elif isinstance(event_model._meta.get_field("pgh_context"), utils.JSONField):
+            values["pgh_context"] = RawSQL(
+                "COALESCE(NULLIF(CURRENT_SETTING('pghistory.context_metadata', TRUE), ''),"
+                " NULL)::JSONB",
+                (),
+            )
+        else:
+            raise AssertionError
+
+    if hasattr(event_model, "pgh_context_id") and isinstance(
+        event_model._meta.get_field("pgh_context_id"), models.UUIDField
+    ):
+        values["pgh_context_id"] = RawSQL(
+            "COALESCE(NULLIF(CURRENT_SETTING('pghistory.context_id', TRUE), ''), NULL)::UUID", ()
+        )
+
+    return values
+
+
+def _get_event_model(obj: models.Model, label: str) -> Type[models.Model]:
+    """Get the event model of an object's tracker"""
+    # Verify that the provided label is tracked
+    if (obj.__class__, label) not in _registered_trackers:
+        raise ValueError(
+            f'"{label}" is not a registered tracker label for model {obj._meta.object_name}.'
+        )
+
+    return _registered_trackers[(obj.__class__, label)]
+
+
+class _InsertEventPlan:
+    """The precompiled statement for inserting one event of an event model.
+
+    Compiling the insert with the ORM dominates the cost of creating an event,
+    so the SQL, the fields that are bound as parameters, and the converters of
+    the returned values are computed once per event model and database.
+    """
+
+    def __init__(self, event_model: Type[models.Model], connection):
+        self.event_model = event_model
+        self.tracked_attnames = [
+            field.attname
+            for field in event_model._meta.fields
+            if not field.name.startswith("pgh_")
+        ]
+        self.has_pgh_obj = hasattr(event_model, "pgh_obj")
+        self.context_values = _get_context_values(event_model)
+        self.fields = [
+            field for field in event_model._meta.fields if not isinstance(field, models.AutoField)
+        ]
+        self.param_fields = [
+            field for field in self.fields if field.attname not in self.context_values
+        ]
+
+        # Context expressions are compiled into the SQL. Other fields are
+        # bound as parameters
+        self.query = sql.InsertQuery(event_model)
+        self.query.insert_values(self.fields, [event_model(**self.context_values)])
+        compiler = self.get_compiler(connection)
+        compiler.returning_fields = event_model._meta.fields
+        ((self.sql, _),) = compiler.as_sql()
+        self.converters = compiler.get_converters(
+            [field.get_col(event_model._meta.db_table) for field in event_model._meta.fields]
+        )
+
+    def get_compiler(self, connection) -> "_InsertEventCompiler":
+        return _InsertEventCompiler(self.query, connection, using=connection.alias)
+
+    def build(self, obj: models.Model, label: str) -> models.Model:
+        """Build an unsaved event for an object"""
+        event_obj = self.event_model(
+            pgh_label=label,
+            **{attname: getattr(obj, attname) for attname in self.tracked_attnames},
+        )
+        if self.has_pgh_obj:
+            event_obj.pgh_obj = obj
+
+        return event_obj
+
+    def execute(self, event_obj: models.Model, connection) -> models.Model:
+        """Insert an event and populate it with the returned values"""
+        compiler = self.get_compiler(connection)
         params = [
-            param if field.name != "pgh_context" else Literal("_pgh_attach_context()")
-            for field, param in zip(self.query.fields, ret[0][1])
+            compiler.prepare_value(field, compiler.pre_save_val(field, event_obj))
+            for field in self.param_fields
         ]
+        with connection.cursor() as cursor:
+            cursor.execute(self.sql, params)
+            rows = [cursor.fetchone()]
 
-        return [(ret[0][0], params)]
+        if self.converters:
+            rows = compiler.apply_converters(rows, self.converters)
+
+        for field, val in zip(self.event_model._meta.fields, next(iter(rows))):
+            setattr(event_obj, field.attname, val)
+
+        event_obj._state.adding = False
+        event_obj._state.db = connection.alias
+        return event_obj
+
+
+_insert_event_plans = {}
+
+
+def _get_insert_event_plan(event_model: Type[models.Model], connection) -> _InsertEventPlan:
+    key = (event_model, connection.alias)
+    if key not in _insert_event_plans:
+        _insert_event_plans[key] = _InsertEventPlan(event_model, connection)
+
+    return _insert_event_plans[key]
 
 
 def create_event(obj: models.Model, *, label: str, using: str = "default") -> models.Model:
@@ -595,57 +932,70 @@ def create_event(obj: models.Model, *, label: str, using: str = "default") -> mo
     Returns:
         The created event model object
     """
-    # Verify that the provided label is tracked
-    if (obj.__class__, label) not in _registered_trackers:
-        raise ValueError(
-            f'"{label}" is not a registered tracker label for model {obj._meta.object_name}.'
-        )
+    connection = connections[using]
+    plan = _get_insert_event_plan(_get_event_model(obj, label), connection)
+    return plan.execute(plan.build(obj, label), connection)
 
-    event_model = _registered_trackers[(obj.__class__, label)]
-    event_model_kwargs = {
-        "pgh_label": label,
-        **{
-            field.attname: getattr(obj, field.attname)
-            for field in event_model._meta.fields
-            if not field.name.startswith("pgh_")
-        },
-    }
-    if hasattr(event_model, "pgh_obj"):
-        event_model_kwargs["pgh_obj"] = obj
-
-    event_obj = event_model(**event_model_kwargs)
-
-    # The event model is inserted manually with a custom SQL compiler
-    # that attaches the context using the _pgh_attach_context
-    # stored procedure. Django does not allow one to use F()
-    # objects to reference stored procedures, so we have to
-    # inject it with a custom SQL compiler here.
-    query = sql.InsertQuery(event_model)
-    query.insert_values(
-        [field for field in event_model._meta.fields if not isinstance(field, models.AutoField)],
-        [event_obj],
-    )
 
-    if utils.psycopg_maj_version == 3:
-        connections[using].connection.adapters.register_dumper(Literal, LiteralDumper)
+def bulk_create_events(
+    objs: Iterable[models.Model],
+    *,
+    label: str,
+    using: str = "default",
+    batch_size: Union[int, None] = None,
+) -> List[models.Model]:
+    """Manually create events for many objects.
 
-    vals = _InsertEventCompiler(query, connections[using], using=using).execute_sql(
-        event_model._meta.fields
-    )
+    Events are inserted with one multi-row statement per batch. Like
+    [pghistory.create_event][], events are automatically linked with any
+    context being tracked via [pghistory.context][]. Context is only attached
+    once per batch.
 
-    # Django <= 2.2 does not support returning fields from a bulk create,
-    # which requires us to fetch fields again to populate the context
-    if isinstance(vals, int):  # pragma: no cover
-        return event_model.objects.get(pgh_id=vals)
-    else:
-        # Django >= 3.1 returns the values as a list of one element
-        if isinstance(vals, list) and len(vals) == 1:  # pragma: no branch
-            vals = vals[0]
+    Args:
+        objs: Instances of models.
+        label: The event label.
+        using: The database
+        batch_size: The maximum number of events inserted per statement.
+            Defaults to inserting all events of a model in one statement.
 
-        for field, val in zip(event_model._meta.fields, vals):
-            setattr(event_obj, field.attname, val)
+    Raises:
+        ValueError: If the event label has not been registered for a model.
 
-        return event_obj
+    Returns:
+        The created event model objects in the order of the provided objects
+    """
+    connection = connections[using]
+    event_objs = []
+    event_objs_by_plan = {}
+    for obj in objs:
+        plan = _get_insert_event_plan(_get_event_model(obj, label), connection)
+        event_obj = plan.build(obj, label)
+        for attname, value in plan.context_values.items():
+            setattr(event_obj, attname, value)
+
+        event_objs.append(event_obj)
+        event_objs_by_plan.setdefault(plan, []).append(event_obj)
+
+    for plan, plan_event_objs in event_objs_by_plan.items():
+        max_batch_size = max(connection.ops.bulk_batch_size(plan.fields, plan_event_objs), 1)
+        plan_batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+
+        for i in range(0, len(plan_event_objs), plan_batch_size):
+            batch = plan_event_objs[i : i + plan_batch_size]
+            query = sql.InsertQuery(plan.event_model)
+            query.insert_values(plan.fields, batch)
+            rows = _InsertEventCompiler(query, connection, using=using).execute_sql(
+                plan.event_model._meta.fields
+            )
+
+            for event_obj, row in zip(batch, rows):
+                for field, val in zip(plan.event_model._meta.fields, row):
+                    setattr(event_obj, field.attname, val)
+
+                event_obj._state.adding = False
+                event_obj._state.db = using
+
+    return event_objs
 
 
 def event_models(
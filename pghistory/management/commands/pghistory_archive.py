@@ -0,0 +1,92 @@
+import datetime as dt
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from pghistory import archive, config
+
+
+def _get_storage(directory):
+    if directory:
+        return FileSystemStorage(location=directory)
+    elif config.archive_storage():
+        return config.archive_storage()
+    else:
+        raise CommandError("Provide --directory or set settings.PGHISTORY_ARCHIVE_STORAGE.")
+
+
+class Command(BaseCommand):
+    help = "Archive old events and unreferenced context to compressed files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "event_models",
+            nargs="*",
+            help="Labels of the event models to archive. Defaults to every event model.",
+        )
+        parser.add_argument(
+            "--before",
+            type=dt.datetime.fromisoformat,
+            help="Archive events created before this ISO 8601 datetime.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Archive events created more than this number of days ago.",
+        )
+        parser.add_argument(
+            "--no-contexts",
+            action="store_true",
+            help="Don't archive context that isn't referenced by any event.",
+        )
+        parser.add_argument(
+            "--directory",
+            help="The directory of the archived files. Defaults to the archive storage.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The maximum number of rows exported or deleted in a batch.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="The number of seconds to sleep between deleted batches.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to archive.",
+        )
+
+    def handle(self, *args, **options):
+        if (options["before"] is None) == (options["days"] is None):
+            raise CommandError("Provide either --before or --days.")
+
+        before = options["before"] or timezone.now() - dt.timedelta(days=options["days"])
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+
+        names = archive.archive(
+            before,
+            event_models=(
+                [apps.get_model(label) for label in options["event_models"]]
+                if options["event_models"]
+                else None
+            ),
+            contexts=not options["no_contexts"],
+            storage=_get_storage(options["directory"]),
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            progress=lambda model, deleted: self.stdout.write(
+                f"{model._meta.label}: archived {deleted} rows..."
+            ),
+            using=options["database"],
+        )
+        for name in names:
+            self.stdout.write(f"Archived {name}")
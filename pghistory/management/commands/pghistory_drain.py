@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from pghistory import capture
+
+
+class Command(BaseCommand):
+    help = "Move events of event models with asynchronous capture into their event tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The maximum number of events moved in a batch.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="The number of seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--continuous",
+            action="store_true",
+            help="Keep draining the queue instead of stopping when it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="The number of seconds to wait for new events when running continuously.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to drain.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            drained = capture.drain(
+                batch_size=options["batch_size"],
+                sleep=options["sleep"],
+                using=options["database"],
+            )
+            if drained or not options["continuous"]:
+                self.stdout.write(f"Drained {drained} events")
+
+            if not options["continuous"]:
+                break
+
+            time.sleep(options["interval"])  # pragma: no cover
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from pghistory import archive
+from pghistory.management.commands.pghistory_archive import _get_storage
+
+
+class Command(BaseCommand):
+    help = "Import events and context archived by pghistory_archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="+",
+            help="Names of the archived files in the archive storage.",
+        )
+        parser.add_argument(
+            "--directory",
+            help="The directory of the archived files. Defaults to the archive storage.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The maximum number of rows inserted in a batch.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to import into.",
+        )
+
+    def handle(self, *args, **options):
+        restored = archive.restore(
+            options["names"],
+            storage=_get_storage(options["directory"]),
+            batch_size=options["batch_size"],
+            using=options["database"],
+        )
+        self.stdout.write(f"Imported {restored} rows")
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, migrations
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+import pghistory.models
+
+
+class Command(BaseCommand):
+    help = "Create a migration with expression indexes of proxy fields declared with indexed=True."
+
+    def add_arguments(self, parser):
+        parser.add_argument("app_label", help="The app of the migration.")
+        parser.add_argument(
+            "--name",
+            default="pghistory_proxy_indexes",
+            help="The name of the migration.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the SQL of the indexes instead of creating a migration.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database used to render the SQL of the indexes.",
+        )
+
+    def handle(self, *args, **options):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        existing = [
+            str(operation.sql)
+            for migration in loader.disk_migrations.values()
+            for operation in migration.operations
+            if isinstance(operation, migrations.RunSQL)
+        ]
+
+        schema_editor = connections[options["database"]].schema_editor()
+        operations, app_labels = [], {options["app_label"]}
+        for model, index in pghistory.models._get_proxy_indexes(using=options["database"]):
+            if any(f'"{index.name}"' in sql for sql in existing):
+                continue
+
+            operations.append(
+                migrations.RunSQL(
+                    str(index.create_sql(model, schema_editor)),
+                    str(index.remove_sql(model, schema_editor)),
+                )
+            )
+            app_labels.add(model._meta.app_label)
+
+        if not operations:
+            self.stdout.write("No proxy indexes to create")
+            return
+
+        if options["dry_run"]:
+            for operation in operations:
+                self.stdout.write(f"{operation.sql};")
+            return
+
+        leaf_nodes = loader.graph.leaf_nodes(options["app_label"])
+        number = (
+            (MigrationAutodetector.parse_number(leaf_nodes[0][1]) or 0) + 1 if leaf_nodes else 1
+        )
+        migration = migrations.Migration(f"{number:04d}_{options['name']}", options["app_label"])
+        migration.dependencies = sorted(
+            {node for app_label in app_labels for node in loader.graph.leaf_nodes(app_label)}
+        )
+        migration.operations = operations
+
+        writer = MigrationWriter(migration)
+        with open(writer.path, "w") as f:
+            f.write(writer.as_string())
+
+        self.stdout.write(f"Created {writer.path}")
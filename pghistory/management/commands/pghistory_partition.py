@@ -0,0 +1,49 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+import pghistory.models
+from pghistory import partition
+
+
+class Command(BaseCommand):
+    help = "Create future partitions and expire old partitions of partitioned event models."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "event_models",
+            nargs="*",
+            help="Labels of the event models to maintain. Defaults to every partitioned model.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop expired partitions instead of detaching them.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to maintain.",
+        )
+
+    def handle(self, *args, **options):
+        if options["event_models"]:
+            event_models = [apps.get_model(label) for label in options["event_models"]]
+        else:
+            event_models = [
+                model
+                for model in apps.get_models()
+                if issubclass(model, pghistory.models.Event)
+                and partition.get_time_partition(model)
+            ]
+
+        for event_model in event_models:
+            created = partition.create_partitions(event_model, using=options["database"])
+            expired = partition.expire_partitions(
+                event_model, drop=options["drop"], using=options["database"]
+            )
+            for name in created:
+                self.stdout.write(f"Created {name}")
+
+            for name in expired:
+                self.stdout.write(f"{'Dropped' if options['drop'] else 'Detached'} {name}")
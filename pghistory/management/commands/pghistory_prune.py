@@ -0,0 +1,72 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from pghistory import core, retention
+
+
+class Command(BaseCommand):
+    help = "Prune events of event models with retention policies."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "event_models",
+            nargs="*",
+            help="Labels of the event models to prune. Defaults to every model with a policy.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The maximum number of rows deleted in a batch.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="The number of seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--contexts",
+            action="store_true",
+            help="Also delete context that isn't referenced by any event.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to prune.",
+        )
+
+    def handle(self, *args, **options):
+        if options["event_models"]:
+            event_models = [apps.get_model(label) for label in options["event_models"]]
+            for event_model in event_models:
+                if not event_model.pgh_retention:
+                    raise CommandError(f"{event_model._meta.label} has no retention policy.")
+        else:
+            event_models = [
+                event_model for event_model in core.event_models() if event_model.pgh_retention
+            ]
+
+        kwargs = {
+            "batch_size": options["batch_size"],
+            "sleep": options["sleep"],
+            "using": options["database"],
+        }
+        for event_model in event_models:
+            label = event_model._meta.label
+            deleted = retention.prune(
+                event_model,
+                progress=lambda deleted, label=label: self.stdout.write(
+                    f"{label}: deleted {deleted} events..."
+                ),
+                **kwargs,
+            )
+            self.stdout.write(f"{label}: deleted {deleted} events")
+
+        if options["contexts"]:
+            deleted = retention.prune_contexts(
+                progress=lambda deleted: self.stdout.write(f"Context: deleted {deleted} rows..."),
+                **kwargs,
+            )
+            self.stdout.write(f"Context: deleted {deleted} rows")
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from pghistory import capture
+
+
+class Command(BaseCommand):
+    help = "Create events of event models with logical capture from a logical replication slot."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--slot",
+            default="pghistory",
+            help="The name of the logical replication slot.",
+        )
+        parser.add_argument(
+            "--publication",
+            default="pghistory",
+            help="The name of the publication.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of changes after which a batch ends.",
+        )
+        parser.add_argument(
+            "--continuous",
+            action="store_true",
+            help="Keep consuming changes instead of stopping when the slot is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="The number of seconds to wait for new changes when running continuously.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to replicate.",
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            "slot": options["slot"],
+            "publication": options["publication"],
+            "using": options["database"],
+        }
+        capture.setup_replication(**kwargs)
+        while True:
+            created = capture.replicate(batch_size=options["batch_size"], **kwargs)
+            if created or not options["continuous"]:
+                self.stdout.write(f"Created {created} events")
+
+            if not options["continuous"]:
+                break
+
+            time.sleep(options["interval"])  # pragma: no cover
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from pghistory.models import Context
+
+
+def install_pgh_attach_context_func(apps, schema_editor):
+    Context.install_pgh_attach_context_func(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0006_delete_aggregateevent"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            install_pgh_attach_context_func, reverse_code=migrations.RunPython.noop
+        )
+    ]
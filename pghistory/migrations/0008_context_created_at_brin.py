@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:30
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0007_auto_20261018_1800"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="context",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"], name="pghistory_context_created_brin"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+import pghistory.utils
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0008_context_created_at_brin"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventQueue",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "event_model",
+                    models.TextField(help_text="The label of the event model."),
+                ),
+                (
+                    "row",
+                    pghistory.utils.JSONField(help_text="The row of the event table."),
+                ),
+            ],
+        ),
+    ]
@@ -1,15 +1,25 @@
+import copy
 import uuid
 import warnings
 
 import django
 from django.apps import apps
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.backends.utils import names_digest
+from django.db.models.expressions import Col, F, RawSQL
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
 from django.db.models.functions import Cast
+from django.db.models.lookups import Exact, Lookup
 from django.db.models.sql import Query
 from django.db.models.sql.compiler import SQLCompiler
+from django.db.models.sql.datastructures import BaseTable, Join
+from django.db.models.sql.where import AND, ExtraWhere, WhereNode
+from django.utils.functional import cached_property
 
-from pghistory import core, utils
+from pghistory import config, core, utils
+from pghistory import trigger as pghistory_trigger
 
 # This class is to preserve backwards compatibility with migrations
 PGHistoryJSONField = utils.JSONField
@@ -21,15 +31,50 @@ class Context(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     metadata = utils.JSONField(default=dict)
 
+    class Meta:
+        indexes = [
+            # Unreferenced context is found in ranges of creation time. A BRIN index
+            # is used since context is inserted in creation order and it adds
+            # little overhead to frequent context upserts
+            BrinIndex(fields=["created_at"], name="pghistory_context_created_brin")
+        ]
+
     @classmethod
-    def install_pgh_attach_context_func(cls, using=DEFAULT_DB_ALIAS):
+    def install_pgh_attach_context_func(cls, using=DEFAULT_DB_ALIAS, cache=None):
         """
         Installs a custom store procedure for upserting context
         for historical events. The upsert is aware of when tracking is
         enabled in the app (i.e. using pghistory.context())
 
-        This stored procedure is automatically installed in pghistory migration 0004.
+        When caching is enabled, the ID and a hash of the metadata of the last
+        upserted context are stored as a transaction-local setting. Subsequent
+        calls in the same transaction skip the upsert unless the context changes.
+        Caching defaults to `settings.PGHISTORY_CACHE_CONTEXT`.
+
+        This stored procedure is automatically installed in pghistory migration 0004
+        and re-installed in migration 0007.
+        """
+        cache = config.cache_context() if cache is None else cache
+
+        upsert = f"""
+            INSERT INTO {cls._meta.db_table} (id, metadata, created_at, updated_at)
+                VALUES (_pgh_context_id, _pgh_context_metadata, NOW(), NOW())
+                ON CONFLICT (id) DO UPDATE
+                    SET metadata = EXCLUDED.metadata,
+                        updated_at = EXCLUDED.updated_at;
         """
+        if cache:
+            upsert = f"""
+                _pgh_attached_context := _pgh_context_id::TEXT || ':' || MD5(
+                    _pgh_context_metadata::TEXT
+                );
+                IF _pgh_attached_context IS DISTINCT FROM
+                    CURRENT_SETTING('pghistory.attached_context', TRUE) THEN
+                    {upsert}
+                    PERFORM SET_CONFIG('pghistory.attached_context', _pgh_attached_context, TRUE);
+                END IF;
+            """
+
         with connections[using].cursor() as cursor:
             cursor.execute(
                 f"""
@@ -38,6 +83,7 @@ class Context(models.Model):
                     DECLARE
                         _pgh_context_id UUID;
                         _pgh_context_metadata JSONB;
+                        _pgh_attached_context TEXT;
                     BEGIN
                         BEGIN
                             SELECT INTO _pgh_context_id
@@ -47,11 +93,7 @@ class Context(models.Model):
                             EXCEPTION WHEN OTHERS THEN
                         END;
                         IF _pgh_context_id IS NOT NULL AND _pgh_context_metadata IS NOT NULL THEN
-                            INSERT INTO {cls._meta.db_table} (id, metadata, created_at, updated_at)
-                                VALUES (_pgh_context_id, _pgh_context_metadata, NOW(), NOW())
-                                ON CONFLICT (id) DO UPDATE
-                                    SET metadata = EXCLUDED.metadata,
-                                        updated_at = EXCLUDED.updated_at;
+                            {upsert}
                             RETURN _pgh_context_id;
                         ELSE
                             RETURN NULL;
@@ -62,58 +104,173 @@ class Context(models.Model):
             )
 
 
+class EventQueue(models.Model):
+    """
+    Events of event models with asynchronous capture that haven't been
+    moved to their event tables.
+
+    Event triggers insert rows of the event table as JSON. The queue is drained
+    into the event tables with the `pghistory_drain` management command.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    event_model = models.TextField(help_text="The label of the event model.")
+    row = utils.JSONField(help_text="The row of the event table.")
+
+
+def _get_proxy_path(model, proxy):
+    """
+    Splits a proxy into the path of the proxied JSON field and its keys.
+    Also returns the model of the JSON field
+    """
+    opts = model._meta
+    path, keys = [], proxy.split("__")
+    while keys:
+        proxied = opts.get_field(keys[0])
+        path.append(keys.pop(0))
+        if isinstance(proxied, utils.DjangoJSONField) or not proxied.is_relation:
+            break
+
+        opts = proxied.related_model._meta
+
+    return opts.model, path, keys
+
+
+def _get_proxy_expression(expression, keys, field):
+    """
+    Returns the expression of a proxied field. Values of JSON keys are extracted
+    as text and cast to the field
+    """
+    for key in keys[:-1]:
+        expression = KeyTransform(key, expression)
+
+    if keys:
+        expression = KeyTextTransform(keys[-1], expression)
+
+    return Cast(expression, output_field=field)
+
+
+class _ProxyJoinField:
+    """
+    The join field of a join on a proxied foreign key. The join is made with
+    a condition on the proxy expression instead of the joining columns
+    """
+
+    def __init__(self, join_field, condition):
+        self.join_field = join_field
+        self.condition = condition
+
+    def __getattr__(self, name):
+        return getattr(self.join_field, name)
+
+    def get_extra_restriction(self, *args):
+        extra = self.join_field.get_extra_restriction(*args)
+        return WhereNode([self.condition, extra], AND) if extra else self.condition
+
+
 class EventQueryCompiler(SQLCompiler):
-    def _get_cte(self):
+    def _get_proxy_expression(self, field):
+        _, path, keys = _get_proxy_path(self.query.model, field.pgh_proxy)
+        return _get_proxy_expression(F("__".join(path)), keys, field)
+
+    def _setup_proxy_expressions(self):
         """
-        Returns a CTE that selects from proxied fields
+        Resolves the expressions of proxied fields, adding the joins they need
+        to the query. Proxied fields are compiled as their expressions
         """
-        event_model = self.query.model
-
-        annotations = {
-            f"_{field.column}": Cast(field.pgh_proxy, output_field=field)
+        self.query = self.query.clone()
+        self.proxy_expressions = {
+            field: self._get_proxy_expression(field).resolve_expression(self.query)
             for field in self.proxy_fields
         }
-        values = [
-            field.name for field in event_model._meta.fields if not hasattr(field, "pgh_proxy")
-        ] + [f"_{field.column}" for field in self.proxy_fields]
-
-        qset = models.QuerySet(event_model).annotate(**annotations).values(*values)
 
-        sql, params = qset.query.as_sql(self, self.connection)
-        with self.connection.cursor() as cursor:
-            sql = cursor.mogrify(sql, params)
-            if isinstance(sql, bytes):  # psycopg 2/3 return different types
-                sql = sql.decode("utf-8")
-
-        for field in self.proxy_fields:
-            sql = sql.replace(f"_{field.column}", field.column)
-
-        sql = sql.replace("->", "->>")
-        return "WITH pgh_event_cte AS (\n" + sql + "\n)\n"
+        # Joins of proxy expressions are moved ahead of other joins since joins
+        # on proxied foreign keys reference them
+        aliases = []
+        for expression in self.proxy_expressions.values():
+            for col in expression.flatten():
+                alias = col.alias if isinstance(col, Col) else None
+                while alias and alias != self.query.base_table and alias not in aliases:
+                    aliases.insert(0, alias)
+                    alias = self.query.alias_map[alias].parent_alias
+
+        alias_map = self.query.alias_map
+        self.query.alias_map = {
+            alias: alias_map[alias] for alias in [self.query.base_table, *aliases, *alias_map]
+        }
 
     @property
     def proxy_fields(self):
         return [f for f in self.query.model._meta.fields if hasattr(f, "pgh_proxy")]
 
-    def as_sql(self, *args, **kwargs):
+    def _compile_snapshot_source(self, node):
         """
-        If there are proxied fields on the event model, return a select from a CTE.
-        Otherwise don't do anything special
+        Compiles the base table or a join of an event model that stores deltas
+        as the subquery of its reconstructed snapshots
         """
-        sql, params = super().as_sql(*args, **kwargs)
+        snapshot_sql = _get_snapshot_sql(self.query.model)
+        if isinstance(node, BaseTable):
+            return f"{snapshot_sql} {self.quote_name_unless_alias(node.table_alias)}", []
+
+        # Joins quote their table name with the quote cache of the compiler.
+        # The table is renamed so that aliases equal to the table name are kept
+        node = copy.copy(node)
+        node.table_name = f"_pgh_snapshot_{node.table_name}"
+        self.quote_cache[node.table_name] = snapshot_sql
+        return super().compile(node)
+
+    def compile(self, node):
+        proxy_expressions = getattr(self, "proxy_expressions", {})
+        if (
+            isinstance(node, Col)
+            and node.alias == self.query.base_table
+            and node.target in proxy_expressions
+        ):
+            return super().compile(proxy_expressions[node.target])
+        elif (
+            isinstance(node, (BaseTable, Join))
+            and self.query.snapshots
+            and node.table_name == self.query.model._meta.db_table
+            and _has_delta_storage(self.query.model)
+        ):
+            # Select from reconstructed snapshots instead of the stored deltas
+            return self._compile_snapshot_source(node)
+        elif (
+            isinstance(node, Join)
+            and node.parent_alias == self.query.base_table
+            and node.join_field in proxy_expressions
+        ):
+            # Joins on proxied foreign keys are made on the proxy expression
+            node = copy.copy(node)
+            node.join_cols = node.join_fields = ()
+            node.join_field = _ProxyJoinField(
+                node.join_field,
+                Exact(
+                    proxy_expressions[node.join_field],
+                    Col(node.table_alias, node.join_field.target_field),
+                ),
+            )
+
+        return super().compile(node)
 
+    def as_sql(self, *args, **kwargs):
+        """
+        If there are proxied fields on the event model, compile them as expressions
+        on the proxied values. Otherwise don't do anything special
+        """
         if any(self.proxy_fields):
             if django.VERSION < (3, 2):  # pragma: no cover
                 raise RuntimeError("Must use Django 3.2 or above to proxy fields on event models")
 
-            cte = self._get_cte()
-            sql = cte + sql.replace(f'"{self.query.model._meta.db_table}"', '"pgh_event_cte"')
+            self._setup_proxy_expressions()
 
-        return sql, params
+        return super().as_sql(*args, **kwargs)
 
 
 class EventQuery(Query):
-    """A query over an event CTE when proxy fields are used"""
+    """A query over events with support for proxy fields and delta snapshots"""
+
+    snapshots = False
 
     def get_compiler(self, *args, **kwargs):
         """
@@ -126,7 +283,7 @@ class EventQuery(Query):
 
 
 class EventQuerySet(models.QuerySet):
-    """QuerySet with support for proxy fields"""
+    """QuerySet with support for proxy fields and delta snapshots"""
 
     def __init__(self, model=None, query=None, using=None, hints=None):
         if query is None:
@@ -134,6 +291,16 @@ class EventQuerySet(models.QuerySet):
 
         super().__init__(model, query, using, hints)
 
+    def snapshots(self):
+        """
+        Reconstruct the full snapshots of event models that only store
+        the changed fields of events. Unchanged fields are filled in from
+        the previous events of the tracked object.
+        """
+        qs = self._chain()
+        qs.query.snapshots = True
+        return qs
+
 
 class PghEventModel:
     "A descriptor for accessing the pgh_event_model field on a tracked model"
@@ -160,6 +327,8 @@ class Event(models.Model):
     pgh_label = models.TextField(help_text="The event label.")
     pgh_trackers = None
     pgh_tracked_model = None
+    pgh_retention = None
+    pgh_capture = "sync"
 
     objects = EventQuerySet.as_manager()
 
@@ -186,6 +355,10 @@ class Event(models.Model):
                 " doesn't track every field."
             )
 
+        if _has_delta_storage(self.__class__) and self.pgh_changed is not None:
+            # Unchanged fields aren't stored in deltas
+            self = self.__class__.objects.using(using).snapshots().get(pk=self.pk)
+
         qset = models.QuerySet(model=self.pgh_tracked_model, using=using)
 
         pk = getattr(self, self.pgh_tracked_model._meta.pk.name)
@@ -241,6 +414,59 @@ class Event(models.Model):
             return errors
 
 
+def _has_stored_diff(event_model):
+    """True if the event model stores the diff with the previous event"""
+    return any(
+        isinstance(trigger, pghistory_trigger.Diff)
+        for trigger in getattr(event_model._meta, "triggers", [])
+    )
+
+
+def _has_delta_storage(event_model):
+    """True if the event model only stores the changed fields of events"""
+    return any(
+        isinstance(trigger, pghistory_trigger.Delta)
+        for trigger in getattr(event_model._meta, "triggers", [])
+    )
+
+
+def _get_snapshot_sql(event_model):
+    """
+    Returns a subquery that reconstructs the full snapshots of an event model
+    that stores deltas. Every unchanged field is read from the latest previous
+    event of the tracked object that changed it or is a full snapshot.
+    """
+    event_table = event_model._meta.db_table
+    obj_col = event_model._meta.get_field("pgh_obj").column
+    pk_col = event_model._meta.pk.column
+    columns = []
+    for field in event_model._meta.fields:
+        if hasattr(field, "pgh_proxy"):
+            continue
+        elif field.column.startswith("pgh_"):
+            columns.append(f'_snapshot."{field.column}"')
+        else:
+            columns.append(
+                f"""
+                (
+                    SELECT _delta."{field.column}"
+                    FROM "{event_table}" _delta
+                    WHERE _delta."{obj_col}" = _snapshot."{obj_col}"
+                        AND _delta."{pk_col}" <= _snapshot."{pk_col}"
+                        AND (_delta.pgh_changed IS NULL OR _delta.pgh_changed ? '{field.column}')
+                    ORDER BY _delta."{pk_col}" DESC
+                    LIMIT 1
+                ) AS "{field.column}"
+                """
+            )
+
+    return f'(SELECT {", ".join(columns)} FROM "{event_table}" _snapshot)'
+
+
+# Columns of the Events model that have the same name and type in every event table
+_pushdown_columns = ("pgh_id", "pgh_created_at", "pgh_label", "pgh_context_id")
+
+
 class EventsQueryCompiler(SQLCompiler):
     def _get_empty_select(self):
         """
@@ -347,6 +573,16 @@ class EventsQueryCompiler(SQLCompiler):
             [f"_pgh_obj_event.{field.column},\n" for field, _ in proxy_fields]
         )
 
+        # Proxy fields that aren't used by the outer query are null
+        null_context_columns_clause = "".join(
+            [
+                f"NULL::{field.rel_db_type(self.connection)} AS {field.column},\n"
+                for field, _ in proxy_fields
+                if not self._uses(field.column)
+            ]
+        )
+        proxy_fields = [(field, attr) for field, attr in proxy_fields if self._uses(field.column)]
+
         if not hasattr(event_model, "pgh_context"):
             context_id_column_clause = "NULL::UUID AS pgh_context_id"
             context_column_clause = "NULL::JSONB AS pgh_context"
@@ -372,10 +608,13 @@ class EventsQueryCompiler(SQLCompiler):
                     for field, attr in proxy_fields
                 ]
             )
-            context_join_clause = f"""
-                LEFT OUTER JOIN {Context._meta.db_table} _pgh_context
-                    ON _pgh_context.id = _event.pgh_context_id
-            """
+
+            # Context is only joined when the outer query uses it
+            if proxy_fields or self._uses("pgh_context"):
+                context_join_clause = f"""
+                    LEFT OUTER JOIN {Context._meta.db_table} _pgh_context
+                        ON _pgh_context.id = _event.pgh_context_id
+                """
         elif isinstance(event_model._meta.get_field("pgh_context"), utils.DjangoJSONField):
             context_column_clause = "pgh_context"
             annotated_context_columns_clause = "".join(
@@ -393,6 +632,14 @@ class EventsQueryCompiler(SQLCompiler):
         else:
             raise AssertionError
 
+        if not self._uses("pgh_context_id"):
+            context_id_column_clause = "NULL::UUID AS pgh_context_id"
+
+        if not self._uses("pgh_context"):
+            context_column_clause = "NULL::JSONB AS pgh_context"
+
+        annotated_context_columns_clause += null_context_columns_clause
+
         return (
             final_context_columns_clause,
             context_column_clause,
@@ -401,33 +648,182 @@ class EventsQueryCompiler(SQLCompiler):
             annotated_context_columns_clause,
         )
 
-    def _get_where_clause(self, event_model):
+    def _get_where_condition(self, event_model, alias="_event"):
+        """
+        Get the condition and params for the tracks() or references() filters.
+
+        Objects are bound as an array of their native type and querysets are
+        compiled as subqueries so that indices on the columns can be used.
+        """
         if self.references:
             rows = self.references
-            cols = [
-                field.column
+            fields = [
+                field
                 for field in event_model._meta.fields
                 if utils.related_model(field) == self.references_model
             ]
         elif self.tracks:
             rows = self.tracks
-            cols = [event_model._meta.get_field("pgh_obj").column]
+            fields = [event_model._meta.get_field("pgh_obj")]
         else:
-            return ""
+            return "", []
+
+        conditions, params = [], []
+        for field in fields:
+            target_field = field.target_field
+            if isinstance(rows, models.QuerySet):
+                subquery = rows.values_list(target_field.attname).query
+                sql, sql_params = subquery.get_compiler(connection=self.connection).as_sql()
+                conditions.append(f"{alias}.{field.column} IN ({sql})")
+                params.extend(sql_params)
+            else:
+                values = [
+                    target_field.get_db_prep_value(
+                        getattr(row, target_field.attname), self.connection
+                    )
+                    for row in rows
+                ]
+                conditions.append(
+                    f"{alias}.{field.column} = ANY(%s::{field.db_type(self.connection)}[])"
+                )
+                params.append(values)
 
-        if isinstance(rows, models.QuerySet) or len(rows) > 1:
-            opt = "IN"
-            # TODO: Use a subquery
-            pks = "','".join(f"{o.pk}" for o in rows)
-            pks = f"('{pks}')"
-        else:
-            opt = "="
-            pks = f"'{rows[0].pk}'"
+        return " OR ".join(conditions), params
+
+    def _get_keyset_condition(self, event_model):
+        """
+        Get the condition and params for rows after the keyset of a stream.
+
+        The keyset is (pgh_created_at, pgh_model, pgh_id). The redundant range on
+        pgh_created_at allows an index to be used.
+        """
+        if not self.query.after:
+            return "", []
+
+        created_at, model, pk = self.query.after
+        condition = f"""
+            _event.pgh_created_at >= %s
+            AND (_event.pgh_created_at, '{event_model._meta.label}'::TEXT, _event.pgh_id)
+                > (%s, %s::TEXT, %s)
+        """
+        return condition, [created_at, created_at, model, pk]
+
+    def _get_filter_lookups(self, node=None):
+        """
+        Get the lookups of the outer query that are always applied, i.e. the
+        lookups that aren't negated or combined with OR. Returns None for
+        lookups that can't be determined
+        """
+        node = self.query.where if node is None else node
+        if node.connector != AND or node.negated:
+            return [None]
+
+        lookups = []
+        for child in node.children:
+            if isinstance(child, WhereNode):
+                lookups.extend(self._get_filter_lookups(child))
+            else:
+                lookups.append(child)
+
+        return lookups
+
+    def _get_filter_conditions(self, event_model):
+        """
+        Get the conditions and params of outer filters that can be pushed into the
+        select of an event model.
+
+        Filters on pgh_* columns of the events table that are shared by every
+        event table and compared to plain values are pushed down. Returns whether all filters
+        were pushed down.
+        """
+        conditions, params, all_pushed = [], [], True
+        event_columns = {field.column for field in event_model._meta.concrete_fields}
+        for lookup in self._get_filter_lookups():
+            if (
+                isinstance(lookup, Lookup)
+                and isinstance(lookup.lhs, Col)
+                and lookup.lhs.alias == self.query.base_table
+                and lookup.lhs.target.column in _pushdown_columns
+                and lookup.lhs.target.column in event_columns
+                and not hasattr(lookup.rhs, "resolve_expression")
+            ):
+                sql, lookup_params = self.compile(
+                    lookup.relabeled_clone({lookup.lhs.alias: "_event"})
+                )
+                conditions.append(sql)
+                params.extend(lookup_params)
+            else:
+                all_pushed = False
+
+        return conditions, params, all_pushed
+
+    def _get_where_clause(self, event_model):
+        where_condition, params = self._get_where_condition(event_model)
+        keyset_condition, keyset_params = self._get_keyset_condition(event_model)
+        filter_conditions, filter_params, _ = self._get_filter_conditions(event_model)
+        conditions = [
+            f"({condition})"
+            for condition in (where_condition, keyset_condition, *filter_conditions)
+            if condition
+        ]
+        params = [*params, *keyset_params, *filter_params]
+        return ("WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    @cached_property
+    def used_columns(self):
+        """
+        The columns of the events CTE that are used by the outer query.
+        None when the columns can't be determined
+        """
+        query = self.query
+        if query.extra or query.extra_tables or query.extra_order_by or query.distinct_fields:
+            return None
+
+        columns = set()
+        for join in query.alias_map.values():
+            if isinstance(join, Join) and join.parent_alias == query.base_table:
+                columns.update(lhs_col for lhs_col, _ in join.join_cols)
+
+        nodes = [
+            *(expression for expression, _, _ in self.select),
+            *(expression for expression, _ in self.get_order_by()),
+            *(query.group_by if isinstance(query.group_by, tuple) else ()),
+            query.where,
+        ]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, Col):
+                if node.alias == query.base_table:
+                    columns.add(node.target.column)
+            elif isinstance(node, WhereNode):
+                nodes.extend(node.children)
+            elif isinstance(node, (Query, RawSQL, ExtraWhere)) or not hasattr(
+                node, "get_source_expressions"
+            ):
+                return None
+            else:
+                nodes.extend(expr for expr in node.get_source_expressions() if expr is not None)
 
-        return "WHERE " + " OR ".join(f"_event.{col} {opt} {pks}" for col in cols)
+        return columns
+
+    @cached_property
+    def keeps_table_order(self):
+        """
+        True if events are returned in the order of each event table. Events
+        don't need to be ordered when the outer query orders or aggregates them
+        """
+        return not (
+            self.get_order_by()
+            or self.query.group_by is not None
+            or any(getattr(expr, "contains_aggregate", False) for expr, _, _ in self.select)
+        )
+
+    def _uses(self, *columns):
+        """True if the outer query uses any of the columns of the events CTE"""
+        return self.used_columns is None or any(column in self.used_columns for column in columns)
 
     def _get_select(self, event_model):
-        where_clause = self._get_where_clause(event_model)
+        where_clause, params = self._get_where_clause(event_model)
 
         (
             final_context_columns_clause,
@@ -437,20 +833,135 @@ class EventsQueryCompiler(SQLCompiler):
             annotated_context_columns_clause,
         ) = self._get_context_clauses(event_model)
 
-        prev_data_clause = """
-            LAG(row_to_json(_event))
+        use_data = self._uses("pgh_data")
+        use_diff = self._uses("pgh_diff")
+
+        # Rows are serialized once without the pgh_* columns. The data of the
+        # previous event is only needed for diffs that aren't stored
+        pgh_columns = ", ".join(
+            f"'{field.column}'"
+            for field in event_model._meta.concrete_fields
+            if field.column.startswith("pgh_")
+        )
+        curr_data_clause = f"TO_JSONB(_event) - ARRAY[{pgh_columns}] AS _curr_data,"
+        prev_data_clause = ""
+        prev_params = []
+        window_clause = """
+            LAG(_pgh_obj_event._curr_data)
               OVER (
-                PARTITION BY _event.pgh_obj_id
-                ORDER BY _event.pgh_id
+                PARTITION BY _pgh_obj_event.pgh_obj_id
+                ORDER BY _pgh_obj_event.pgh_id
               ) AS _prev_data
         """
+        order_by_clause = "ORDER BY _event.pgh_id"
         pgh_obj_id_column_clause = "pgh_obj_id::TEXT"
+        event_table = event_model._meta.db_table
+        # Events are aggregated from full snapshots when only deltas are stored
+        event_source = (
+            _get_snapshot_sql(event_model) if _has_delta_storage(event_model) else event_table
+        )
+
+        filter_conditions, _, all_filters_pushed = self._get_filter_conditions(event_model)
+        if self.query.chunk_size or filter_conditions:
+            # When streaming or filtering, only some events are read from
+            # each table. The previous event is looked up for each row since a
+            # window would need to scan every event.
+            where_condition, prev_params = self._get_where_condition(event_model, alias="_prev")
+            window_clause = ""
+            prev_data_clause = f"""
+                (
+                  SELECT TO_JSONB(_prev) - ARRAY[{pgh_columns}]
+                  FROM {event_source} _prev
+                  WHERE _prev.pgh_obj_id = _event.pgh_obj_id
+                    AND _prev.pgh_id < _event.pgh_id
+                    {f"AND ({where_condition})" if where_condition else ""}
+                  ORDER BY _prev.pgh_id DESC
+                  LIMIT 1
+                ) AS _prev_data,
+            """
+
+        if self.query.chunk_size:
+            order_by_clause = "ORDER BY _event.pgh_created_at, _event.pgh_id"
+
+            # The chunk size can only limit the rows of each table when
+            # the events aren't filtered afterwards
+            if all_filters_pushed:
+                order_by_clause += f" LIMIT {int(self.query.chunk_size)}"
+
+        pgh_diff_clause = """
+            (
+              SELECT JSONB_OBJECT_AGG(curr.key, ARRAY[prev.value, curr.value])
+              FROM JSONB_EACH(_pgh_obj_event._curr_data) curr
+                JOIN JSONB_EACH(_pgh_obj_event._prev_data) prev ON curr.key = prev.key
+              WHERE curr.value != prev.value
+            )
+        """
+        # Diffs are computed from the previous data unless they are stored
+        compute_diff = use_diff
+        stored_diff_clause = ""
         if not hasattr(event_model, "pgh_obj_id"):
-            prev_data_clause = "NULL::JSONB AS _prev_data"
+            pgh_obj_id_column_clause = "NULL::TEXT AS pgh_obj_id"
+            compute_diff = use_diff = False
+        elif _has_stored_diff(event_model):
+            pgh_diff_clause = "_pgh_obj_event.pgh_diff"
+            stored_diff_clause = "_event.pgh_diff," if use_diff else ""
+            compute_diff = False
+
+        if not use_diff:
+            pgh_diff_clause = "NULL::JSONB"
+
+        if not compute_diff:
+            window_clause = prev_data_clause = ""
+            prev_params = []
+
+        pgh_data_clause = "NULLIF(_pgh_obj_event._curr_data, '{}')" if use_data else "NULL::JSONB"
+        if not use_data and not compute_diff:
+            curr_data_clause = ""
+
+        # Columns that the outer query doesn't use are null so that they aren't read
+        pgh_id_column_clause = (
+            "pgh_id" if window_clause or self._uses("pgh_id", "pgh_slug") else "NULL::BIGINT"
+        )
+        pgh_created_at_column_clause = (
+            "pgh_created_at" if self._uses("pgh_created_at") else "NULL::TIMESTAMPTZ"
+        )
+        pgh_label_column_clause = "pgh_label" if self._uses("pgh_label") else "NULL::TEXT"
+        if not window_clause and not self._uses("pgh_obj_id"):
             pgh_obj_id_column_clause = "NULL::TEXT AS pgh_obj_id"
 
-        event_table = event_model._meta.db_table
-        return f"""
+        if not self.query.chunk_size and not self.keeps_table_order:
+            order_by_clause = ""
+
+        source_clause = f"""
+            (
+              SELECT
+                {pgh_id_column_clause} AS pgh_id,
+                {pgh_created_at_column_clause} AS pgh_created_at,
+                {pgh_label_column_clause} AS pgh_label,
+                {curr_data_clause}
+                {annotated_context_columns_clause}
+                {prev_data_clause}
+                {stored_diff_clause}
+                {context_id_column_clause},
+                {context_column_clause},
+                {pgh_obj_id_column_clause}
+              FROM {event_source} _event
+              {context_join_clause}
+              {where_clause}
+              {order_by_clause}
+            ) _pgh_obj_event
+        """
+        if window_clause:
+            # The previous data is read from the serialized rows with a window
+            source_clause = f"""
+                (
+                  SELECT _pgh_obj_event.*, {window_clause}
+                  FROM {source_clause}
+                ) _pgh_obj_event
+            """
+
+        return (
+            f"""
             SELECT
               CONCAT('{event_model._meta.label}', ':', _pgh_obj_event.pgh_id) AS pgh_slug,
               _pgh_obj_event.pgh_id,
@@ -460,64 +971,70 @@ class EventsQueryCompiler(SQLCompiler):
               _pgh_obj_event.pgh_obj_id,
               '{event_model._meta.label}' AS pgh_model,
               '{event_model.pgh_tracked_model._meta.label}' AS pgh_obj_model,
-              (
-                  SELECT JSONB_OBJECT_AGG(filtered.key, filtered.value)
-                  FROM
-                    (
-                        SELECT key, value
-                        FROM JSONB_EACH(_pgh_obj_event._curr_data::JSONB)
-                    ) filtered
-                  WHERE filtered.key NOT LIKE 'pgh_%%'
-              ) AS pgh_data,
-              (
-                SELECT JSONB_OBJECT_AGG(curr.key, array[prev.value, curr.value])
-                FROM
-                  (
-                    SELECT key, value
-                    FROM JSONB_EACH(_pgh_obj_event._curr_data::JSONB)
-                  ) curr
-                  LEFT OUTER JOIN
-                  (
-                    SELECT key, value
-                    FROM JSONB_EACH(_pgh_obj_event._prev_data::JSONB)
-                  ) prev
-                  ON curr.key = prev.key
-                WHERE curr.key NOT LIKE 'pgh_%%'
-                  AND curr.value != prev.value
-                  AND prev IS NOT NULL
-              ) AS pgh_diff,
+              {pgh_data_clause} AS pgh_data,
+              {pgh_diff_clause} AS pgh_diff,
               _pgh_obj_event.pgh_context_id,
               _pgh_obj_event.pgh_context
-            FROM (
-              SELECT
-                pgh_id,
-                pgh_created_at,
-                pgh_label,
-                row_to_json(_event) AS _curr_data,
-                {annotated_context_columns_clause}
-                {prev_data_clause},
-                {context_id_column_clause},
-                {context_column_clause},
-                {pgh_obj_id_column_clause}
-              FROM {event_table} _event
-              {context_join_clause}
-              {where_clause}
-              ORDER BY _event.pgh_id
-            ) _pgh_obj_event
+            FROM {source_clause}
+        """,
+            [*prev_params, *params],
+        )
+
+    @cached_property
+    def filtered_values(self):
+        """
+        The values that the pgh_model and pgh_obj_model columns of the
+        events CTE are limited to by exact and in lookups of the outer query
+        """
+        values = {}
+        for lookup in self._get_filter_lookups():
+            if (
+                isinstance(lookup, Lookup)
+                and isinstance(lookup.lhs, Col)
+                and lookup.lhs.alias == self.query.base_table
+                and lookup.lhs.target.column in ("pgh_model", "pgh_obj_model")
+                and lookup.lookup_name in ("exact", "in")
+                and not hasattr(lookup.rhs, "resolve_expression")
+            ):
+                rhs = [lookup.rhs] if lookup.lookup_name == "exact" else list(lookup.rhs)
+                if not any(hasattr(value, "resolve_expression") for value in rhs):
+                    column = lookup.lhs.target.column
+                    values[column] = values.get(column, set(rhs)) & set(rhs)
+
+        return values
+
+    def _can_match(self, event_model):
+        """
+        False if filters on pgh_model or pgh_obj_model of the outer query exclude
+        every event of an event model. Labels aren't used since events can have
+        labels of trackers that were renamed or removed
         """
+        filtered = self.filtered_values
+        return not (
+            ("pgh_model" in filtered and event_model._meta.label not in filtered["pgh_model"])
+            or (
+                "pgh_obj_model" in filtered
+                and event_model.pgh_tracked_model._meta.label not in filtered["pgh_obj_model"]
+            )
+        )
 
     def _get_cte(self):
         """
         Returns the CTE clause for the aggregate event query
         """
         events_table = self.query.model._meta.db_table
-        inner_cte = "UNION ALL ".join(
-            [self._get_select(event_model) for event_model in self.across]
-        )
+        selects = [
+            self._get_select(event_model)
+            for event_model in self.across
+            # Event tables that can't match the filters are left out
+            if self._can_match(event_model)
+        ]
+        inner_cte = "UNION ALL ".join(select for select, _ in selects)
+        params = [param for _, select_params in selects for param in select_params]
         if not inner_cte:
             inner_cte = self._get_empty_select()
 
-        return f"WITH {events_table} AS (\n" + inner_cte + "\n)\n"
+        return f"WITH {events_table} AS (\n" + inner_cte + "\n)\n", params
 
     def as_sql(self, *args, **kwargs):
         self._validate()
@@ -526,9 +1043,9 @@ class EventsQueryCompiler(SQLCompiler):
 
         # Create the CTE that will be queried and insert it into the
         # main query
-        cte = self._get_cte()
+        cte, cte_params = self._get_cte()
 
-        return cte + base_sql, base_params
+        return cte + base_sql, (*cte_params, *base_params)
 
 
 class EventsQuery(Query):
@@ -539,6 +1056,8 @@ class EventsQuery(Query):
         self.references = []
         self.tracks = []
         self.across = []
+        self.after = None
+        self.chunk_size = None
 
     def get_compiler(self, *args, **kwargs):
         compiler = super().get_compiler(*args, **kwargs)
@@ -550,6 +1069,8 @@ class EventsQuery(Query):
         clone.references = self.references
         clone.tracks = self.tracks
         clone.across = self.across
+        clone.after = self.after
+        clone.chunk_size = self.chunk_size
         return clone
 
     def chain(self, klass=None):
@@ -603,6 +1124,38 @@ class EventsQuerySet(models.QuerySet):
         qs.query.tracks = objs
         return qs
 
+    def stream(self, after=None, chunk_size=1000):
+        """Iterate over events in chunks with keyset pagination.
+
+        Events are ordered by `pgh_created_at`, `pgh_model`, and `pgh_id`. Each
+        chunk only reads the events after the previous chunk from the event
+        tables, so memory is bounded and deep pages are as fast as the first.
+
+        Args:
+            after: An event or a `(pgh_created_at, pgh_model, pgh_id)` tuple.
+                Only events after it are returned.
+            chunk_size: The number of events fetched per query.
+        """
+        if self._fields is not None:
+            raise ValueError("stream() cannot be used after values() or values_list().")
+
+        qs = self.order_by("pgh_created_at", "pgh_model", "pgh_id")
+        if isinstance(after, models.Model):
+            after = (after.pgh_created_at, after.pgh_model, after.pgh_id)
+
+        while True:
+            chunk_qs = qs._clone()
+            chunk_qs.query.after = after
+            chunk_qs.query.chunk_size = chunk_size
+            chunk = list(chunk_qs[:chunk_size])
+
+            yield from chunk
+
+            if len(chunk) < chunk_size:
+                return
+
+            after = (chunk[-1].pgh_created_at, chunk[-1].pgh_model, chunk[-1].pgh_id)
+
 
 class NoObjectsManager(models.Manager):
     """
@@ -675,6 +1228,7 @@ class MiddlewareEvents(Events):
             on_delete=models.DO_NOTHING,
             help_text="The user associated with the event.",
         ),
+        indexed=True,
     )
     url = core.ProxyField(
         "pgh_context__url",
@@ -684,3 +1238,47 @@ class MiddlewareEvents(Events):
     class Meta:
         proxy = True
         verbose_name_plural = "middleware events"
+
+
+def _get_proxy_indexes(using=DEFAULT_DB_ALIAS):
+    """
+    Returns the expression indexes of proxy fields declared with `indexed=True`
+    as a list of model and index tuples.
+
+    Index expressions are the same as the SQL of proxy fields on event models
+    and on [pghistory.models.Events][] proxies. Proxies of `Events` are indexed on
+    context metadata and on every denormalized `pgh_context` JSON column.
+    """
+    connection = connections[using]
+    indexes = {}
+    for model in apps.get_models():
+        for field in model._meta.local_fields:
+            if not getattr(field, "pgh_proxy_indexed", False):
+                continue
+
+            if issubclass(model, Events):
+                keys = [field.pgh_proxy.split("__", 1)[1]]
+                targets = [
+                    (event_model, "pgh_context")
+                    for event_model in core.event_models()
+                    if hasattr(event_model, "pgh_context")
+                    and isinstance(
+                        event_model._meta.get_field("pgh_context"), utils.DjangoJSONField
+                    )
+                ]
+                if core.event_models(references_model=Context):
+                    targets.insert(0, (Context, "metadata"))
+            else:
+                target, path, keys = _get_proxy_path(model, field.pgh_proxy)
+                targets = [(target, path[-1])]
+
+            for target, column in targets:
+                table = target._meta.db_table
+                digest = names_digest(
+                    table, column, *keys, field.cast_db_type(connection), length=8
+                )
+                name = f"{table}_{'_'.join(keys)}"[:54] + f"_{digest}"
+                expression = _get_proxy_expression(F(column), keys, field)
+                indexes.setdefault(name, (target, models.Index(expression, name=name)))
+
+    return list(indexes.values())
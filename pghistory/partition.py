@@ -0,0 +1,356 @@
+import datetime as dt
+from typing import List, Type, Union
+
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.backends.utils import truncate_name
+from django.utils import timezone
+
+_intervals = ("day", "week", "month", "year")
+
+
+def _quote(name):
+    return f'"{name}"'
+
+
+def _get_partition_name(table, suffix, connection):
+    """
+    Returns the name of a partition of a table. Long table names are truncated
+    and hashed so that the suffix is kept within the identifier length limit
+    """
+    return truncate_name(table, connection.ops.max_name_length() - len(suffix)) + suffix
+
+
+def _move_table_sql(*, source, target, pk_columns, partition_by=None):
+    """
+    Returns the PL/pgSQL statements for creating the `target` table from the
+    structure of the `source` table.
+
+    The ID sequence and triggers of the source table are moved to the target table
+    and the primary key is recreated with the supplied columns. The target
+    table is partitioned by range on the `partition_by` column if provided.
+    """
+    partition_clause = f"PARTITION BY RANGE ({_quote(partition_by)})" if partition_by else ""
+    pk_col = pk_columns[0]
+    return f"""
+        EXECUTE (
+            SELECT 'ALTER TABLE {_quote(source)} DROP CONSTRAINT ' || QUOTE_IDENT(conname)
+            FROM pg_constraint
+            WHERE conrelid = '{_quote(source)}'::regclass AND contype = 'p'
+        );
+
+        _sequence := pg_get_serial_sequence('{_quote(source)}', '{pk_col}');
+        IF (
+            SELECT attidentity != ''
+            FROM pg_attribute
+            WHERE attrelid = '{_quote(source)}'::regclass AND attname = '{pk_col}'
+        ) THEN
+            CREATE TABLE {_quote(target)} (
+                LIKE {_quote(source)}
+                INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES INCLUDING IDENTITY
+            ) {partition_clause};
+            PERFORM SETVAL(
+                pg_get_serial_sequence('{_quote(target)}', '{pk_col}'),
+                NEXTVAL(_sequence),
+                false
+            );
+            ALTER TABLE {_quote(source)} ALTER COLUMN {_quote(pk_col)} DROP IDENTITY;
+        ELSE
+            CREATE TABLE {_quote(target)} (
+                LIKE {_quote(source)}
+                INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES
+            ) {partition_clause};
+            EXECUTE 'ALTER SEQUENCE ' || _sequence
+                || ' OWNED BY {_quote(target)}.{_quote(pk_col)}';
+            ALTER TABLE {_quote(source)} ALTER COLUMN {_quote(pk_col)} DROP DEFAULT;
+        END IF;
+
+        ALTER TABLE {_quote(target)} ADD PRIMARY KEY ({", ".join(map(_quote, pk_columns))});
+
+        FOR _trigger IN
+            SELECT
+                tgname,
+                pg_get_triggerdef(oid) AS definition,
+                obj_description(oid, 'pg_trigger') AS comment
+            FROM pg_trigger
+            WHERE tgrelid = '{_quote(source)}'::regclass AND NOT tgisinternal
+        LOOP
+            EXECUTE 'DROP TRIGGER ' || QUOTE_IDENT(_trigger.tgname) || ' ON {_quote(source)}';
+            EXECUTE REGEXP_REPLACE(_trigger.definition, ' ON \\S+ ', ' ON {_quote(target)} ');
+            IF _trigger.comment IS NOT NULL THEN
+                EXECUTE 'COMMENT ON TRIGGER ' || QUOTE_IDENT(_trigger.tgname)
+                    || ' ON {_quote(target)} IS ' || QUOTE_LITERAL(_trigger.comment);
+            END IF;
+        END LOOP;
+    """
+
+
+class TimePartition(models.BaseConstraint):
+    """
+    Partitions an event table by range on the `pgh_created_at` field.
+
+    Partitioning is configured as a constraint of the event model so that
+    migrations convert the event table into a partitioned table. Existing
+    events are kept in an initial partition that ends with the current interval.
+    Future partitions are created and expired partitions are detached or
+    dropped with the `pghistory_partition` management command. Events that
+    don't belong to any partition are stored in a default partition until
+    their partition is created.
+
+    Only the interval and name are part of the migration state. The premake and
+    retention settings are used by the management command and can be changed
+    without a migration.
+
+    Args:
+        interval: The interval of each partition. One of "day", "week", "month", or "year".
+        premake: The number of future partitions to create ahead of time.
+        retention: Partitions that end before this amount of time ago are expired.
+            Partitions are never expired if `None`.
+        name: The name of the constraint. Defaults to a name based on the event model
+            when using [pghistory.track][] or [pghistory.create_event_model][].
+    """
+
+    def __init__(
+        self,
+        interval: str = "month",
+        *,
+        premake: int = 3,
+        retention: Union[dt.timedelta, None] = None,
+        name: Union[str, None] = None,
+    ):
+        if interval not in _intervals:
+            raise ValueError(f"interval must be one of {', '.join(_intervals)}.")
+
+        self.interval = interval
+        self.premake = premake
+        self.retention = retention
+        super().__init__(name=name)
+
+    def constraint_sql(self, model, schema_editor):
+        # Partition the table after it is created when the constraint
+        # is part of the model creation
+        schema_editor.deferred_sql.append(self.create_sql(model, schema_editor))
+        return None
+
+    def create_sql(self, model, schema_editor):
+        table = model._meta.db_table
+        initial = _get_partition_name(table, "_initial", schema_editor.connection)
+        default = _get_partition_name(table, "_default", schema_editor.connection)
+        return f"""
+            DO $$
+            DECLARE
+                _sequence TEXT;
+                _trigger RECORD;
+            BEGIN
+                ALTER TABLE {_quote(table)} RENAME TO {_quote(initial)};
+                {
+                    _move_table_sql(
+                        source=initial,
+                        target=table,
+                        pk_columns=[model._meta.pk.column, "pgh_created_at"],
+                        partition_by="pgh_created_at",
+                    )
+                }
+                ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(initial)}
+                FOR VALUES FROM (MINVALUE) TO (
+                    DATE_TRUNC('{self.interval}', NOW()) + INTERVAL '1 {self.interval}'
+                );
+                CREATE TABLE {_quote(default)} PARTITION OF {_quote(table)} DEFAULT;
+            END $$;
+        """
+
+    def remove_sql(self, model, schema_editor):
+        table = model._meta.db_table
+        partitioned = _get_partition_name(table, "_partitioned", schema_editor.connection)
+        return f"""
+            DO $$
+            DECLARE
+                _sequence TEXT;
+                _trigger RECORD;
+            BEGIN
+                ALTER TABLE {_quote(table)} RENAME TO {_quote(partitioned)};
+                {
+                    _move_table_sql(
+                        source=partitioned,
+                        target=table,
+                        pk_columns=[model._meta.pk.column],
+                    )
+                }
+                INSERT INTO {_quote(table)} SELECT * FROM {_quote(partitioned)};
+                DROP TABLE {_quote(partitioned)};
+            END $$;
+        """
+
+    def validate(self, *args, **kwargs):
+        """Partitions don't validate model instances"""
+
+    def __eq__(self, other):
+        if isinstance(other, TimePartition):
+            return self.deconstruct() == other.deconstruct()
+        return super().__eq__(other)  # pragma: no cover
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        kwargs["interval"] = self.interval
+        return path, args, kwargs
+
+    def clone(self):
+        # Models clone their constraints, which only keeps the deconstructed arguments
+        clone = super().clone()
+        clone.premake = self.premake
+        clone.retention = self.retention
+        return clone
+
+
+def get_time_partition(event_model: Type[models.Model]) -> Union[TimePartition, None]:
+    """Returns the time partition of an event model, if any"""
+    return next(
+        (
+            constraint
+            for constraint in event_model._meta.constraints
+            if isinstance(constraint, TimePartition)
+        ),
+        None,
+    )
+
+
+def _get_partitions(event_model, cursor):
+    """Returns the names and ends of the range partitions of an event model"""
+    cursor.execute(
+        """
+        SELECT
+            child.relname,
+            (REGEXP_MATCH(PG_GET_EXPR(child.relpartbound, child.oid), 'TO \\(''(.*)''\\)'))[1]
+                ::TIMESTAMPTZ
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_partitioned_table ON pg_partitioned_table.partrelid = pg_inherits.inhparent
+        WHERE pg_inherits.inhparent = %s::regclass
+            AND child.oid != pg_partitioned_table.partdefid
+        ORDER BY 2
+        """,
+        [_quote(event_model._meta.db_table)],
+    )
+    return cursor.fetchall()
+
+
+def _get_default_partition(event_model, cursor):
+    """Returns the name of the default partition of an event model, if any"""
+    cursor.execute(
+        """
+        SELECT pg_class.relname
+        FROM pg_partitioned_table
+        JOIN pg_class ON pg_class.oid = pg_partitioned_table.partdefid
+        WHERE pg_partitioned_table.partrelid = %s::regclass
+        """,
+        [_quote(event_model._meta.db_table)],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def create_partitions(
+    event_model: Type[models.Model], *, using: str = DEFAULT_DB_ALIAS
+) -> List[str]:
+    """
+    Creates the partition of the current interval and the future partitions of
+    a partitioned event model.
+
+    Events in the default partition are moved to the partitions of their intervals.
+    The default partition is created if it doesn't exist.
+
+    Args:
+        event_model: The partitioned event model.
+        using: The database.
+
+    Returns:
+        The names of the created partitions.
+    """
+    partition = get_time_partition(event_model)
+    connection = connections[using]
+    table = event_model._meta.db_table
+    created = []
+    with transaction.atomic(using), connection.cursor() as cursor:
+        default = _get_default_partition(event_model, cursor)
+        if not default:
+            default = _get_partition_name(table, "_default", connection)
+            cursor.execute(f"CREATE TABLE {_quote(default)} PARTITION OF {_quote(table)} DEFAULT")
+            created.append(default)
+
+        partitions = _get_partitions(event_model, cursor)
+        cursor.execute(
+            f"""
+            SELECT start, start + INTERVAL '1 {partition.interval}'
+            FROM GENERATE_SERIES(
+                COALESCE(%s::TIMESTAMPTZ, DATE_TRUNC('{partition.interval}', NOW())),
+                DATE_TRUNC('{partition.interval}', NOW())
+                    + INTERVAL '1 {partition.interval}' * %s,
+                INTERVAL '1 {partition.interval}'
+            ) start
+            """,
+            [partitions[-1][1] if partitions else None, partition.premake],
+        )
+        for start, end in cursor.fetchall():
+            # Attaching a partition fails if the default partition has events of its
+            # interval, so they are moved first. Triggers of the default partition,
+            # such as those of append-only event models, are disabled for the move
+            name = _get_partition_name(table, f"_p{start:%Y%m%d}", connection)
+            cursor.execute(
+                f"""
+                CREATE TABLE {_quote(name)} (
+                    LIKE {_quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+                );
+                ALTER TABLE {_quote(default)} DISABLE TRIGGER USER;
+                WITH _moved AS (
+                    DELETE FROM {_quote(default)}
+                    WHERE pgh_created_at >= %s AND pgh_created_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {_quote(name)} SELECT * FROM _moved;
+                ALTER TABLE {_quote(default)} ENABLE TRIGGER USER;
+                ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(name)}
+                FOR VALUES FROM (%s) TO (%s);
+                """,
+                [start, end, start, end],
+            )
+            created.append(name)
+
+    return created
+
+
+def expire_partitions(
+    event_model: Type[models.Model],
+    *,
+    drop: bool = False,
+    now: Union[dt.datetime, None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> List[str]:
+    """
+    Detaches or drops the partitions of a partitioned event model that end
+    before its retention.
+
+    Args:
+        event_model: The partitioned event model.
+        drop: Drop the expired partitions instead of detaching them.
+        now: The current time. Defaults to `timezone.now()`.
+        using: The database.
+
+    Returns:
+        The names of the expired partitions.
+    """
+    partition = get_time_partition(event_model)
+    if partition.retention is None:
+        return []
+
+    cutoff = (now or timezone.now()) - partition.retention
+    table = event_model._meta.db_table
+    expired = []
+    with connections[using].cursor() as cursor:
+        for name, end in _get_partitions(event_model, cursor):
+            if end <= cutoff:
+                cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {_quote(name)}")
+
+                expired.append(name)
+
+    return expired
@@ -0,0 +1,323 @@
+import datetime as dt
+import time
+from contextlib import nullcontext
+from typing import Callable, List, Type, Union
+
+import pgtrigger
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from pghistory import core
+
+
+class Retention:
+    """
+    A retention policy for an event model.
+
+    Events that match every supplied criteria are pruned. For example,
+    `Retention(max_age=timedelta(days=90), keep_last=5, labels=["update"])` prunes
+    update events older than 90 days that aren't one of the last five events
+    of their object.
+
+    Args:
+        max_age: Prune events older than this amount of time.
+        keep_last: Keep the latest number of events of each object. Requires the
+            `pgh_obj` field.
+        labels: Only prune events with these labels.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_age: Union[dt.timedelta, None] = None,
+        keep_last: Union[int, None] = None,
+        labels: Union[List[str], None] = None,
+    ):
+        if max_age is None and keep_last is None and labels is None:
+            raise ValueError("Must provide max_age, keep_last, or labels.")
+
+        if keep_last is not None and keep_last < 1:
+            raise ValueError("keep_last must be at least 1.")
+
+        self.max_age = max_age
+        self.keep_last = keep_last
+        self.labels = labels
+
+    def get_condition(self, event_model: Type[models.Model], *, alias: str, now: dt.datetime):
+        """Returns the SQL condition and params of events that are pruned"""
+        event_table = event_model._meta.db_table
+        pk_col = event_model._meta.pk.column
+        conditions, params = [], []
+
+        if self.max_age is not None:
+            conditions.append(f"{alias}.pgh_created_at < %s")
+            params.append(now - self.max_age)
+
+        if self.labels is not None:
+            conditions.append(f"{alias}.pgh_label = ANY(%s)")
+            params.append(list(self.labels))
+
+        if self.keep_last is not None:
+            if not hasattr(event_model, "pgh_obj"):
+                raise ValueError(f"{event_model._meta.label} must have pgh_obj to keep_last.")
+
+            obj_col = event_model._meta.get_field("pgh_obj").column
+            conditions.append(
+                f"""
+                EXISTS (
+                    SELECT 1
+                    FROM "{event_table}" _newer
+                    WHERE _newer."{obj_col}" = {alias}."{obj_col}"
+                        AND _newer."{pk_col}" > {alias}."{pk_col}"
+                    OFFSET %s
+                    LIMIT 1
+                )
+                """
+            )
+            params.append(self.keep_last - 1)
+
+        return "(" + " AND ".join(conditions) + ")", params
+
+
+def _delete_in_batches(model, conditions, params, *, alias, batch_size, sleep, progress, using):
+    """
+    Deletes the rows of a model matching SQL conditions in batches ordered by primary
+    key. Each batch is deleted in its own transaction, ignoring protection triggers.
+    """
+    table = model._meta.db_table
+    pk_col = model._meta.pk.column
+    ignore = [
+        f"{model._meta.label}:{trigger.name}"
+        for trigger in getattr(model._meta, "triggers", [])
+        if isinstance(trigger, pgtrigger.Protect)
+    ]
+
+    last_pk = None
+    deleted = 0
+    while True:
+        keyset_conditions = [f'{alias}."{pk_col}" > %s'] if last_pk is not None else []
+        keyset_params = [last_pk] if last_pk is not None else []
+        sql = f"""
+            DELETE FROM "{table}"
+            WHERE "{pk_col}" IN (
+                SELECT {alias}."{pk_col}"
+                FROM "{table}" {alias}
+                WHERE {" AND ".join([*keyset_conditions, *conditions])}
+                ORDER BY {alias}."{pk_col}"
+                LIMIT %s
+            )
+            RETURNING "{pk_col}"
+        """
+        with transaction.atomic(using):
+            with pgtrigger.ignore(*ignore, databases=[using]) if ignore else nullcontext():
+                with connections[using].cursor() as cursor:
+                    cursor.execute(sql, [*keyset_params, *params, batch_size])
+                    pks = [row[0] for row in cursor.fetchall()]
+
+        if not pks:
+            break
+
+        last_pk = max(pks)
+        deleted += len(pks)
+        if progress:
+            progress(deleted)
+
+        if len(pks) < batch_size:
+            break
+
+        time.sleep(sleep)
+
+    return deleted
+
+
+def _get_delta_condition(event_model, retention, *, alias, now):
+    """
+    Events of delta event models are only pruned along with every following
+    event up to a full snapshot that is kept. Otherwise the remaining events
+    could no longer be reconstructed.
+    """
+    event_table = event_model._meta.db_table
+    obj_col = event_model._meta.get_field("pgh_obj").column
+    pk_col = event_model._meta.pk.column
+    checkpoint_condition, checkpoint_params = retention.get_condition(
+        event_model, alias="_checkpoint", now=now
+    )
+    between_condition, between_params = retention.get_condition(
+        event_model, alias="_between", now=now
+    )
+    sql = f"""
+        EXISTS (
+            SELECT 1
+            FROM "{event_table}" _checkpoint
+            WHERE _checkpoint."{obj_col}" = {alias}."{obj_col}"
+                AND _checkpoint."{pk_col}" > {alias}."{pk_col}"
+                AND _checkpoint.pgh_changed IS NULL
+                AND NOT {checkpoint_condition}
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM "{event_table}" _between
+                    WHERE _between."{obj_col}" = {alias}."{obj_col}"
+                        AND _between."{pk_col}" > {alias}."{pk_col}"
+                        AND _between."{pk_col}" < _checkpoint."{pk_col}"
+                        AND NOT {between_condition}
+                )
+        )
+    """
+    return sql, [*checkpoint_params, *between_params]
+
+
+def _get_prune_conditions(event_model, retention, *, alias, now):
+    """Returns the SQL conditions and params of events pruned by a retention policy"""
+    from pghistory.models import _has_delta_storage  # noqa
+
+    condition, params = retention.get_condition(event_model, alias=alias, now=now)
+    conditions = [condition]
+    if _has_delta_storage(event_model):
+        delta_condition, delta_params = _get_delta_condition(
+            event_model, retention, alias=alias, now=now
+        )
+        conditions.append(delta_condition)
+        params.extend(delta_params)
+
+    return conditions, params
+
+
+def prune(
+    event_model: Type[models.Model],
+    retention: Union[Retention, None] = None,
+    *,
+    batch_size: int = 1000,
+    sleep: float = 0,
+    now: Union[dt.datetime, None] = None,
+    progress: Union[Callable[[int], None], None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Prunes the events of an event model that match its retention policy.
+
+    Events are deleted in batches ordered by primary key. Each batch is deleted
+    in its own transaction to avoid long-held locks. The append-only protection
+    of event models is ignored while pruning. Events of delta event models are only
+    pruned when the following events can still be reconstructed.
+
+    Args:
+        event_model: The event model.
+        retention: The retention policy. Defaults to the `pgh_retention` of the event model.
+        batch_size: The maximum number of events deleted in a batch.
+        sleep: The number of seconds to sleep between batches.
+        now: The current time. Defaults to `timezone.now()`.
+        progress: Called with the total number of deleted events after every batch.
+        using: The database.
+
+    Returns:
+        The number of deleted events.
+    """
+    retention = retention or event_model.pgh_retention
+    if not retention:  # pragma: no cover
+        return 0
+
+    conditions, params = _get_prune_conditions(
+        event_model, retention, alias="_event", now=now or timezone.now()
+    )
+    return _delete_in_batches(
+        event_model,
+        conditions,
+        params,
+        alias="_event",
+        batch_size=batch_size,
+        sleep=sleep,
+        progress=progress,
+        using=using,
+    )
+
+
+def prune_contexts(
+    *,
+    min_age: dt.timedelta = dt.timedelta(days=1),
+    window: dt.timedelta = dt.timedelta(days=1),
+    batch_size: int = 1000,
+    sleep: float = 0,
+    progress: Union[Callable[[int], None], None] = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Deletes context that isn't referenced by any event.
+
+    Context is scanned in windows of creation time, starting with the oldest context.
+    Unreferenced context of each window is found with anti-joins against the
+    `pgh_context` columns of every event model and deleted in batches, each in its
+    own transaction. Context that was recently updated is kept since it could be
+    referenced by events of transactions that haven't committed.
+
+    Args:
+        min_age: Only delete context that hasn't been updated for this amount of time.
+        window: The range of creation time scanned at once.
+        batch_size: The maximum number of context rows deleted in a batch.
+        sleep: The number of seconds to sleep between batches.
+        progress: Called with the total number of deleted rows after every batch.
+        using: The database.
+
+    Returns:
+        The number of deleted context rows.
+    """
+    from pghistory.models import Context  # noqa
+
+    cutoff = timezone.now() - min_age
+    condition = _get_unreferenced_context_condition(alias="_context")
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT MIN(created_at) FROM "{Context._meta.db_table}"')
+        start = cursor.fetchone()[0]
+
+    deleted = 0
+    # Context is always updated after it is created, so windows end at the cutoff
+    while start is not None and start < cutoff:
+        end = min(start + window, cutoff)
+        deleted += _delete_in_batches(
+            Context,
+            [
+                "_context.created_at >= %s",
+                "_context.created_at < %s",
+                "_context.updated_at < %s",
+                condition,
+            ],
+            [start, end, cutoff],
+            alias="_context",
+            batch_size=batch_size,
+            sleep=sleep,
+            progress=(lambda total, deleted=deleted: progress(deleted + total))
+            if progress
+            else None,
+            using=using,
+        )
+        start = end
+
+    return deleted
+
+
+def _get_unreferenced_context_condition(*, alias):
+    """
+    Returns the SQL condition of context that isn't referenced by any event,
+    including events in the queue of asynchronous capture
+    """
+    from pghistory.models import Context, EventQueue  # noqa
+
+    references = [
+        (event_model._meta.db_table, field.column)
+        for event_model in core.event_models(references_model=Context)
+        for field in event_model._meta.fields
+        if field.is_relation and field.related_model == Context
+    ]
+    conditions = [
+        f'NOT EXISTS (SELECT 1 FROM "{event_table}" _ref WHERE _ref."{column}" = {alias}.id)'
+        for event_table, column in references
+    ]
+    conditions.append(
+        f"""
+        NOT EXISTS (
+            SELECT 1
+            FROM "{EventQueue._meta.db_table}" _ref
+            WHERE _ref."row" ->> 'pgh_context_id' = {alias}.id::TEXT
+        )
+        """
+    )
+    return "(" + " AND ".join(conditions) + ")"
@@ -1,11 +1,13 @@
 import collections
 import contextlib
+import contextvars
+import functools
 import json
-import threading
+import re
 import uuid
 from typing import Any
 
-from django.db import connection
+from django.db import connections, router
 
 from pghistory import config, utils
 
@@ -17,10 +19,20 @@ else:
     raise AssertionError
 
 
-_tracker = threading.local()
+Context = collections.namedtuple("Context", ["id", "metadata"])
 
 
-Context = collections.namedtuple("Context", ["id", "metadata"])
+class _Tracker:
+    """The active context and its cached serialized metadata"""
+
+    def __init__(self, value: Context):
+        self.value = value
+        self.serialized_metadata = None
+
+
+# Context variables are isolated between threads and asyncio tasks and are
+# copied into the threads that run sync_to_async code
+_tracker = contextvars.ContextVar("pghistory_tracker", default=None)
 
 
 def _is_concurrent_statement(sql):
@@ -31,6 +43,44 @@ def _is_concurrent_statement(sql):
     return sql.startswith("create") and "concurrently" in sql
 
 
+_write_statement_re = re.compile(r"\b(insert|update|delete|merge)\b")
+
+
+def _is_write_statement(sql):
+    """
+    True if the sql statement may write data. Writes inside of common table
+    expressions and procedure calls are also considered writes
+    """
+    sql = sql.strip().lower() if sql else ""
+    return sql.startswith(("insert", "update", "delete", "copy", "merge", "call", "do")) or (
+        sql.startswith("with") and bool(_write_statement_re.search(sql))
+    )
+
+
+def _is_transaction_statement(sql):
+    """
+    True if the sql statement only controls the transaction. Variables set
+    in the same statement as a savepoint rollback would be rolled back
+    """
+    sql = sql.strip().lower() if sql else ""
+    return sql.startswith(("savepoint", "release", "rollback", "begin", "commit"))
+
+
+def _is_transaction_idle(cursor):
+    """
+    True if the connection is not in a transaction
+    """
+    if utils.psycopg_maj_version == 2:
+        return (
+            cursor.connection.get_transaction_status()
+            == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+    elif utils.psycopg_maj_version == 3:
+        return cursor.connection.info.transaction_status == psycopg.pq.TransactionStatus.IDLE
+    else:
+        raise AssertionError
+
+
 def _is_transaction_errored(cursor):
     """
     True if the current transaction is in an errored state
@@ -74,30 +124,126 @@ def _execute_wrapper(execute_result):
     return execute_result
 
 
-def _inject_history_context(execute, sql, params, many, context):
-    if _can_inject_variable(context["cursor"], sql):
+def _is_variable_injected(connection, cursor, variables, emit):
+    """True if the context variables are already set in the current transaction.
+
+    Variables are set locally to the transaction. They are lost when a new
+    transaction starts or when a savepoint that was active when the variables
+    were set is no longer active, i.e. it was rolled back. If `emit` is True,
+    the context must also have been emitted as a logical decoding message.
+    """
+    injected = getattr(connection, "_pgh_injected_context", None)
+    if not config.context_injection_cache() or not injected:
+        return False
+
+    injected_variables, injected_savepoint_ids, injected_emit = injected
+    return (
+        injected_variables == variables
+        and (injected_emit or not emit)
+        and not _is_transaction_idle(cursor)
+        and tuple(connection.savepoint_ids[: len(injected_savepoint_ids)])
+        == injected_savepoint_ids
+    )
+
+
+def _serialize_metadata(tracker):
+    """Serialize the context metadata, caching it until the metadata changes"""
+    encoder = config.json_encoder()
+    if not tracker.serialized_metadata or tracker.serialized_metadata[0] != encoder:
         # Metadata is stored as a serialized JSON string with escaped
         # single quotes
-        serialized_metadata = json.dumps(_tracker.value.metadata, cls=config.json_encoder())
+        tracker.serialized_metadata = (
+            encoder,
+            json.dumps(tracker.value.metadata, cls=encoder),
+        )
+
+    return tracker.serialized_metadata[1]
 
-        sql = (
-            "SELECT set_config('pghistory.context_id', %s, true), "
-            "set_config('pghistory.context_metadata', %s, true); "
-        ) + sql
-        params = [str(_tracker.value.id), serialized_metadata, *(params or ())]
+
+@functools.lru_cache(maxsize=None)
+def _get_logical_databases():
+    """The databases written to by models tracked with logical replication"""
+    from pghistory import core  # noqa
+
+    return frozenset(
+        router.db_for_write(event_model.pgh_tracked_model)
+        for event_model in core.event_models()
+        if event_model.pgh_capture == "logical"
+    )
+
+
+def _inject_history_context(execute, sql, params, many, context):
+    tracker = _tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+
+    cursor = context["cursor"]
+    connection = context["connection"]
+    if (
+        _can_inject_variable(cursor, sql)
+        and not _is_transaction_statement(sql)
+        and (not config.context_injection_writes_only() or _is_write_statement(sql))
+    ):
+        variables = (str(tracker.value.id), _serialize_metadata(tracker))
+
+        # Context is also emitted into the WAL for logical replication. Only
+        # writes are tracked, and emitting assigns a transaction ID
+        emit = connection.alias in _get_logical_databases() and _is_write_statement(sql)
+
+        if not _is_variable_injected(connection, cursor, variables, emit):
+            if emit:
+                sql = (
+                    "SELECT set_config('pghistory.context_id', %s, true), "
+                    "set_config('pghistory.context_metadata', %s, true), "
+                    "pg_logical_emit_message(true, 'pghistory.context', %s); "
+                ) + sql
+                message = f'{{"id": "{variables[0]}", "metadata": {variables[1]}}}'
+                params = [*variables, message, *(params or ())]
+            else:
+                sql = (
+                    "SELECT set_config('pghistory.context_id', %s, true), "
+                    "set_config('pghistory.context_metadata', %s, true); "
+                ) + sql
+                params = [*variables, *(params or ())]
+
+            connection._pgh_injected_context = (
+                variables,
+                tuple(connection.savepoint_ids),
+                emit,
+            )
 
     return _execute_wrapper(execute(sql, params, many, context))
 
 
+def install_execute_wrapper(connection, **kwargs):
+    """Install the execute wrapper that injects context on a connection.
+
+    The wrapper is permanently installed and is a no-op outside of
+    [pghistory.context][]. It is inserted first so that it runs before
+    other wrappers and isn't removed when they exit. This function is
+    connected to Django's `connection_created` signal so that connections
+    in any thread, such as those used by `sync_to_async`, are covered.
+    Connections to databases other than Postgres are left alone.
+    """
+    if connection.vendor != "postgresql":
+        return
+
+    if _inject_history_context not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _inject_history_context)
+
+
 class context(contextlib.ContextDecorator):
     """
     A context manager that groups changes under the same context and
     adds additional metadata about the event.
 
-    Context is added as variables at the beginning of every SQL statement.
+    Context is added as variables at the beginning of SQL statements.
     By default, all variables are localized to the transaction (i.e
     SET LOCAL), meaning they will only persist for the statement/transaction
-    and not across the session.
+    and not across the session. Variables are only added again when
+    the context changes or a new transaction starts. Use
+    `settings.PGHISTORY_CONTEXT_INJECTION_WRITES_ONLY` to only add variables
+    to statements that write data.
 
     Once any code has entered [pghistory.context][], all subsequent
     entrances of [pghistory.context][] will be grouped under the same
@@ -138,20 +284,25 @@ class context(contextlib.ContextDecorator):
 
     def __init__(self, **metadata: Any):
         self.metadata = metadata
-        self._pre_execute_hook = None
+        self._token = None
 
-        if hasattr(_tracker, "value"):
-            _tracker.value.metadata.update(**self.metadata)
+        tracker = _tracker.get()
+        if tracker is not None:
+            tracker.value.metadata.update(**self.metadata)
+            tracker.serialized_metadata = None
 
     def __enter__(self):
-        if not hasattr(_tracker, "value"):
-            self._pre_execute_hook = connection.execute_wrapper(_inject_history_context)
-            self._pre_execute_hook.__enter__()
-            _tracker.value = Context(id=uuid.uuid4(), metadata=self.metadata)
+        tracker = _tracker.get()
+        if tracker is None:
+            for connection in connections.all():
+                install_execute_wrapper(connection)
+
+            tracker = _Tracker(Context(id=uuid.uuid4(), metadata=self.metadata))
+            self._token = _tracker.set(tracker)
 
-        return _tracker.value
+        return tracker.value
 
     def __exit__(self, *exc):
-        if self._pre_execute_hook:
-            delattr(_tracker, "value")
-            self._pre_execute_hook.__exit__(*exc)
+        if self._token:
+            _tracker.reset(self._token)
+            self._token = None
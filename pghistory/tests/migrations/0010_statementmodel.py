@@ -0,0 +1,132 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:57
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0006_delete_aggregateevent"),
+        ("tests", "0009_alter_custommodelevent_pgh_obj_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatementModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StatementModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="statementmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="statementmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.statementmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="statementmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_insert",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_statementmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT new_values."char_field", new_values."id", new_values."int_field", (SELECT _pgh_attach_context()), NOW(), \'insert\', new_values."id" FROM new_values; RETURN NULL;',
+                    hash="e7fb55f6de64776737961ebb5c6850820abb5908",
+                    level="STATEMENT",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_insert_e2e8b",
+                    referencing="REFERENCING NEW TABLE AS new_values ",
+                    table="tests_statementmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="statementmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_statementmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT new_values."char_field", new_values."id", new_values."int_field", (SELECT _pgh_attach_context()), NOW(), \'update\', new_values."id" FROM old_values JOIN new_values ON old_values."id" = new_values."id" WHERE (old_values.* IS DISTINCT FROM new_values.*); RETURN NULL;',
+                    hash="e3e59c86757415c29da07193b462a9e7f12956f0",
+                    level="STATEMENT",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_b5110",
+                    referencing="REFERENCING OLD TABLE AS old_values  NEW TABLE AS new_values ",
+                    table="tests_statementmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="statementmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="int_field_before_update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_statementmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT old_values."char_field", old_values."id", old_values."int_field", (SELECT _pgh_attach_context()), NOW(), \'int_field_before_update\', old_values."id" FROM old_values JOIN new_values ON old_values."id" = new_values."id" WHERE (old_values."int_field" IS DISTINCT FROM (new_values."int_field")); RETURN NULL;',
+                    hash="7b14d71fc5646bba08e2756a3456227522a1be1d",
+                    level="STATEMENT",
+                    operation="UPDATE",
+                    pgid="pgtrigger_int_field_before_update_update_2cac6",
+                    referencing="REFERENCING OLD TABLE AS old_values  NEW TABLE AS new_values ",
+                    table="tests_statementmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="statementmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="delete_delete",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_statementmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT old_values."char_field", old_values."id", old_values."int_field", (SELECT _pgh_attach_context()), NOW(), \'delete\', old_values."id" FROM old_values; RETURN NULL;',
+                    hash="fbfdf494f717394cc8a8c83235bcced0d571c2fc",
+                    level="STATEMENT",
+                    operation="DELETE",
+                    pgid="pgtrigger_delete_delete_a6902",
+                    referencing="REFERENCING OLD TABLE AS old_values ",
+                    table="tests_statementmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
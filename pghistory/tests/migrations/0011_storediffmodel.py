@@ -0,0 +1,121 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:11
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+import pghistory.utils
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0007_auto_20261018_1800"),
+        ("tests", "0010_statementmodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoreDiffModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StoreDiffModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32)),
+                (
+                    "pgh_diff",
+                    pghistory.utils.JSONField(
+                        editable=False,
+                        help_text="The diff with the previous event of the same object.",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="storediffmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="storediffmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.storediffmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="storediffmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_insert",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_storediffmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") VALUES (NEW."char_field", NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'insert\', NEW."id"); RETURN NULL;',
+                    hash="0f3e0020c5dd97d32cb7b12909cd234f5fecba6a",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_insert_fb8d8",
+                    table="tests_storediffmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="storediffmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    func='INSERT INTO "tests_storediffmodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") VALUES (NEW."char_field", NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'update\', NEW."id"); RETURN NULL;',
+                    hash="4ddcf9e63386ecda0a222f211eaee3a0892408d2",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_f65b9",
+                    table="tests_storediffmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="storediffmodelevent",
+            trigger=pgtrigger.compiler.Trigger(
+                name="pgh_diff",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='NEW.pgh_diff := ( SELECT JSONB_OBJECT_AGG(curr.key, ARRAY[prev.value, curr.value]) FROM JSONB_EACH(TO_JSONB(NEW)) curr JOIN JSONB_EACH(( SELECT TO_JSONB(_prev) FROM "tests_storediffmodelevent" _prev WHERE _prev."pgh_obj_id" = NEW."pgh_obj_id" AND _prev."pgh_id" < NEW."pgh_id" ORDER BY _prev."pgh_id" DESC LIMIT 1 )) prev ON curr.key = prev.key WHERE curr.key NOT LIKE \'pgh_%\' AND curr.value != prev.value ); RETURN NEW;',
+                    hash="c02cc14a0885e43d9d52a83d6e375c2e14d74883",
+                    operation="INSERT",
+                    pgid="pgtrigger_pgh_diff_6b4ab",
+                    table="tests_storediffmodelevent",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:16
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+import pghistory.utils
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0007_auto_20261018_1800"),
+        ("tests", "0011_storediffmodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeltaModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32, null=True)),
+                ("text_field", models.TextField(default="")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DeltaModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField(null=True)),
+                ("int_field", models.IntegerField(null=True)),
+                ("char_field", models.CharField(max_length=32, null=True)),
+                ("text_field", models.TextField(default="", null=True)),
+                (
+                    "pgh_changed",
+                    pghistory.utils.JSONField(
+                        editable=False,
+                        help_text="The changed fields. Null for full snapshots.",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="deltamodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deltamodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.deltamodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="deltamodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_insert",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_deltamodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "text_field") VALUES (NEW."char_field", NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'insert\', NEW."id", NEW."text_field"); RETURN NULL;',
+                    hash="63bbace38e28169a4bf0d861e25df24f4986b72e",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_insert_df294",
+                    table="tests_deltamodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="deltamodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    func='INSERT INTO "tests_deltamodelevent" ("char_field", "id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "text_field") VALUES (NEW."char_field", NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'update\', NEW."id", NEW."text_field"); RETURN NULL;',
+                    hash="768ae17e9e387a7e51cb54dd620509a863c5d99f",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_89c4f",
+                    table="tests_deltamodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="deltamodelevent",
+            trigger=pgtrigger.compiler.Trigger(
+                name="pgh_delta",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    declare="DECLARE _pgh_state JSONB; _pgh_count INTEGER; _pgh_new JSONB;",
+                    func='SELECT JSONB_OBJECT_AGG(state.key, state.value), MAX(state.pgh_event_count) INTO _pgh_state, _pgh_count FROM ( SELECT DISTINCT ON (col.key) col.key, col.value, _prev.pgh_event_count FROM ( SELECT _prev.*, COUNT(*) OVER () AS pgh_event_count FROM "tests_deltamodelevent" _prev WHERE _prev."pgh_obj_id" = NEW."pgh_obj_id" AND _prev."pgh_id" < NEW."pgh_id" AND _prev."pgh_id" >= ( SELECT MAX(_checkpoint."pgh_id") FROM "tests_deltamodelevent" _checkpoint WHERE _checkpoint."pgh_obj_id" = NEW."pgh_obj_id" AND _checkpoint."pgh_id" < NEW."pgh_id" AND _checkpoint.pgh_changed IS NULL ) ) _prev CROSS JOIN JSONB_EACH(TO_JSONB(_prev)) col WHERE col.key NOT LIKE \'pgh_%\' AND (_prev.pgh_changed IS NULL OR _prev.pgh_changed ? col.key) ORDER BY col.key, _prev."pgh_id" DESC ) state; IF _pgh_state IS NOT NULL AND _pgh_count < 20 THEN _pgh_new := TO_JSONB(NEW); NEW.pgh_changed := COALESCE(( SELECT JSONB_AGG(curr.key ORDER BY curr.key) FROM JSONB_EACH(_pgh_new) curr WHERE curr.key NOT LIKE \'pgh_%\' AND curr.value IS DISTINCT FROM _pgh_state -> curr.key ), \'[]\'); NEW := JSONB_POPULATE_RECORD(NEW, COALESCE(( SELECT JSONB_OBJECT_AGG(curr.key, NULL) FROM JSONB_EACH(_pgh_new) curr WHERE curr.key NOT LIKE \'pgh_%\' AND NOT NEW.pgh_changed ? curr.key ), \'{}\')); ELSE NEW.pgh_changed := NULL; END IF; RETURN NEW;',
+                    hash="1c60354b50368e016a2f9fb76d5fec3ae0e0485b",
+                    operation="INSERT",
+                    pgid="pgtrigger_pgh_delta_2f5ee",
+                    table="tests_deltamodelevent",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:20
+# flake8: noqa
+
+import datetime
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+import pghistory.partition
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0007_auto_20261018_1800"),
+        ("tests", "0012_deltamodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartitionModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PartitionModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="partitionmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="partitionmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.partitionmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="partitionmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_insert",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='INSERT INTO "tests_partitionmodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") VALUES (NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'insert\', NEW."id"); RETURN NULL;',
+                    hash="fb72d5380cb5f4cf80282b575a36d4fe3100de89",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_insert_7a678",
+                    table="tests_partitionmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="partitionmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    func='INSERT INTO "tests_partitionmodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") VALUES (NEW."id", NEW."int_field", _pgh_attach_context(), NOW(), \'update\', NEW."id"); RETURN NULL;',
+                    hash="d7a1a0cb4213191b213c53a1f13543af0493139b",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_6ae77",
+                    table="tests_partitionmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="partitionmodelevent",
+            constraint=pghistory.partition.TimePartition(
+                interval="month",
+                name="tests_partitionmodelevent_partition",
+                premake=3,
+                retention=datetime.timedelta(days=365),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="partitionmodelevent",
+            trigger=pgtrigger.compiler.Trigger(
+                name="append_only",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="RAISE EXCEPTION 'pgtrigger: Cannot update or delete rows from % table', TG_TABLE_NAME;",
+                    hash="0a500acdf57c862c986215ca5624fa231b8b1195",
+                    operation="UPDATE OR DELETE",
+                    pgid="pgtrigger_append_only_b4a71",
+                    table="tests_partitionmodelevent",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+    ]
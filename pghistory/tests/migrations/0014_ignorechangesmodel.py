@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:31
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0008_context_created_at_brin"),
+        ("tests", "0013_partitionmodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IgnoreChangesModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("last_seen_at", models.DateTimeField(null=True)),
+                ("view_count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="IgnoreChangesModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+                ("last_seen_at", models.DateTimeField(null=True)),
+                ("view_count", models.IntegerField(default=0)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="ignorechangesmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ignorechangesmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.ignorechangesmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="ignorechangesmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."id" IS DISTINCT FROM (NEW."id") OR OLD."int_field" IS DISTINCT FROM (NEW."int_field"))',
+                    func='INSERT INTO "tests_ignorechangesmodelevent" ("id", "int_field", "last_seen_at", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "view_count") VALUES (NEW."id", NEW."int_field", NEW."last_seen_at", _pgh_attach_context(), NOW(), \'update\', NEW."id", NEW."view_count"); RETURN NULL;',
+                    hash="058a20d8418caa92947baeb6ea99a55dc55c6fda",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_b2e9b",
+                    table="tests_ignorechangesmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:33
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0008_context_created_at_brin"),
+        ("tests", "0014_ignorechangesmodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoalesceModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CoalesceModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="coalescemodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="coalescemodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.coalescemodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="coalescemodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    constraint="CONSTRAINT",
+                    func='INSERT INTO "tests_coalescemodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT _pgh_row."id", _pgh_row."int_field", _pgh_attach_context(), NOW(), \'update\', _pgh_row."id" FROM "tests_coalescemodel" _pgh_row WHERE _pgh_row."id" = NEW."id" AND NOT EXISTS ( SELECT 1 FROM "tests_coalescemodelevent" _pgh_event WHERE _pgh_event."pgh_obj_id" = NEW."id" AND _pgh_event.pgh_label = \'update\' AND _pgh_event.pgh_created_at = NOW() ); RETURN NULL;',
+                    hash="e95939dfd7bba00b25ca427b13a9d5f59b5ec503",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_301ce",
+                    table="tests_coalescemodel",
+                    timing="DEFERRABLE INITIALLY DEFERRED",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="coalescemodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="before_update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    constraint="CONSTRAINT",
+                    func='INSERT INTO "tests_coalescemodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id") SELECT OLD."id", OLD."int_field", _pgh_attach_context(), NOW(), \'before_update\', OLD."id" WHERE NOT EXISTS ( SELECT 1 FROM "tests_coalescemodelevent" _pgh_event WHERE _pgh_event."pgh_obj_id" = OLD."id" AND _pgh_event.pgh_label = \'before_update\' AND _pgh_event.pgh_created_at = NOW() ); RETURN NULL;',
+                    hash="a7435ffafaee37c0fe9c3f42693e733a400b7f81",
+                    operation="UPDATE",
+                    pgid="pgtrigger_before_update_update_25029",
+                    table="tests_coalescemodel",
+                    timing="DEFERRABLE INITIALLY DEFERRED",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
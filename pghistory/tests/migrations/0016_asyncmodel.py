@@ -0,0 +1,137 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:35
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+import pghistory.utils
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0009_eventqueue"),
+        ("tests", "0015_coalescemodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AsyncModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AsyncModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32, null=True)),
+                (
+                    "pgh_diff",
+                    pghistory.utils.JSONField(
+                        editable=False,
+                        help_text="The diff with the previous event of the same object.",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="asyncmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="asyncmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.asyncmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="asyncmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_insert",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="INSERT INTO \"pghistory_eventqueue\" (\"event_model\", \"row\") VALUES ('tests.AsyncModelEvent', JSONB_BUILD_OBJECT('char_field', NEW.\"char_field\", 'id', NEW.\"id\", 'int_field', NEW.\"int_field\", 'pgh_context_id', _pgh_attach_context(), 'pgh_created_at', NOW(), 'pgh_label', 'insert', 'pgh_obj_id', NEW.\"id\")); RETURN NULL;",
+                    hash="1052d97948692042f3305785e712ba03cd00ef1e",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_insert_77842",
+                    table="tests_asyncmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="asyncmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    func="INSERT INTO \"pghistory_eventqueue\" (\"event_model\", \"row\") VALUES ('tests.AsyncModelEvent', JSONB_BUILD_OBJECT('char_field', NEW.\"char_field\", 'id', NEW.\"id\", 'int_field', NEW.\"int_field\", 'pgh_context_id', _pgh_attach_context(), 'pgh_created_at', NOW(), 'pgh_label', 'update', 'pgh_obj_id', NEW.\"id\")); RETURN NULL;",
+                    hash="fee007c59827492de3654c7d4590af94893fc2b6",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_997bb",
+                    table="tests_asyncmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="asyncmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="delete_delete",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="INSERT INTO \"pghistory_eventqueue\" (\"event_model\", \"row\") SELECT 'tests.AsyncModelEvent', JSONB_BUILD_OBJECT('char_field', old_values.\"char_field\", 'id', old_values.\"id\", 'int_field', old_values.\"int_field\", 'pgh_context_id', (SELECT _pgh_attach_context()), 'pgh_created_at', NOW(), 'pgh_label', 'delete', 'pgh_obj_id', old_values.\"id\") FROM old_values; RETURN NULL;",
+                    hash="4448acc59cf50c80a577ed8e33d77d8e4faacc86",
+                    level="STATEMENT",
+                    operation="DELETE",
+                    pgid="pgtrigger_delete_delete_b186e",
+                    referencing="REFERENCING OLD TABLE AS old_values ",
+                    table="tests_asyncmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="asyncmodelevent",
+            trigger=pgtrigger.compiler.Trigger(
+                name="pgh_diff",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='NEW.pgh_diff := ( SELECT JSONB_OBJECT_AGG(curr.key, ARRAY[prev.value, curr.value]) FROM JSONB_EACH(TO_JSONB(NEW)) curr JOIN JSONB_EACH(( SELECT TO_JSONB(_prev) FROM "tests_asyncmodelevent" _prev WHERE _prev."pgh_obj_id" = NEW."pgh_obj_id" AND _prev."pgh_id" < NEW."pgh_id" ORDER BY _prev."pgh_id" DESC LIMIT 1 )) prev ON curr.key = prev.key WHERE curr.key NOT LIKE \'pgh_%\' AND curr.value != prev.value ); RETURN NEW;',
+                    hash="b4daffe537f2bca50d753d5467e4114708f9ce04",
+                    operation="INSERT",
+                    pgid="pgtrigger_pgh_diff_dcde1",
+                    table="tests_asyncmodelevent",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+    ]
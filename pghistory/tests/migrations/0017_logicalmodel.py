@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:40
+# flake8: noqa
+
+import django.db.models.deletion
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+import pghistory.utils
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0009_eventqueue"),
+        ("tests", "0016_asyncmodel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LogicalModel",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LogicalModelEvent",
+            fields=[
+                ("pgh_id", models.AutoField(primary_key=True, serialize=False)),
+                ("pgh_created_at", models.DateTimeField(auto_now_add=True)),
+                ("pgh_label", models.TextField(help_text="The event label.")),
+                ("id", models.IntegerField()),
+                ("int_field", models.IntegerField()),
+                ("char_field", models.CharField(max_length=32, null=True)),
+                (
+                    "pgh_diff",
+                    pghistory.utils.JSONField(
+                        editable=False,
+                        help_text="The diff with the previous event of the same object.",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="logicalmodelevent",
+            name="pgh_context",
+            field=models.ForeignKey(
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="pghistory.context",
+            ),
+        ),
+        migrations.AddField(
+            model_name="logicalmodelevent",
+            name="pgh_obj",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="tests.logicalmodel",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="logicalmodelevent",
+            trigger=pgtrigger.compiler.Trigger(
+                name="pgh_diff",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func='NEW.pgh_diff := ( SELECT JSONB_OBJECT_AGG(curr.key, ARRAY[prev.value, curr.value]) FROM JSONB_EACH(TO_JSONB(NEW)) curr JOIN JSONB_EACH(( SELECT TO_JSONB(_prev) FROM "tests_logicalmodelevent" _prev WHERE _prev."pgh_obj_id" = NEW."pgh_obj_id" AND _prev."pgh_id" < NEW."pgh_id" ORDER BY _prev."pgh_id" DESC LIMIT 1 )) prev ON curr.key = prev.key WHERE curr.key NOT LIKE \'pgh_%\' AND curr.value != prev.value ); RETURN NEW;',
+                    hash="0b90fae28a8334a3290054db07965f9a509342b4",
+                    operation="INSERT",
+                    pgid="pgtrigger_pgh_diff_a00bf",
+                    table="tests_logicalmodelevent",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:45
+# flake8: noqa
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pghistory", "0009_eventqueue"),
+        ("tests", "0017_logicalmodel"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX "pghistory_context_user_83116a7a" ON "pghistory_context" (((("metadata" ->> \'user\'))::integer))',
+            reverse_sql='DROP INDEX IF EXISTS "pghistory_context_user_83116a7a"',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX "tests_denormcontexteventnoid_user_bae7077e" ON "tests_denormcontexteventnoid" (((("pgh_context" ->> \'user\'))::integer))',
+            reverse_sql='DROP INDEX IF EXISTS "tests_denormcontexteventnoid_user_bae7077e"',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX "tests_denormcontextevent_user_ee0e9438" ON "tests_denormcontextevent" (((("pgh_context" ->> \'user\'))::integer))',
+            reverse_sql='DROP INDEX IF EXISTS "tests_denormcontextevent_user_ee0e9438"',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX "pghistory_context_url_4643c697" ON "pghistory_context" (((("metadata" ->> \'url\'))::text))',
+            reverse_sql='DROP INDEX IF EXISTS "pghistory_context_url_4643c697"',
+        ),
+    ]
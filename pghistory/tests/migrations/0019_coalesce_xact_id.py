@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:03
+# flake8: noqa
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tests", "0018_pghistory_proxy_indexes"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="coalescemodel",
+            name="update_update",
+        ),
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="coalescemodel",
+            name="before_update_update",
+        ),
+        migrations.AddField(
+            model_name="coalescemodelevent",
+            name="pgh_xact_id",
+            field=models.BigIntegerField(
+                editable=False,
+                help_text="The transaction ID of coalesced events.",
+                null=True,
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="coalescemodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    constraint="CONSTRAINT",
+                    func='INSERT INTO "tests_coalescemodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pgh_xact_id") SELECT _pgh_row."id", _pgh_row."int_field", _pgh_attach_context(), NOW(), \'update\', _pgh_row."id", TXID_CURRENT() FROM "tests_coalescemodel" _pgh_row WHERE _pgh_row."id" = NEW."id" AND NOT EXISTS ( SELECT 1 FROM "tests_coalescemodelevent" _pgh_event WHERE _pgh_event."pgh_obj_id" = NEW."id" AND _pgh_event.pgh_label = \'update\' AND _pgh_event.pgh_created_at = NOW() AND _pgh_event.pgh_xact_id = TXID_CURRENT() ); RETURN NULL;',
+                    hash="4f969ce83257938a648caf6cc1221f541e9f36d2",
+                    operation="UPDATE",
+                    pgid="pgtrigger_update_update_301ce",
+                    table="tests_coalescemodel",
+                    timing="DEFERRABLE INITIALLY DEFERRED",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="coalescemodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="before_update_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition="WHEN (OLD.* IS DISTINCT FROM NEW.*)",
+                    constraint="CONSTRAINT",
+                    func='INSERT INTO "tests_coalescemodelevent" ("id", "int_field", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pgh_xact_id") SELECT OLD."id", OLD."int_field", _pgh_attach_context(), NOW(), \'before_update\', OLD."id", TXID_CURRENT() WHERE NOT EXISTS ( SELECT 1 FROM "tests_coalescemodelevent" _pgh_event WHERE _pgh_event."pgh_obj_id" = OLD."id" AND _pgh_event.pgh_label = \'before_update\' AND _pgh_event.pgh_created_at = NOW() AND _pgh_event.pgh_xact_id = TXID_CURRENT() ); RETURN NULL;',
+                    hash="4f1914282195da720c850331f2b3e241189934c3",
+                    operation="UPDATE",
+                    pgid="pgtrigger_before_update_update_25029",
+                    table="tests_coalescemodel",
+                    timing="DEFERRABLE INITIALLY DEFERRED",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
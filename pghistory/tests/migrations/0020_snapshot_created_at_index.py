@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:19
+# flake8: noqa
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tests", "0019_coalesce_xact_id"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="snapshotmodelsnapshot",
+            index=models.Index(
+                fields=["pgh_created_at", "pgh_id"],
+                name="tests_snaps_pgh_cre_00651d_idx",
+            ),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import datetime as dt
+
 from django.contrib.auth.models import User
 from django.db import models
 
@@ -80,6 +82,7 @@ class UniqueConstraintModel(models.Model):
     pghistory.UpdateEvent("snapshot_update"),
     model_name="SnapshotModelSnapshot",
     obj_field=pghistory.ObjForeignKey(related_name="snapshot"),
+    created_at_index=True,
 )
 @pghistory.track(
     pghistory.InsertEvent("no_pgh_obj_snapshot_insert"),
@@ -171,7 +174,9 @@ CustomEventWithContext = pghistory.create_event_model(
 
 
 class CustomEventProxy(EventModel.pgh_event_models["model.create"]):
-    url = pghistory.ProxyField("pgh_context__metadata__url", models.TextField(null=True))
+    url = pghistory.ProxyField(
+        "pgh_context__metadata__url", models.TextField(null=True), indexed=True
+    )
     auth_user = pghistory.ProxyField(
         "pgh_context__metadata__user",
         models.ForeignKey("auth.User", on_delete=models.DO_NOTHING, null=True),
@@ -211,3 +216,111 @@ class IgnoreAutoFieldsSnapshotModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     my_char_field = models.CharField(max_length=32)
     my_int_field = models.IntegerField()
+
+
+@pghistory.track(
+    pghistory.InsertEvent(level=pghistory.Statement),
+    pghistory.UpdateEvent(level=pghistory.Statement),
+    pghistory.UpdateEvent(
+        "int_field_before_update",
+        row=pghistory.Old,
+        condition=pghistory.AnyChange("int_field"),
+        level=pghistory.Statement,
+    ),
+    pghistory.DeleteEvent(level=pghistory.Statement),
+)
+class StatementModel(models.Model):
+    """For testing statement-level event triggers"""
+
+    int_field = models.IntegerField()
+    char_field = models.CharField(max_length=32)
+
+
+@pghistory.track(
+    pghistory.InsertEvent(),
+    pghistory.UpdateEvent(),
+    pghistory.ManualEvent("manual_event"),
+    store_diff=True,
+)
+class StoreDiffModel(models.Model):
+    """For testing event models that store diffs"""
+
+    int_field = models.IntegerField()
+    char_field = models.CharField(max_length=32)
+
+
+@pghistory.track(
+    pghistory.InsertEvent(),
+    pghistory.UpdateEvent(),
+    pghistory.ManualEvent("manual_event"),
+    storage="delta",
+)
+class DeltaModel(models.Model):
+    """For testing event models that only store deltas"""
+
+    int_field = models.IntegerField()
+    char_field = models.CharField(max_length=32, null=True)
+    text_field = models.TextField(default="")
+
+
+@pghistory.track(
+    pghistory.UpdateEvent(ignore_changes=["last_seen_at", "view_count"]),
+)
+class IgnoreChangesModel(models.Model):
+    """For testing update events that ignore changes to some fields"""
+
+    int_field = models.IntegerField()
+    last_seen_at = models.DateTimeField(null=True)
+    view_count = models.IntegerField(default=0)
+
+
+@pghistory.track(
+    pghistory.UpdateEvent(coalesce="transaction"),
+    pghistory.UpdateEvent("before_update", row=pghistory.Old, coalesce="transaction"),
+)
+class CoalesceModel(models.Model):
+    """For testing update events coalesced per transaction"""
+
+    int_field = models.IntegerField()
+
+
+@pghistory.track(
+    pghistory.InsertEvent(),
+    pghistory.UpdateEvent(),
+    pghistory.DeleteEvent(level=pghistory.Statement),
+    capture="async",
+    store_diff=True,
+)
+class AsyncModel(models.Model):
+    """For testing event models with asynchronous capture"""
+
+    int_field = models.IntegerField()
+    char_field = models.CharField(max_length=32, null=True)
+
+
+@pghistory.track(
+    pghistory.InsertEvent(),
+    pghistory.UpdateEvent(),
+    pghistory.UpdateEvent("before_update", row=pghistory.Old),
+    pghistory.DeleteEvent(),
+    capture="logical",
+    store_diff=True,
+)
+class LogicalModel(models.Model):
+    """For testing event models captured with logical replication"""
+
+    int_field = models.IntegerField()
+    char_field = models.CharField(max_length=32, null=True)
+
+
+@pghistory.track(
+    pghistory.InsertEvent(),
+    pghistory.UpdateEvent(),
+    append_only=True,
+    partition_by=pghistory.TimePartition("month", retention=dt.timedelta(days=365)),
+    retention=pghistory.Retention(keep_last=1, labels=["update"]),
+)
+class PartitionModel(models.Model):
+    """For testing partitioned event models"""
+
+    int_field = models.IntegerField()
@@ -0,0 +1,108 @@
+import datetime as dt
+import io
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+import pghistory
+import pghistory.models
+import pghistory.tests.models as test_models
+from pghistory import archive
+
+
+def _get_events(event_model):
+    return list(
+        event_model.objects.order_by("pgh_id").values(
+            "pgh_id", "pgh_created_at", "pgh_label", "pgh_diff", "pgh_context_id", "int_field"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_archive_and_restore(tmp_path):
+    """
+    Verifies old events and unreferenced context are archived to files and restored
+    """
+    event_model = test_models.StoreDiffModel.pgh_event_model
+    with pghistory.context(key="value"):
+        m = test_models.StoreDiffModel.objects.create(int_field=1, char_field="a")
+        m.int_field = 2
+        m.save()
+
+    events = _get_events(event_model)
+    contexts = list(pghistory.models.Context.objects.values())
+    storage = FileSystemStorage(location=tmp_path)
+
+    assert archive.archive(timezone.now() - dt.timedelta(days=1), storage=storage) == []
+    assert _get_events(event_model) == events
+
+    progress = []
+    before = timezone.now() + dt.timedelta(days=1)
+    stamp = f"{before:%Y%m%dT%H%M%S}"
+    names = archive.archive(
+        before,
+        event_models=[event_model],
+        storage=storage,
+        batch_size=1,
+        progress=lambda model, deleted: progress.append((model, deleted)),
+    )
+    assert names == [
+        f"tests.storediffmodelevent/{stamp}.jsonl.gz",
+        f"pghistory.context/{stamp}.jsonl.gz",
+    ]
+    assert progress == [
+        (event_model, 1),
+        (event_model, 2),
+        (pghistory.models.Context, 1),
+    ]
+    assert not event_model.objects.exists()
+    assert not pghistory.models.Context.objects.exists()
+
+    # Restoring is idempotent and doesn't run event triggers
+    assert archive.restore(names, storage=storage, batch_size=1) == 3
+    assert archive.restore(names, storage=storage) == 0
+    assert _get_events(event_model) == events
+    assert list(pghistory.models.Context.objects.values()) == contexts
+
+    with pytest.raises(ValueError, match="No archive storage"):
+        archive.archive(timezone.now())
+
+
+@pytest.mark.django_db
+def test_archive_commands(tmp_path):
+    """
+    Verifies the pghistory_archive and pghistory_import commands
+    """
+    m = test_models.StoreDiffModel.objects.create(int_field=1, char_field="a")
+    before = (timezone.now() + dt.timedelta(seconds=1)).replace(microsecond=0)
+
+    out = io.StringIO()
+    call_command(
+        "pghistory_archive",
+        "tests.StoreDiffModelEvent",
+        "--before",
+        before.isoformat(),
+        "--no-contexts",
+        "--directory",
+        str(tmp_path),
+        stdout=out,
+    )
+    name = f"tests.storediffmodelevent/{before:%Y%m%dT%H%M%S}.jsonl.gz"
+    assert out.getvalue().splitlines() == [
+        "tests.StoreDiffModelEvent: archived 1 rows...",
+        f"Archived {name}",
+    ]
+    assert not m.events.exists()
+
+    out = io.StringIO()
+    call_command("pghistory_import", name, "--directory", str(tmp_path), stdout=out)
+    assert out.getvalue() == "Imported 1 rows\n"
+    assert m.events.get().int_field == 1
+
+    with pytest.raises(CommandError, match="--before or --days"):
+        call_command("pghistory_archive", "--directory", str(tmp_path))
+
+    with pytest.raises(CommandError, match="--directory"):
+        call_command("pghistory_archive", "--days", "1")
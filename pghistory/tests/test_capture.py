@@ -0,0 +1,153 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.utils.dateparse import parse_datetime
+
+import pghistory
+import pghistory.models
+import pghistory.tests.models as test_models
+from pghistory import capture
+
+
+@pytest.mark.django_db
+def test_drain():
+    """
+    Verifies events captured asynchronously are queued and drained into event tables
+    """
+    event_model = test_models.AsyncModel.pgh_event_model
+    with pghistory.context(key="value") as ctx:
+        m = test_models.AsyncModel.objects.create(int_field=1)
+        m.int_field = 2
+        m.char_field = "a"
+        m.save()
+        test_models.AsyncModel.objects.filter(pk=m.pk).delete()
+
+    assert not event_model.objects.exists()
+    queued = list(pghistory.models.EventQueue.objects.order_by("id").values_list("row", flat=True))
+    assert [row["pgh_label"] for row in queued] == ["insert", "update", "delete"]
+
+    progress = []
+    assert capture.drain(batch_size=2, progress=progress.append) == 3
+    assert progress == [2, 3]
+    assert not pghistory.models.EventQueue.objects.exists()
+    assert list(
+        event_model.objects.order_by("pgh_id").values_list(
+            "pgh_label", "pgh_obj_id", "int_field", "char_field", "pgh_context_id", "pgh_diff"
+        )
+    ) == [
+        ("insert", m.pk, 1, None, ctx.id, None),
+        ("update", m.pk, 2, "a", ctx.id, {"int_field": [1, 2], "char_field": [None, "a"]}),
+        ("delete", m.pk, 2, "a", ctx.id, None),
+    ]
+    assert [event.pgh_created_at for event in event_model.objects.order_by("pgh_id")] == [
+        parse_datetime(row["pgh_created_at"]) for row in queued
+    ]
+
+    out = io.StringIO()
+    call_command("pghistory_drain", stdout=out)
+    assert out.getvalue() == "Drained 0 events\n"
+
+
+@pytest.mark.django_db
+def test_drain_lock():
+    """
+    Verifies drainers wait for each other so that events are inserted in queue order
+    """
+    other = connections.create_connection("default")
+    try:
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [capture._drain_lock_key])
+
+        test_models.AsyncModel.objects.create(int_field=1)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = '100ms'")
+
+        with pytest.raises(DatabaseError, match="lock timeout"):
+            capture.drain()
+    finally:
+        other.close()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "version, wal_level, expected_error",
+    [
+        (120015, "logical", "Logical capture requires Postgres 14 or later."),
+        (160000, "replica", "Logical capture requires wal_level = logical."),
+        (160000, "logical", None),
+    ],
+)
+def test_replication_requirements(mocker, version, wal_level, expected_error):
+    """
+    Verifies logical capture requires Postgres 14 and logical decoding
+    """
+    cursor = mocker.Mock(fetchone=mocker.Mock(return_value=(version, wal_level)))
+    assert capture._get_replication_error(cursor) == expected_error
+
+    mocker.patch.object(capture, "_get_replication_error", return_value="error")
+    with pytest.raises(RuntimeError, match="error"):
+        capture.setup_replication()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replicate():
+    """
+    Verifies events captured with logical replication are created from the changes
+    of a replication slot
+    """
+    with connection.cursor() as cursor:
+        error = capture._get_replication_error(cursor)
+        if error:
+            pytest.skip(error)
+
+    event_model = test_models.LogicalModel.pgh_event_model
+    kwargs = {"slot": "pghistory_test", "publication": "pghistory_test"}
+    capture.setup_replication(**kwargs)
+    try:
+        with pghistory.context(key="value") as ctx:
+            m = test_models.LogicalModel.objects.create(int_field=1)
+            m.int_field = 2
+            m.char_field = "a"
+            m.save()
+            # Updates without changes don't create events
+            m.save()
+
+        m2 = test_models.LogicalModel.objects.create(int_field=3)
+        test_models.LogicalModel.objects.filter(pk=m.pk).delete()
+
+        # Events aren't created by triggers
+        assert not event_model.objects.exists()
+
+        progress = []
+        assert capture.replicate(batch_size=1, progress=progress.append, **kwargs) == 5
+        assert progress[-1] == 5
+        events = list(
+            event_model.objects.order_by("pgh_id").values_list(
+                "pgh_label", "pgh_obj_id", "int_field", "char_field", "pgh_context_id", "pgh_diff"
+            )
+        )
+        assert events == [
+            ("insert", m.pk, 1, None, ctx.id, None),
+            ("before_update", m.pk, 1, None, ctx.id, None),
+            ("update", m.pk, 2, "a", ctx.id, {"int_field": [1, 2], "char_field": [None, "a"]}),
+            ("insert", m2.pk, 3, None, None, None),
+            ("delete", m.pk, 2, "a", None, None),
+        ]
+        context = pghistory.models.Context.objects.get()
+        assert context.id == ctx.id
+        assert context.metadata == {"key": "value"}
+        created_at = set(event_model.objects.values_list("pgh_created_at", flat=True))
+        assert context.created_at in created_at
+
+        # Consumed changes are skipped
+        assert capture.replicate(**kwargs) == 0
+
+        out = io.StringIO()
+        call_command("pghistory_replicate", stdout=out, **kwargs)
+        assert out.getvalue() == "Created 0 events\n"
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_drop_replication_slot('pghistory_test')")
+            cursor.execute("DROP PUBLICATION pghistory_test")
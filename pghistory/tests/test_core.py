@@ -5,11 +5,12 @@ from contextlib import ExitStack as no_exception
 import ddf
 import pytest
 from django.apps import apps
-from django.db import DatabaseError, models
+from django.db import DatabaseError, connection, models
 from django.utils import timezone
 
 import pghistory
 import pghistory.core
+import pghistory.models
 import pghistory.tests.models as test_models
 from pghistory import config, constants
 
@@ -210,6 +211,70 @@ def test_create_event():
         assert event.pgh_context.metadata == {"hello": "world"}
 
 
+@pytest.mark.django_db
+def test_create_event_plan(mocker):
+    """
+    Verifies the insert statement of manual events is only compiled once
+    per event model and that context is attached to precompiled statements
+    """
+    pghistory.core._insert_event_plans.clear()
+    as_sql = mocker.spy(pghistory.core._InsertEventCompiler, "as_sql")
+    m = ddf.G("tests.DenormContext")
+
+    with pghistory.context(hello="world"):
+        for _ in range(3):
+            event = pghistory.create_event(m, label="snapshot_no_id_insert")
+            assert event.pgh_obj_id == m.id
+            assert event.int_field == m.int_field
+            assert event.pgh_context == {"hello": "world"}
+            assert event.pgh_created_at.tzinfo
+
+    assert as_sql.call_count == 1
+    # One event is created by the insert trigger
+    assert (
+        test_models.DenormContextEventNoId.objects.filter(
+            pgh_label="snapshot_no_id_insert"
+        ).count()
+        == 4
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_create_events(django_assert_num_queries):
+    """
+    Verifies events can be created manually in bulk and are linked with
+    context
+    """
+    ms = ddf.G("tests.EventModel", n=5)
+    with pytest.raises(ValueError, match="not a registered tracker"):
+        pghistory.bulk_create_events(ms, label="invalid_event")
+
+    with pghistory.context(hello="world") as ctx:
+        with django_assert_num_queries(3):
+            events = pghistory.bulk_create_events(ms, label="manual_event", batch_size=2)
+
+    assert [event.pgh_obj_id for event in events] == [m.id for m in ms]
+    assert [event.int_field for event in events] == [m.int_field for m in ms]
+    assert all(event.pgh_id for event in events)
+    assert {event.pgh_context_id for event in events} == {ctx.id}
+    assert (
+        test_models.EventModelEvent.objects.filter(
+            pgh_label="manual_event", pgh_context_id=ctx.id
+        ).count()
+        == 5
+    )
+
+    # Denormalized context is also attached
+    denorm = ddf.G("tests.DenormContext", n=2)
+    with pghistory.context(hello="world") as ctx:
+        events = pghistory.bulk_create_events(denorm, label="snapshot_no_id_insert")
+
+    assert [event.pgh_obj_id for event in events] == [d.id for d in denorm]
+    assert [event.pgh_context for event in events] == [{"hello": "world"}] * 2
+
+    assert pghistory.bulk_create_events([], label="manual_event") == []
+
+
 @pytest.mark.django_db
 def test_events_on_event_model(mocker):
     """
@@ -705,3 +770,136 @@ def test_custom_ignore_auto_fields_tracker():
     m.delete()
 
     assert snapshot_model.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_update_event_ignore_changes():
+    """
+    Verifies update events don't fire when only ignored fields change, but still
+    store the ignored fields
+    """
+    m = test_models.IgnoreChangesModel.objects.create(int_field=0)
+    now = timezone.now()
+
+    m.last_seen_at = now
+    m.view_count = 1
+    m.save()
+    test_models.IgnoreChangesModel.objects.update(view_count=2)
+    assert not m.events.exists()
+
+    m.refresh_from_db()
+    m.int_field = 1
+    m.save()
+    assert list(m.events.values_list("int_field", "last_seen_at", "view_count")) == [(1, now, 2)]
+
+    with pytest.raises(ValueError, match="ignore_changes requires"):
+        pghistory.UpdateEvent(
+            condition=pghistory.Q(new__int_field=1), ignore_changes=["view_count"]
+        )
+
+
+@pytest.mark.django_db
+def test_update_event_coalesce():
+    """
+    Verifies coalesced update events store one event per object and transaction
+    """
+    m = test_models.CoalesceModel.objects.create(int_field=0)
+    deleted = test_models.CoalesceModel.objects.create(int_field=0)
+    for value in [1, 2, 3]:
+        m.int_field = value
+        m.save()
+
+    deleted.int_field = 1
+    deleted.save()
+    deleted_pk = deleted.pk
+    deleted.delete()
+
+    # Coalesced events are stored when the transaction commits
+    assert not test_models.CoalesceModel.pgh_event_model.objects.exists()
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    assert list(m.events.order_by("pgh_label").values_list("pgh_label", "int_field")) == [
+        ("before_update", 0),
+        ("update", 3),
+    ]
+    assert list(
+        test_models.CoalesceModel.pgh_event_model.objects.filter(
+            pgh_obj_id=deleted_pk
+        ).values_list("pgh_label", "int_field")
+    ) == [("before_update", 0)]
+
+    assert m.events.filter(pgh_xact_id__isnull=False).count() == 2
+
+    with pytest.raises(ValueError, match="coalesce must be"):
+        pghistory.UpdateEvent(coalesce="statement")
+
+    with pytest.raises(ValueError, match="can't be coalesced"):
+        pghistory.UpdateEvent(coalesce="transaction", level=pghistory.Statement)
+
+
+@pytest.mark.django_db
+def test_update_event_coalesce_other_transaction():
+    """
+    Verifies events of other transactions with the same creation time don't
+    prevent coalesced update events from being stored
+    """
+    event_model = test_models.CoalesceModel.pgh_event_model
+    m = test_models.CoalesceModel.objects.create(int_field=0)
+    other = event_model.objects.create(pgh_obj=m, id=m.pk, int_field=0, pgh_label="update")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE "{event_model._meta.db_table}"'
+            " SET pgh_created_at = NOW(), pgh_xact_id = TXID_CURRENT() + 1 WHERE pgh_id = %s",
+            [other.pgh_id],
+        )
+
+    m.int_field = 1
+    m.save()
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    assert list(
+        m.events.filter(pgh_label="update").order_by("pgh_id").values_list("int_field", flat=True)
+    ) == [0, 1]
+
+
+@pytest.mark.django_db
+def test_statement_level_tracking():
+    """Verify statement-level event triggers create events for every row of a statement"""
+    with pghistory.context(key="value") as ctx:
+        test_models.StatementModel.objects.bulk_create(
+            [test_models.StatementModel(int_field=i, char_field=str(i)) for i in range(3)]
+        )
+
+    assert list(
+        test_models.StatementModelEvent.objects.values_list(
+            "pgh_label", "int_field", "pgh_context_id"
+        ).order_by("int_field")
+    ) == [("insert", 0, ctx.id), ("insert", 1, ctx.id), ("insert", 2, ctx.id)]
+
+    # Updates that don't change any rows should not create events
+    test_models.StatementModel.objects.update(int_field=models.F("int_field"))
+    assert test_models.StatementModelEvent.objects.count() == 3
+
+    # Only rows that change the int_field create "int_field_before_update" events
+    test_models.StatementModel.objects.filter(int_field__gte=1).update(char_field="changed")
+    test_models.StatementModel.objects.filter(int_field=2).update(int_field=20)
+    assert list(
+        test_models.StatementModelEvent.objects.filter(pgh_label="update")
+        .values_list("int_field", "char_field")
+        .order_by("pgh_id")
+    ) == [(1, "changed"), (2, "changed"), (20, "changed")]
+    assert list(
+        test_models.StatementModelEvent.objects.filter(
+            pgh_label="int_field_before_update"
+        ).values_list("int_field", "char_field")
+    ) == [(2, "changed")]
+
+    test_models.StatementModel.objects.all().delete()
+    assert set(
+        test_models.StatementModelEvent.objects.filter(pgh_label="delete").values_list(
+            "int_field", flat=True
+        )
+    ) == {0, 1, 20}
+    assert pghistory.models.Context.objects.count() == 1
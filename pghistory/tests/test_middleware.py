@@ -32,7 +32,8 @@ def test_middleware(rf, mocker):
     """
 
     def get_response(request):
-        return getattr(pghistory.runtime._tracker, "value", None)
+        tracker = pghistory.runtime._tracker.get()
+        return tracker.value if tracker else None
 
     # A GET request will initiate the tracker
     resp = pghistory.middleware.HistoryMiddleware(get_response)(rf.get("/get/url/"))
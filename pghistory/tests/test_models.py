@@ -1,9 +1,15 @@
+import collections
 import datetime as dt
+import io
+import uuid
 
 import ddf
 import django
 import pytest
 from django.core.management import call_command
+from django.db import connection, models
+from django.db.migrations.writer import MigrationWriter
+from django.db.models import Count, F, Q
 
 import pghistory.models
 import pghistory.tests.models as test_models
@@ -58,6 +64,66 @@ def test_custom_event_proxy():
             {"url": "https://www.google.com", "auth_user__username": "hello"}
         ]
 
+        # Proxy fields are compiled as expressions in the query
+        qset = test_models.CustomEventProxy.objects.filter(
+            url="https://www.google.com", auth_user__username="hello"
+        ).order_by("url")
+        assert "WITH" not in str(qset.query)
+        # Joins on proxied foreign keys are made on the proxy expression
+        join = str(qset.query).split('JOIN "auth_user" ON ')[1].split(" WHERE ")[0]
+        assert '"pghistory_context"."metadata"' in join
+        assert qset.count() == 1
+        assert qset.get().auth_user == user
+        assert not test_models.CustomEventProxy.objects.filter(url="https://www.bing.com")
+
+
+@pytest.mark.django_db
+def test_proxy_indexes(tmp_path, mocker):
+    """Verifies filters on indexed proxy fields use the expression indexes"""
+    index_names = [index.name for _, index in pghistory.models._get_proxy_indexes()]
+    assert len(index_names) == 4
+
+    def explain(qset):
+        with connection.cursor() as cursor:
+            sql, params = qset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+
+    plan = explain(test_models.CustomEventProxy.objects.filter(url="https://www.google.com"))
+    assert "pghistory_context_url_" in plan
+    plan = explain(pghistory.models.MiddlewareEvents.objects.filter(user=1))
+    assert "pghistory_context_user_" in plan
+
+    # Indexes that are already created by migrations are skipped
+    out = io.StringIO()
+    call_command("pghistory_indexes", "tests", stdout=out)
+    assert out.getvalue() == "No proxy indexes to create\n"
+
+    mocker.patch.object(
+        pghistory.models,
+        "_get_proxy_indexes",
+        return_value=[
+            (
+                pghistory.models.Context,
+                models.Index(models.F("metadata__key"), name="pghistory_context_key"),
+            )
+        ],
+    )
+    out = io.StringIO()
+    call_command("pghistory_indexes", "tests", dry_run=True, stdout=out)
+    assert out.getvalue().startswith('CREATE INDEX "pghistory_context_key"')
+
+    path = tmp_path / "migration.py"
+    mocker.patch.object(MigrationWriter, "path", str(path))
+    call_command("pghistory_indexes", "tests", name="proxy_key", stdout=io.StringIO())
+    migration = path.read_text()
+    assert "0021_proxy_key" not in migration
+    assert "('tests', '0020_snapshot_created_at_index')" in migration
+    assert 'CREATE INDEX "pghistory_context_key"' in migration
+
 
 @pytest.mark.django_db
 def test_aggregate_event_default_manager():
@@ -100,6 +166,180 @@ def test_events_tracks(django_assert_num_queries):
 
     assert pghistory.models.Events.objects.tracks([dc1]).count() == 2
 
+    # Primary keys are bound as parameters of their native type
+    cm1 = test_models.CustomModel.objects.create(my_pk=uuid.uuid4(), int_field=1)
+    cm2 = test_models.CustomModel.objects.create(my_pk=uuid.uuid4(), int_field=1)
+    events = pghistory.models.Events.objects.tracks(cm1, cm2)
+    sql, params = events.query.sql_with_params()
+    assert str(cm1.pk) not in sql
+    assert "= ANY(%s::uuid[])" in sql
+    assert [cm1.pk, cm2.pk] in params
+    assert events.count() == 2
+
+    # Querysets are compiled as subqueries
+    events = pghistory.models.Events.objects.tracks(
+        test_models.CustomModel.objects.filter(my_pk=cm1.pk)
+    )
+    assert "IN (SELECT" in str(events.query)
+    assert events.count() == 1
+
+
+@pytest.mark.django_db
+def test_events_stream(django_assert_num_queries):
+    """
+    Tests streaming events with keyset pagination
+    """
+    with pghistory.context(key="value"):
+        ss1 = ddf.G(test_models.SnapshotModel)
+        ss2 = ddf.G(test_models.SnapshotModel)
+        for _ in range(2):
+            ss1.int_field += 1
+            ss1.save()
+            ss2.int_field += 1
+            ss2.save()
+
+    def event_values(events):
+        return [(e.pgh_slug, e.pgh_data, e.pgh_diff, e.pgh_context, e.pgh_obj_id) for e in events]
+
+    events = pghistory.models.Events.objects.tracks(ss1, ss2)
+    expected = event_values(events.order_by("pgh_created_at", "pgh_model", "pgh_id"))
+    assert len(expected) == 20
+    assert len({e[2] is not None for e in expected}) == 2
+
+    with django_assert_num_queries(4):
+        assert event_values(events.stream(chunk_size=6)) == expected
+
+    # Diffs are the same when reading a chunk from the middle of the events
+    streamed = list(events.stream(chunk_size=6))
+    assert event_values(events.stream(after=streamed[8], chunk_size=6)) == expected[9:]
+    assert (
+        event_values(
+            events.stream(
+                after=(
+                    streamed[8].pgh_created_at,
+                    streamed[8].pgh_model,
+                    streamed[8].pgh_id,
+                ),
+                chunk_size=100,
+            )
+        )
+        == expected[9:]
+    )
+
+    # Filters are applied to the streamed events
+    updates = events.filter(pgh_label="snapshot_update")
+    expected = event_values(updates.order_by("pgh_created_at", "pgh_model", "pgh_id"))
+    assert len(expected) == 4
+    assert event_values(updates.stream(after=streamed[0], chunk_size=2)) == expected
+
+    with pytest.raises(ValueError, match="values"):
+        list(events.values().stream())
+
+    # Chunks read events after the previous chunk with the created_at index
+    chunk_qs = pghistory.models.Events.objects.across(test_models.SnapshotModelSnapshot).order_by(
+        "pgh_created_at", "pgh_model", "pgh_id"
+    )
+    chunk_qs.query.after = (streamed[8].pgh_created_at, streamed[8].pgh_model, streamed[8].pgh_id)
+    chunk_qs.query.chunk_size = 2
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        sql, params = chunk_qs[:2].query.sql_with_params()
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+
+    assert "tests_snaps_pgh_cre_00651d_idx" in plan
+
+
+@pytest.mark.django_db
+def test_events_filter_pushdown():
+    """
+    Tests that filters on shared pgh_* columns are pushed into the select
+    of each event table without changing diffs
+    """
+    ss = ddf.G(test_models.SnapshotModel)
+    for _ in range(3):
+        ss.int_field += 1
+        ss.save()
+
+    events = pghistory.models.Events.objects.tracks(ss).order_by("pgh_model", "pgh_id")
+    all_events = [(e.pgh_slug, e.pgh_label, e.pgh_diff) for e in events]
+    last_event = pghistory.models.Events.objects.order_by("-pgh_id").first()
+
+    pushed = events.filter(pgh_label="snapshot_update", pgh_id__lte=last_event.pgh_id)
+    expected = [e for e in all_events if e[1] == "snapshot_update"]
+    assert len(expected) == 3
+    assert all(e[2] for e in expected)
+    assert [(e.pgh_slug, e.pgh_label, e.pgh_diff) for e in pushed] == expected
+
+    sql = str(pushed.query)
+    # The filter is pushed into the selects of the four event models that track SnapshotModel
+    assert sql.count('"_event"."pgh_label" = snapshot_update') == 4
+
+    # Filters that can't be pushed down are still applied
+    not_pushed = events.filter(Q(pgh_label="snapshot_update") | Q(pgh_label="snapshot_insert"))
+    assert '"_event"."pgh_label"' not in str(not_pushed.query)
+    assert [(e.pgh_slug, e.pgh_label, e.pgh_diff) for e in not_pushed] == [
+        e for e in all_events if e[1] in ("snapshot_update", "snapshot_insert")
+    ]
+
+    # Filters on pgh_* columns of other tables aren't pushed down
+    query = events.filter(pgh_id__lte=last_event.pgh_id).query
+    query.where.children[-1] = query.where.children[-1].relabeled_clone(
+        {query.base_table: "other"}
+    )
+    conditions, _, all_pushed = query.get_compiler("default")._get_filter_conditions(
+        test_models.SnapshotModelSnapshot
+    )
+    assert not conditions
+    assert not all_pushed
+
+
+@pytest.mark.django_db
+def test_events_pruning():
+    """
+    Tests that event tables are left out of the Events query when filters on
+    the model or tracked model can't match their events
+    """
+    ss = ddf.G(test_models.SnapshotModel)
+    ss.int_field += 1
+    ss.save()
+    events = pghistory.models.Events.objects.order_by("pgh_model", "pgh_id")
+    all_events = [(e.pgh_model, e.pgh_obj_model, e.pgh_label) for e in events]
+
+    def assert_pruned(qset, expected_tables, matches):
+        sql = str(qset.query)
+        assert sql.count("UNION ALL") == max(expected_tables - 1, 0)
+        assert [(e.pgh_model, e.pgh_obj_model, e.pgh_label) for e in qset] == [
+            e for e in all_events if matches(e)
+        ]
+
+    assert_pruned(
+        events.filter(pgh_model__in=["tests.SnapshotModelSnapshot", "tests.CustomSnapshotModel"]),
+        2,
+        lambda e: e[0] in ("tests.SnapshotModelSnapshot", "tests.CustomSnapshotModel"),
+    )
+    assert_pruned(
+        events.filter(
+            pgh_obj_model="tests.SnapshotModel", pgh_model="tests.SnapshotModelSnapshot"
+        ),
+        1,
+        lambda e: e[1] == "tests.SnapshotModel" and e[0] == "tests.SnapshotModelSnapshot",
+    )
+    assert_pruned(
+        events.filter(pgh_model="tests.SnapshotModelSnapshot").filter(
+            pgh_model="tests.CustomSnapshotModel"
+        ),
+        0,
+        lambda e: False,
+    )
+    assert "UNION ALL" in str(events.exclude(pgh_model="tests.SnapshotModelSnapshot").query)
+
+    # Events with labels of trackers that no longer exist are found by label
+    test_models.SnapshotModelSnapshot.objects.filter(pgh_obj=ss).update(pgh_label="old_label")
+    assert [
+        e.pgh_model for e in pghistory.models.Events.objects.filter(pgh_label="old_label")
+    ] == ["tests.SnapshotModelSnapshot", "tests.SnapshotModelSnapshot"]
+
 
 @pytest.mark.django_db(transaction=True)
 def test_events_no_references(django_assert_num_queries):
@@ -510,6 +750,58 @@ def test_events_usage():
         )
 
 
+@pytest.mark.django_db
+def test_events_used_columns():
+    """Verifies the Events query only reads the columns used by the outer query"""
+    m = test_models.SnapshotModel.objects.create(int_field=1, dt_field=dt.datetime(2020, 1, 1))
+    m.int_field = 2
+    m.save()
+
+    events = pghistory.models.Events.objects.tracks(m).order_by("pgh_model", "pgh_id")
+    sql = str(events.query)
+    assert sql.count("TO_JSONB(_event)") == sql.count("TO_JSONB(") > 0
+    assert "LAG(" in sql
+
+    sql = str(events.values("pgh_label", "pgh_data").query)
+    assert "TO_JSONB(_event)" in sql
+    assert "LAG(" not in sql
+
+    sql = str(events.values("pgh_label").query)
+    assert "TO_JSONB(" not in sql
+    assert "LAG(" not in sql
+
+    sql = str(events.filter(pgh_diff__has_key="int_field").values("pgh_label").query)
+    assert "LAG(" in sql
+
+    # Columns of raw SQL can't be determined
+    sql = str(events.extra(select={"diff": "pgh_diff"}).values("diff").query)
+    assert "LAG(" in sql
+
+    # Context and other columns are only read when they are used
+    events = pghistory.models.MiddlewareEvents.objects.tracks(m)
+    sql = str(events.values("pgh_label").annotate(num=Count("*")).query)
+    assert "_pgh_context" not in sql
+    assert "NULL::BIGINT AS pgh_id" in sql
+    assert "ORDER BY _event.pgh_id" not in sql
+    assert "_pgh_context" in str(events.values("user").query)
+    assert "_pgh_context" in str(events.filter(pgh_context__has_key="user").values("pgh_id").query)
+    assert "ORDER BY _event.pgh_id" in str(events.values("pgh_label").query)
+    assert {
+        row["pgh_label"]: row["num"]
+        for row in events.values("pgh_label").annotate(num=Count("*")).order_by()
+    } == collections.Counter(event.pgh_label for event in events)
+
+    events = events.order_by("pgh_model", "pgh_id")
+    full = list(events.values())
+    assert any(event["pgh_diff"] for event in full)
+    assert list(events.values("pgh_slug", "pgh_data")) == [
+        {"pgh_slug": event["pgh_slug"], "pgh_data": event["pgh_data"]} for event in full
+    ]
+    assert list(events.values("pgh_slug", "pgh_diff")) == [
+        {"pgh_slug": event["pgh_slug"], "pgh_diff": event["pgh_diff"]} for event in full
+    ]
+
+
 @pytest.mark.django_db
 def test_events_references_no_obj_tracking_filters(mocker):
     """
@@ -909,3 +1201,118 @@ def test_custom_foreign_key_to_m2m_through():
     will perform model checks using Django's check framework
     """
     call_command("check")
+
+
+@pytest.mark.django_db
+def test_events_stored_diff():
+    """
+    Tests event models that store the diff with the previous event
+    """
+    m = test_models.StoreDiffModel.objects.create(int_field=1, char_field="a")
+    m.int_field = 2
+    m.save()
+    m.int_field = 3
+    m.char_field = "b"
+    m.save()
+    pghistory.create_event(m, label="manual_event")
+
+    assert list(m.events.order_by("pgh_id").values_list("pgh_label", "pgh_diff")) == [
+        ("insert", None),
+        ("update", {"int_field": [1, 2]}),
+        ("update", {"int_field": [2, 3], "char_field": ["a", "b"]}),
+        ("manual_event", None),
+    ]
+
+    events = pghistory.models.Events.objects.tracks(m).order_by("pgh_id")
+    assert "LAG(" not in str(events.query)
+    assert list(events.values_list("pgh_diff", flat=True)) == [
+        None,
+        {"int_field": [1, 2]},
+        {"int_field": [2, 3], "char_field": ["a", "b"]},
+        None,
+    ]
+
+    with pytest.raises(ValueError, match="obj_field"):
+        pghistory.create_event_model(test_models.StoreDiffModel, obj_field=None, store_diff=True)
+
+
+@pytest.mark.django_db
+def test_events_delta_storage():
+    """
+    Tests event models that only store the changed fields of events
+    """
+    m = test_models.DeltaModel.objects.create(int_field=1, char_field="a", text_field="text")
+    m.int_field = 2
+    m.save()
+    m.char_field = None
+    m.save()
+    pghistory.create_event(m, label="manual_event")
+
+    assert list(
+        m.events.order_by("pgh_id").values_list(
+            "pgh_label", "pgh_changed", "id", "int_field", "char_field", "text_field"
+        )
+    ) == [
+        ("insert", None, m.id, 1, "a", "text"),
+        ("update", ["int_field"], None, 2, None, None),
+        ("update", ["char_field"], None, None, None, None),
+        ("manual_event", [], None, None, None, None),
+    ]
+
+    snapshots = m.events.snapshots().order_by("pgh_id")
+    assert list(snapshots.values_list("id", "int_field", "char_field", "text_field")) == [
+        (m.id, 1, "a", "text"),
+        (m.id, 2, "a", "text"),
+        (m.id, 2, None, "text"),
+        (m.id, 2, None, "text"),
+    ]
+    assert snapshots.filter(int_field=2).count() == 3
+
+    # Snapshots are used by subqueries and joins on the same event model
+    event_model = test_models.DeltaModel.pgh_event_model
+    nested = snapshots.filter(
+        pgh_id__in=event_model.objects.snapshots().filter(char_field=None).values("pgh_id")
+    )
+    assert list(nested.values_list("int_field", "char_field")) == [(2, None), (2, None)]
+    assert (
+        snapshots.filter(pgh_obj__events__pgh_id=F("pgh_id"), pgh_obj__events__int_field=2).count()
+        == 3
+    )
+
+    events = pghistory.models.Events.objects.tracks(m).order_by("pgh_id")
+    assert list(events.values_list("pgh_data", "pgh_diff")) == [
+        ({"id": m.id, "int_field": 1, "char_field": "a", "text_field": "text"}, None),
+        (
+            {"id": m.id, "int_field": 2, "char_field": "a", "text_field": "text"},
+            {"int_field": [1, 2]},
+        ),
+        (
+            {"id": m.id, "int_field": 2, "char_field": None, "text_field": "text"},
+            {"char_field": ["a", None]},
+        ),
+        ({"id": m.id, "int_field": 2, "char_field": None, "text_field": "text"}, None),
+    ]
+
+    # Deltas are reconstructed when reverting
+    m.events.order_by("pgh_id")[1].revert()
+    m.refresh_from_db()
+    assert (m.int_field, m.char_field, m.text_field) == (2, "a", "text")
+
+    # Full snapshots are periodically stored
+    for i in range(20):
+        m.int_field = i + 10
+        m.save()
+
+    checkpoints = m.events.filter(pgh_changed__isnull=True).order_by("pgh_id")
+    assert len(checkpoints) == 2
+    assert checkpoints[1].pgh_id == m.events.order_by("pgh_id")[20].pgh_id
+    assert m.events.snapshots().order_by("-pgh_id").values_list("int_field", flat=True)[0] == 29
+
+    with pytest.raises(ValueError, match="obj_field"):
+        pghistory.create_event_model(test_models.DeltaModel, obj_field=None, storage="delta")
+
+    with pytest.raises(ValueError, match="both"):
+        pghistory.create_event_model(test_models.DeltaModel, store_diff=True, storage="delta")
+
+    with pytest.raises(ValueError, match="storage"):
+        pghistory.create_event_model(test_models.DeltaModel, storage="invalid")
@@ -0,0 +1,179 @@
+import datetime as dt
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+import pghistory.models
+import pghistory.tests.models as test_models
+from pghistory import partition
+
+
+def _is_partitioned(event_model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+            [event_model._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def _get_partition(event):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT tableoid::regclass::text FROM "{event._meta.db_table}" WHERE pgh_id = %s',
+            [event.pgh_id],
+        )
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_partitioned_event_model():
+    """
+    Verifies event tables are partitioned and tracked like other event tables
+    """
+    event_model = test_models.PartitionModel.pgh_event_model
+    assert _is_partitioned(event_model)
+    assert partition.get_time_partition(event_model).name == "tests_partitionmodelevent_partition"
+
+    m = test_models.PartitionModel.objects.create(int_field=1)
+    m.int_field = 2
+    m.save()
+
+    assert list(m.events.order_by("pgh_id").values_list("pgh_label", "int_field")) == [
+        ("insert", 1),
+        ("update", 2),
+    ]
+    assert list(
+        pghistory.models.Events.objects.tracks(m).order_by("pgh_id").values_list("pgh_diff")
+    ) == [(None,), ({"int_field": [1, 2]},)]
+
+    # Triggers of the event table are installed on the partitioned table
+    with pytest.raises(DatabaseError):
+        with transaction.atomic():
+            m.events.update(int_field=3)
+
+
+def test_time_partition_deconstruct():
+    """
+    Verifies the premake and retention settings aren't part of the migration state
+    """
+    time_partition = pghistory.TimePartition("month", name="partition")
+    assert time_partition.deconstruct() == (
+        "pghistory.partition.TimePartition",
+        (),
+        {"interval": "month", "name": "partition"},
+    )
+    assert time_partition == pghistory.TimePartition(
+        "month", premake=1, retention=dt.timedelta(days=30), name="partition"
+    )
+    assert time_partition != pghistory.TimePartition("day", name="partition")
+
+    # Models keep the settings when cloning the constraint
+    time_partition = partition.get_time_partition(test_models.PartitionModel.pgh_event_model)
+    assert time_partition.retention == dt.timedelta(days=365)
+    assert time_partition.clone().retention == dt.timedelta(days=365)
+
+
+@pytest.mark.django_db
+def test_partition_maintenance():
+    """
+    Verifies partitions are created ahead of time and expired after the retention
+    """
+    event_model = test_models.PartitionModel.pgh_event_model
+    table = event_model._meta.db_table
+    start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start = initial_end = (start + dt.timedelta(days=32)).replace(day=1)
+    expected_created = []
+    for _ in range(3):
+        expected_created.append(f"{table}_p{start:%Y%m%d}")
+        start = (start + dt.timedelta(days=32)).replace(day=1)
+
+    assert partition.create_partitions(event_model) == expected_created
+    assert partition.create_partitions(event_model) == []
+
+    m = test_models.PartitionModel.objects.create(int_field=1)
+    assert partition.expire_partitions(event_model) == []
+    assert partition.expire_partitions(event_model, now=initial_end + dt.timedelta(days=365)) == [
+        f"{table}_initial"
+    ]
+    assert not m.events.exists()
+
+    out = io.StringIO()
+    call_command(
+        "pghistory_partition",
+        "tests.PartitionModelEvent",
+        "--drop",
+        stdout=out,
+    )
+    assert out.getvalue() == ""
+
+    out = io.StringIO()
+    partition.get_time_partition(event_model).retention = dt.timedelta(days=-365)
+    try:
+        call_command("pghistory_partition", "--drop", stdout=out)
+    finally:
+        partition.get_time_partition(event_model).retention = dt.timedelta(days=365)
+
+    assert out.getvalue().splitlines() == [f"Dropped {name}" for name in expected_created]
+
+    # Events are stored in the default partition when their partition doesn't exist
+    m = test_models.PartitionModel.objects.create(int_field=1)
+    assert _get_partition(m.events.get()) == f"{table}_default"
+
+    # Partitions are created from the current interval when none exist and
+    # events of the default partition are moved to them
+    created = partition.create_partitions(event_model)
+    assert len(created) == 4
+    assert _get_partition(m.events.get()) == created[0]
+    assert test_models.PartitionModel.objects.create(int_field=1).events.exists()
+
+    # The default partition is created if it doesn't exist
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{table}_default"')
+
+    assert partition.create_partitions(event_model) == [f"{table}_default"]
+
+
+def test_partition_names():
+    """
+    Verifies partition names of long table names are truncated and kept unique
+    """
+    table = "a" * 60
+    names = {
+        partition._get_partition_name(table + suffix, "_p20240101", connection)
+        for suffix in ("b", "c")
+    }
+    assert len(names) == 2
+    assert all(len(name) == 63 and name.endswith("_p20240101") for name in names)
+    assert (
+        partition._get_partition_name("tests_partitionmodelevent", "_p20240101", connection)
+        == "tests_partitionmodelevent_p20240101"
+    )
+
+
+@pytest.mark.django_db
+def test_remove_time_partition():
+    """
+    Verifies partitioned event tables can be converted back to regular tables
+    """
+    event_model = test_models.PartitionModel.pgh_event_model
+    time_partition = partition.get_time_partition(event_model)
+    m = test_models.PartitionModel.objects.create(int_field=1)
+
+    with connection.schema_editor() as editor:
+        editor.remove_constraint(event_model, time_partition)
+
+    assert not _is_partitioned(event_model)
+    assert m.events.get().int_field == 1
+
+    m.int_field = 2
+    m.save()
+
+    with connection.schema_editor() as editor:
+        editor.add_constraint(event_model, time_partition)
+
+    assert _is_partitioned(event_model)
+    assert list(m.events.order_by("pgh_id").values_list("int_field", flat=True)) == [1, 2]
@@ -0,0 +1,134 @@
+import datetime as dt
+import io
+
+import pgtrigger
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+import pghistory
+import pghistory.models
+import pghistory.tests.models as test_models
+from pghistory import retention
+
+
+def _update(m, values):
+    for value in values:
+        m.int_field = value
+        m.save()
+
+
+@pytest.mark.django_db
+def test_prune():
+    """
+    Verifies events matching retention policies are pruned in batches
+    """
+    m = test_models.PartitionModel.objects.create(int_field=0)
+    _update(m, [1, 2, 3, 4])
+    event_model = test_models.PartitionModel.pgh_event_model
+
+    progress = []
+    assert retention.prune(event_model, batch_size=1, progress=progress.append) == 3
+    assert progress == [1, 2, 3]
+    assert list(m.events.order_by("pgh_id").values_list("pgh_label", "int_field")) == [
+        ("insert", 0),
+        ("update", 4),
+    ]
+
+    max_age = pghistory.Retention(max_age=dt.timedelta(days=1))
+    assert retention.prune(event_model, max_age) == 0
+    assert retention.prune(event_model, max_age, now=timezone.now() + dt.timedelta(days=2)) == 2
+    assert not m.events.exists()
+
+    with pytest.raises(ValueError, match="Must provide"):
+        pghistory.Retention()
+
+    with pytest.raises(ValueError, match="keep_last must be at least 1"):
+        pghistory.Retention(keep_last=0)
+
+
+@pytest.mark.django_db
+def test_prune_delta_storage():
+    """
+    Verifies events of delta event models are only pruned when the remaining
+    events can be reconstructed
+    """
+    m = test_models.DeltaModel.objects.create(int_field=0, char_field="a")
+    _update(m, range(1, 5))
+    event_model = test_models.DeltaModel.pgh_event_model
+    policy = pghistory.Retention(keep_last=5)
+
+    # There is no full snapshot after the events
+    assert retention.prune(event_model, policy) == 0
+
+    _update(m, range(5, 25))
+    checkpoint = m.events.filter(pgh_changed__isnull=True).order_by("pgh_id").last()
+    assert checkpoint.int_field == 20
+
+    assert retention.prune(event_model, policy) == 20
+    assert list(
+        m.events.snapshots().order_by("pgh_id").values_list("int_field", "char_field")
+    ) == [(value, "a") for value in range(20, 25)]
+
+
+@pytest.mark.django_db
+def test_prune_contexts():
+    """
+    Verifies context that isn't referenced by events is pruned
+    """
+    with pghistory.context() as ctx:
+        test_models.PartitionModel.objects.create(int_field=0)
+
+    with pghistory.context() as orphan_ctx:
+        test_models.PartitionModel.objects.create(int_field=0)
+
+    with pgtrigger.ignore("tests.PartitionModelEvent:append_only"):
+        test_models.PartitionModel.pgh_event_model.objects.filter(
+            pgh_context_id=orphan_ctx.id
+        ).delete()
+
+    assert retention.prune_contexts() == 0
+    assert retention.prune_contexts(min_age=dt.timedelta()) == 1
+    assert list(pghistory.models.Context.objects.values_list("id", flat=True)) == [ctx.id]
+
+    # Context is scanned in windows of creation time
+    now = timezone.now()
+    for days in [30, 20, 10]:
+        pghistory.models.Context.objects.filter(
+            id=pghistory.models.Context.objects.create().id
+        ).update(
+            created_at=now - dt.timedelta(days=days), updated_at=now - dt.timedelta(days=days)
+        )
+
+    pghistory.models.Context.objects.filter(id=ctx.id).update(
+        created_at=now - dt.timedelta(days=25)
+    )
+    progress = []
+    assert (
+        retention.prune_contexts(
+            min_age=dt.timedelta(days=15), window=dt.timedelta(days=7), progress=progress.append
+        )
+        == 2
+    )
+    assert progress == [1, 2]
+    assert pghistory.models.Context.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_pghistory_prune_command():
+    """
+    Verifies the pghistory_prune management command
+    """
+    m = test_models.PartitionModel.objects.create(int_field=0)
+    _update(m, [1, 2])
+
+    out = io.StringIO()
+    call_command("pghistory_prune", "--contexts", stdout=out)
+    assert out.getvalue().splitlines() == [
+        "tests.PartitionModelEvent: deleted 1 events...",
+        "tests.PartitionModelEvent: deleted 1 events",
+        "Context: deleted 0 rows",
+    ]
+
+    with pytest.raises(CommandError, match="no retention policy"):
+        call_command("pghistory_prune", "tests.SnapshotModelSnapshot")
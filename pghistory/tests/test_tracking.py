@@ -1,8 +1,15 @@
+import asyncio
+import uuid
+
 import ddf
 import pytest
-from django.db import connection
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.utils import timezone
 
 import pghistory.models
+import pghistory.runtime
 import pghistory.tests.models as test_models
 
 
@@ -215,3 +222,204 @@ def test_nested_tracking(mocker):
                 "id": m.id,
             },
         ]
+
+
+def _context_writes():
+    """Returns the rows written to the context table in the current transaction"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT n_tup_ins + n_tup_upd FROM pg_stat_xact_user_tables WHERE relname = %s",
+            [pghistory.models.Context._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cache, expected_writes", [(False, 10), (True, 2)])
+def test_context_write_amplification(cache, expected_writes):
+    """
+    Verifies that cached context is only upserted when the context changes
+    in a transaction, while uncached context is upserted for every event
+    """
+    pghistory.models.Context.install_pgh_attach_context_func(cache=cache)
+    writes = _context_writes()
+
+    with pghistory.context(key="value") as ctx:
+        test_models.CustomModel.objects.bulk_create(
+            [test_models.CustomModel(my_pk=uuid.uuid4(), int_field=i) for i in range(5)]
+        )
+
+        pghistory.context(key="changed")
+        test_models.CustomModel.objects.bulk_create(
+            [test_models.CustomModel(my_pk=uuid.uuid4(), int_field=i) for i in range(5)]
+        )
+
+    assert _context_writes() - writes == expected_writes
+    assert pghistory.models.Context.objects.get().metadata == {"key": "changed"}
+    assert test_models.CustomModelSnapshot.objects.filter(pgh_context_id=ctx.id).count() == 10
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "writes_only, expected_injections",
+    [
+        (False, [True, False, True, False, False, True, False, False, False, True]),
+        (True, [True, False, False, False, False, True, False, False, False, True]),
+    ],
+)
+def test_context_injection(settings, writes_only, expected_injections):
+    """
+    Verifies context is only injected when it changes, when a savepoint it was
+    injected in is rolled back, and optionally only before writes
+    """
+    settings.PGHISTORY_CONTEXT_INJECTION_WRITES_ONLY = writes_only
+    statements = []
+
+    def record_statement(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def create_event_model():
+        return test_models.EventModel.objects.create(dt_field=timezone.now(), int_field=1)
+
+    with pghistory.context(key="value") as ctx:
+        with connection.execute_wrapper(record_statement):
+            create_event_model()
+            list(test_models.EventModel.objects.all())
+
+            pghistory.context(key="changed")
+            list(test_models.EventModel.objects.all())
+            list(test_models.EventModel.objects.all())
+
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    pghistory.context(key="savepoint")
+                    create_event_model()
+                    list(test_models.EventModel.objects.all())
+                    raise RuntimeError
+
+            m = create_event_model()
+
+    assert [sql.startswith("SELECT set_config") for sql in statements] == expected_injections
+    assert m.events.get().pgh_context_id == ctx.id
+    assert pghistory.models.Context.objects.get().metadata == {
+        "key": "savepoint",
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "logical_databases, expected_emits",
+    [
+        ({"default"}, [False, True, False, False]),
+        ({"other"}, [False, False, False, False]),
+    ],
+)
+def test_context_logical_emission(mocker, logical_databases, expected_emits):
+    """
+    Verifies context is only emitted as a logical decoding message before
+    writes on databases with logical replication capture
+    """
+    assert pghistory.runtime._get_logical_databases() == {"default"}
+    mocker.patch.object(
+        pghistory.runtime, "_get_logical_databases", return_value=frozenset(logical_databases)
+    )
+    statements = []
+
+    def record_statement(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def create_event_model():
+        return test_models.EventModel.objects.create(dt_field=timezone.now(), int_field=1)
+
+    with pghistory.context(key="value"):
+        with connection.execute_wrapper(record_statement):
+            list(test_models.EventModel.objects.all())
+            create_event_model()
+            create_event_model()
+            list(test_models.EventModel.objects.all())
+
+    assert [sql.startswith("SELECT set_config") for sql in statements] == [
+        True,
+        expected_emits[1],
+        False,
+        False,
+    ]
+    assert ["pg_logical_emit_message" in sql for sql in statements] == expected_emits
+
+
+@pytest.mark.django_db
+def test_context_metadata_serialization(mocker, settings):
+    """
+    Verifies context metadata is only serialized when it changes
+    """
+    settings.PGHISTORY_CONTEXT_INJECTION_CACHE = False
+    dumps = mocker.patch("pghistory.runtime.json.dumps", wraps=pghistory.runtime.json.dumps)
+
+    with pghistory.context(key="value") as ctx:
+        ddf.G("tests.EventModel")
+        ddf.G("tests.EventModel")
+        assert dumps.call_count == 1
+
+        pghistory.context(key="changed")
+        ddf.G("tests.EventModel")
+        ddf.G("tests.EventModel")
+        assert dumps.call_count == 2
+
+    assert pghistory.models.Context.objects.get(id=ctx.id).metadata == {"key": "changed"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_context():
+    """
+    Verifies that concurrent asyncio tasks have isolated contexts and that
+    context is injected in the threads that run sync_to_async code
+    """
+
+    async def create_event_model(key):
+        with pghistory.context(key=key) as ctx:
+            # Let the other task enter its context
+            await asyncio.sleep(0)
+            m = await sync_to_async(ddf.G)("tests.EventModel")
+            return ctx, m
+
+    async def create_event_models():
+        try:
+            return await asyncio.gather(create_event_model("a"), create_event_model("b"))
+        finally:
+            await sync_to_async(connections.close_all)()
+
+    (ctx_a, m_a), (ctx_b, m_b) = asyncio.run(create_event_models())
+
+    assert ctx_a.id != ctx_b.id
+    assert m_a.events.get().pgh_context.metadata == {"key": "a"}
+    assert m_b.events.get().pgh_context.metadata == {"key": "b"}
+
+
+@pytest.mark.django_db
+def test_context_other_database(mocker):
+    """
+    Verifies that context is only injected on Postgres connections when
+    other databases are configured
+    """
+    handler = ConnectionHandler(
+        {
+            "default": connection.settings_dict,
+            "other": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+        }
+    )
+    mocker.patch.object(pghistory.runtime, "connections", handler)
+    other = handler["other"]
+    try:
+        with pghistory.context(key="value"):
+            with other.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                assert cursor.fetchone() == (1,)
+
+            m = ddf.G("tests.EventModel")
+
+        assert pghistory.runtime._inject_history_context not in other.execute_wrappers
+        assert m.events.get().pgh_context.metadata == {"key": "value"}
+    finally:
+        other.close()
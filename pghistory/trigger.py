@@ -1,6 +1,7 @@
 import re
 
 import pgtrigger
+from django.apps import apps
 from django.db import models
 
 from pghistory import utils
@@ -21,15 +22,33 @@ def _fmt_trigger_name(label):
         return None
 
 
+def _fmt_sql(sql):
+    """Collapse a multi-line SQL string into a single line"""
+    return " ".join(line.strip() for line in sql.split("\n") if line.strip()).strip()
+
+
 class Event(pgtrigger.Trigger):
     """
-    Events a model with a label when a condition happens
+    Events a model with a label when a condition happens.
+
+    Row-level triggers insert one event per row. Statement-level triggers
+    use transition tables to insert all events of a statement with a
+    single `INSERT ... SELECT`.
+
+    Event models with asynchronous capture store the event rows as JSON in the
+    event queue instead of the event table.
+
+    With `coalesce="transaction"`, a deferred constraint trigger inserts at most
+    one event per object when the transaction commits. Events of the `NEW` row
+    store the committed state of the object while events of the `OLD` row store
+    the state before the first update.
     """
 
     label = None
     row = "NEW"
     event_model = None
     when = pgtrigger.After
+    coalesce = None
 
     def __init__(
         self,
@@ -42,6 +61,8 @@ class Event(pgtrigger.Trigger):
         when=None,
         row=None,
         snapshot=None,
+        level=None,
+        coalesce=None,
     ):
         # Note - "snapshot" is the old field, renamed to "row". We avoid removing it entirely
         # since old migrations still may reference this trigger
@@ -65,12 +86,126 @@ class Event(pgtrigger.Trigger):
         if not self.row:  # pragma: no cover
             raise ValueError('Must provide "row"')
 
-        super().__init__(operation=operation, condition=condition, when=when)
+        self.coalesce = coalesce or self.coalesce
+        if self.coalesce not in (None, "transaction"):  # pragma: no cover
+            raise ValueError('"coalesce" must be "transaction"')
 
-    def get_func(self, model):
+        level = level or self.level
+        referencing = None
+        if level == pgtrigger.Statement:
+            # Transition tables can only be declared for a single operation
+            if operation == pgtrigger.Update:
+                referencing = pgtrigger.Referencing(old="old_values", new="new_values")
+            elif operation == pgtrigger.Insert:
+                referencing = pgtrigger.Referencing(new="new_values")
+            elif operation == pgtrigger.Delete:
+                referencing = pgtrigger.Referencing(old="old_values")
+            else:  # pragma: no cover
+                raise ValueError(
+                    "Statement-level events must be configured with a single"
+                    " insert, update, or delete operation"
+                )
+
+        if self.coalesce and level == pgtrigger.Statement:  # pragma: no cover
+            raise ValueError("Statement-level events can't be coalesced")
+
+        super().__init__(
+            operation=operation,
+            condition=condition,
+            when=when,
+            level=level,
+            referencing=referencing,
+            timing=pgtrigger.Deferred if self.coalesce else None,
+        )
+
+    def render_condition(self, model):
+        """Statement-level triggers apply the condition when selecting from transition tables"""
+        return super().render_condition(model) if self.level == pgtrigger.Row else ""
+
+    def _get_transition_tables(self, model):
+        """
+        Returns the FROM clause of a statement-level event. The condition of the
+        trigger is rewritten to filter the transition tables, joining the old and
+        new tables on the primary key of the tracked model when both are referenced.
+        """
+        row = f"{self.row.lower()}_values"
+        condition = super().render_condition(model)
+        if not condition:
+            return row
+
+        condition = re.sub(r"\bOLD\.", "old_values.", condition[len("WHEN ") :])
+        condition = re.sub(r"\bNEW\.", "new_values.", condition)
+
+        other_row = "new_values" if row == "old_values" else "old_values"
+        if f"{other_row}." not in condition:
+            return f"{row} WHERE {condition}"
+        else:
+            pk_col = model._meta.pk.column
+            return (
+                f'old_values JOIN new_values ON old_values."{pk_col}" = new_values."{pk_col}"'
+                f" WHERE {condition}"
+            )
+
+    def _get_coalesced_sql(self, model, cols, vals):
+        """
+        Returns the SQL of coalesced events. An event is only inserted if the object
+        has no event with the label in the transaction, which is identified by the
+        transaction ID stored in pgh_xact_id. The committed row of the object is
+        used for "NEW" events, skipping objects deleted in the transaction.
+        """
+        event_table = self.event_model._meta.db_table
+        obj_col = self.event_model._meta.get_field("pgh_obj").column
+        pk_col = _get_pgh_obj_pk_col(self.event_model)
+        source = "WHERE"
+        if self.row == "NEW":
+            source = (
+                f'FROM "{model._meta.db_table}" _pgh_row'
+                f' WHERE _pgh_row."{pk_col}" = NEW."{pk_col}" AND'
+            )
+        return f"""
+            INSERT INTO "{event_table}" ({cols})
+            SELECT {vals} {source} NOT EXISTS (
+                SELECT 1
+                FROM "{event_table}" _pgh_event
+                WHERE _pgh_event."{obj_col}" = {self.row}."{pk_col}"
+                    AND _pgh_event.pgh_label = '{self.label}'
+                    AND _pgh_event.pgh_created_at = NOW()
+                    AND _pgh_event.pgh_xact_id = TXID_CURRENT()
+            );
+            RETURN NULL;
+        """
+
+    def _get_queue_sql(self, model, fields):
+        """
+        Returns the SQL of events that are captured asynchronously. Rows are built
+        with chunks of JSONB_BUILD_OBJECT since functions take at most 100 arguments.
+        """
+        pairs = [f"'{col}', {val}" for col, val in fields.items()]
+        row = " || ".join(
+            f"JSONB_BUILD_OBJECT({', '.join(pairs[i : i + 50])})" for i in range(0, len(pairs), 50)
+        )
+        queue_table = apps.get_model("pghistory", "EventQueue")._meta.db_table
+        label = self.event_model._meta.label
+        if self.level == pgtrigger.Row:
+            return f"""
+                INSERT INTO "{queue_table}" ("event_model", "row") VALUES ('{label}', {row});
+                RETURN NULL;
+            """
+        else:
+            return f"""
+                INSERT INTO "{queue_table}" ("event_model", "row")
+                    SELECT '{label}', {row} FROM {self._get_transition_tables(model)};
+                RETURN NULL;
+            """
+
+    def get_values(self, row):
+        """
+        Returns the SQL expressions of the event table columns, referencing the
+        columns of the tracked model with the supplied row alias
+        """
         tracked_model_fields = {f.name for f in self.event_model.pgh_tracked_model._meta.fields}
         fields = {
-            f.column: f'{self.row}."{f.column}"'
+            f.column: f'{row}."{f.column}"'
             for f in self.event_model._meta.fields
             if not isinstance(f, models.AutoField)
             and f.name in tracked_model_fields
@@ -79,12 +214,20 @@ class Event(pgtrigger.Trigger):
         fields["pgh_created_at"] = "NOW()"
         fields["pgh_label"] = f"'{self.label}'"
 
+        if self.coalesce:
+            fields["pgh_xact_id"] = "TXID_CURRENT()"
+
         if hasattr(self.event_model, "pgh_obj"):
-            fields["pgh_obj_id"] = f'{self.row}."{_get_pgh_obj_pk_col(self.event_model)}"'
+            fields["pgh_obj_id"] = f'{row}."{_get_pgh_obj_pk_col(self.event_model)}"'
 
         if hasattr(self.event_model, "pgh_context"):
             if isinstance(self.event_model._meta.get_field("pgh_context"), models.ForeignKey):
-                fields["pgh_context_id"] = "_pgh_attach_context()"
+                # An uncorrelated subquery is evaluated once for all rows of a statement
+                fields["pgh_context_id"] = (
+                    "_pgh_attach_context()"
+                    if self.level == pgtrigger.Row
+                    else "(SELECT _pgh_attach_context())"
+                )
             elif isinstance(self.event_model._meta.get_field("pgh_context"), utils.JSONField):
                 fields["pgh_context"] = (
                     "COALESCE(NULLIF(CURRENT_SETTING('pghistory.context_metadata', TRUE), ''),"
@@ -100,13 +243,143 @@ class Event(pgtrigger.Trigger):
                 "COALESCE(NULLIF(CURRENT_SETTING('pghistory.context_id', TRUE), ''), NULL)::UUID"
             )
 
-        fields = {key: fields[key] for key in sorted(fields)}
+        return {key: fields[key] for key in sorted(fields)}
+
+    def get_func(self, model):
+        # Statement-level triggers select from the transition table of the row and
+        # coalesced "NEW" events select the committed row of the object
+        if self.level == pgtrigger.Statement:
+            row = f"{self.row.lower()}_values"
+        elif self.coalesce and self.row == "NEW":
+            row = "_pgh_row"
+        else:
+            row = self.row
 
+        fields = self.get_values(row)
         cols = ", ".join(f'"{col}"' for col in fields)
         vals = ", ".join(val for val in fields.values())
+
+        if self.event_model.pgh_capture == "async":
+            return _fmt_sql(self._get_queue_sql(model, fields))
+        elif self.coalesce:
+            sql = self._get_coalesced_sql(model, cols, vals)
+        elif self.level == pgtrigger.Row:
+            sql = f"""
+                INSERT INTO "{self.event_model._meta.db_table}"
+                    ({cols}) VALUES ({vals});
+                RETURN NULL;
+            """
+        else:
+            sql = f"""
+                INSERT INTO "{self.event_model._meta.db_table}"
+                    ({cols}) SELECT {vals} FROM {self._get_transition_tables(model)};
+                RETURN NULL;
+            """
+
+        return _fmt_sql(sql)
+
+
+class Diff(pgtrigger.Trigger):
+    """
+    Stores the diff with the previous event of the same object in the
+    `pgh_diff` field of an event model when events are inserted.
+    """
+
+    when = pgtrigger.Before
+    operation = pgtrigger.Insert
+
+    def get_func(self, model):
+        event_table = model._meta.db_table
+        obj_col = model._meta.get_field("pgh_obj").column
+        pk_col = model._meta.pk.column
         sql = f"""
-            INSERT INTO "{self.event_model._meta.db_table}"
-                ({cols}) VALUES ({vals});
-            RETURN NULL;
+            NEW.pgh_diff := (
+                SELECT JSONB_OBJECT_AGG(curr.key, ARRAY[prev.value, curr.value])
+                FROM JSONB_EACH(TO_JSONB(NEW)) curr
+                JOIN JSONB_EACH((
+                    SELECT TO_JSONB(_prev)
+                    FROM "{event_table}" _prev
+                    WHERE _prev."{obj_col}" = NEW."{obj_col}"
+                        AND _prev."{pk_col}" < NEW."{pk_col}"
+                    ORDER BY _prev."{pk_col}" DESC
+                    LIMIT 1
+                )) prev ON curr.key = prev.key
+                WHERE curr.key NOT LIKE 'pgh_%' AND curr.value != prev.value
+            );
+            RETURN NEW;
         """
-        return " ".join(line.strip() for line in sql.split("\n") if line.strip()).strip()
+
+        return _fmt_sql(sql)
+
+
+class Delta(pgtrigger.Trigger):
+    """
+    Only stores the changed columns of an event model when events are inserted.
+
+    Unchanged columns are set to `NULL` and the names of the changed columns
+    are stored in the `pgh_changed` field. A full snapshot, identified by a
+    `NULL` `pgh_changed` field, is stored for the first event of an object
+    and every `checkpoint_interval` events after it.
+    """
+
+    when = pgtrigger.Before
+    operation = pgtrigger.Insert
+    declare = [("_pgh_state", "JSONB"), ("_pgh_count", "INTEGER"), ("_pgh_new", "JSONB")]
+    checkpoint_interval = None
+
+    def __init__(self, *, checkpoint_interval=None, **kwargs):
+        self.checkpoint_interval = checkpoint_interval or self.checkpoint_interval
+        if not self.checkpoint_interval:  # pragma: no cover
+            raise ValueError('Must provide "checkpoint_interval"')
+
+        super().__init__(**kwargs)
+
+    def get_func(self, model):
+        event_table = model._meta.db_table
+        obj_col = model._meta.get_field("pgh_obj").column
+        pk_col = model._meta.pk.column
+        sql = f"""
+            SELECT JSONB_OBJECT_AGG(state.key, state.value), MAX(state.pgh_event_count)
+            INTO _pgh_state, _pgh_count
+            FROM (
+                SELECT DISTINCT ON (col.key) col.key, col.value, _prev.pgh_event_count
+                FROM (
+                    SELECT _prev.*, COUNT(*) OVER () AS pgh_event_count
+                    FROM "{event_table}" _prev
+                    WHERE _prev."{obj_col}" = NEW."{obj_col}"
+                        AND _prev."{pk_col}" < NEW."{pk_col}"
+                        AND _prev."{pk_col}" >= (
+                            SELECT MAX(_checkpoint."{pk_col}")
+                            FROM "{event_table}" _checkpoint
+                            WHERE _checkpoint."{obj_col}" = NEW."{obj_col}"
+                                AND _checkpoint."{pk_col}" < NEW."{pk_col}"
+                                AND _checkpoint.pgh_changed IS NULL
+                        )
+                ) _prev
+                CROSS JOIN JSONB_EACH(TO_JSONB(_prev)) col
+                WHERE col.key NOT LIKE 'pgh_%'
+                    AND (_prev.pgh_changed IS NULL OR _prev.pgh_changed ? col.key)
+                ORDER BY col.key, _prev."{pk_col}" DESC
+            ) state;
+
+            IF _pgh_state IS NOT NULL AND _pgh_count < {int(self.checkpoint_interval)} THEN
+                _pgh_new := TO_JSONB(NEW);
+                NEW.pgh_changed := COALESCE((
+                    SELECT JSONB_AGG(curr.key ORDER BY curr.key)
+                    FROM JSONB_EACH(_pgh_new) curr
+                    WHERE curr.key NOT LIKE 'pgh_%'
+                        AND curr.value IS DISTINCT FROM _pgh_state -> curr.key
+                ), '[]');
+                NEW := JSONB_POPULATE_RECORD(NEW, COALESCE((
+                    SELECT JSONB_OBJECT_AGG(curr.key, NULL)
+                    FROM JSONB_EACH(_pgh_new) curr
+                    WHERE curr.key NOT LIKE 'pgh_%' AND NOT NEW.pgh_changed ? curr.key
+                ), '{{}}'));
+            ELSE
+                NEW.pgh_changed := NULL;
+            END IF;
+
+            RETURN NEW;
+        """
+
+        return _fmt_sql(sql)